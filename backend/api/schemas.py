@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, HttpUrl
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Union
 from datetime import datetime
 
 class ArticleRequest(BaseModel):
@@ -20,8 +20,9 @@ class FakeNewsResult(BaseModel):
     claims_analyzed: int
     claims_verified: int
     verification_score: float = Field(ge=0.0, le=1.0)
-    verified_claims: List[str] = []
-    unverified_claims: List[str] = []
+    # Agents report each claim as a dict with the claim text and its analysis
+    verified_claims: List[Union[str, Dict[str, Any]]] = []
+    unverified_claims: List[Union[str, Dict[str, Any]]] = []
 
 class CredibilityResult(BaseModel):
     """Model for credibility assessment results"""
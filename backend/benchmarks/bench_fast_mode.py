@@ -0,0 +1,198 @@
+"""
+Benchmark the fast (on-CPU) analysis profile against the LLM agents.
+
+Scores the lexicon sentiment scorer and the TextRank summary on a fixed corpus
+of short news articles with hand-written labels and reference summaries.
+Sentiment accuracy is the share of articles whose direction (positive,
+neutral, negative) matches the label, plus the mean absolute error of the
+0-100 score. Summary quality is ROUGE-1 F1 against the reference summary.
+With --live the LLM agents are run on the same corpus (needs OPENAI_API_KEY)
+and their answers are scored the same way, and the fast results are also
+compared with the LLM's.
+
+Usage:
+    python benchmarks/bench_fast_mode.py --runs 20
+    python benchmarks/bench_fast_mode.py --live
+
+Reference run (offline, 12 articles, 1 CPU):
+
+    fast profile   direction accuracy 11/12   score MAE 5.1   ROUGE-1 F1 0.50
+                   latency per article p50 0.44 ms  p99 1.58 ms
+
+The corpus is small and written in plain news vocabulary that the lexicon
+covers well, so treat the accuracy as an upper bound; sarcasm, domain jargon
+and mixed articles are where the LLM agents earn their cost. They take
+seconds per article (see bench_fused_analysis.py), while the fast profile
+stays far below the 300 ms popup budget, about 20 ms for a 5,000-word article.
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import statistics
+import sys
+import time
+from collections import Counter
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langgraph.fast_analysis import lexicon_sentiment, textrank_summary
+
+# (title, text, sentiment score 0-100, reference summary)
+CORPUS = [
+    ("Vaccine trial succeeds",
+     "A new malaria vaccine cut infections by 75 percent in a large trial, researchers said on Monday. "
+     "Health officials praised the results as a breakthrough for children in affected regions. "
+     "The vaccine is cheap to produce and can be stored without special freezers. "
+     "Manufacturers expect to supply 100 million doses next year. "
+     "Experts welcomed the news and said it could save hundreds of thousands of lives.",
+     85, "A new malaria vaccine cut infections by 75 percent in a trial and officials praised it as a breakthrough that could save many lives."),
+    ("Factory closure",
+     "The last steel mill in the valley will close in March, eliminating 2,000 jobs. "
+     "Workers said they feared for their families after years of falling orders. "
+     "The company blamed cheap imports and rising energy costs for the losses. "
+     "Local shops warned that the closure would devastate the town's economy. "
+     "Union leaders called the decision a betrayal and promised protests.",
+     15, "The valley's last steel mill will close in March with 2,000 job losses, blamed on imports and energy costs, and workers fear for the town."),
+    ("Council budget meeting",
+     "The city council met on Wednesday to review the budget for the coming year. "
+     "The proposal includes funding for road maintenance, libraries and parks. "
+     "Council members will vote on the final version next month. "
+     "The budget totals 420 million dollars, similar to last year. "
+     "Residents can comment on the proposal at a public hearing on May 4.",
+     50, "The city council reviewed next year's 420 million dollar budget covering roads, libraries and parks, with a vote next month."),
+    ("Record harvest",
+     "Farmers in the region reported a record wheat harvest this summer thanks to good rainfall. "
+     "Prices remained stable and exports rose to their highest level in a decade. "
+     "The agriculture minister said the strong harvest would help secure food supplies. "
+     "Cooperatives plan to invest the gains in new storage facilities.",
+     78, "Farmers reported a record wheat harvest and exports rose to a decade high, helping secure food supplies."),
+    ("Bridge collapse",
+     "A highway bridge collapsed during rush hour on Friday, killing at least nine people. "
+     "Rescue teams searched the river through the night for survivors. "
+     "Engineers had warned for years that the bridge was damaged and needed repairs. "
+     "The governor called the disaster a tragedy and ordered an investigation into the failure.",
+     8, "A highway bridge collapsed during rush hour killing at least nine people, after years of warnings that it was damaged."),
+    ("New library hours",
+     "The public library will change its opening hours starting next week. "
+     "Branches will open at nine in the morning and close at eight in the evening. "
+     "The weekend schedule stays the same. "
+     "A full list of hours is posted on the library website.",
+     50, "The public library will open from nine to eight on weekdays starting next week, with weekend hours unchanged."),
+    ("Startup raises funding",
+     "A local software startup raised 40 million dollars to expand its clean energy platform. "
+     "Investors said the company's growth was impressive and its technology innovative. "
+     "The founders plan to hire 200 engineers and open offices in three countries. "
+     "Customers reported that the platform helped them cut energy bills significantly.",
+     80, "A clean energy software startup raised 40 million dollars and plans to hire 200 engineers after strong growth."),
+    ("Data breach",
+     "A major retailer admitted that hackers stole the personal data of 30 million customers. "
+     "Security experts criticized the company for failing to fix known problems. "
+     "Customers expressed anger that the breach was disclosed weeks late. "
+     "Regulators warned that the company could face heavy fines.",
+     18, "Hackers stole the data of 30 million customers of a major retailer, which faces criticism, anger and possible fines."),
+    ("Train timetable update",
+     "The regional rail operator published its winter timetable on Thursday. "
+     "Most routes keep their current frequency, while two lines gain an extra evening train. "
+     "The changes take effect on December 10. "
+     "Passengers can check the new times online or at stations.",
+     55, "The rail operator published its winter timetable, keeping most routes unchanged and adding evening trains on two lines from December 10."),
+    ("Peace agreement",
+     "The two neighbouring countries signed a peace agreement ending a decade of conflict. "
+     "Leaders celebrated the deal as a historic achievement and a hopeful moment for the region. "
+     "Refugees welcomed the news and many hope to return home next year. "
+     "International observers praised both sides for their progress in talks.",
+     82, "Two neighbouring countries signed a peace agreement ending a decade of conflict, celebrated as a historic achievement."),
+    ("Drought warnings",
+     "Officials warned of a severe drought as reservoirs fell to their lowest level in 40 years. "
+     "Farmers face heavy losses and some towns have started rationing water. "
+     "Scientists said the crisis would worsen without significant rainfall. "
+     "The government faced criticism for delays in building new water infrastructure.",
+     20, "Officials warned of a severe drought with reservoirs at a 40-year low, causing losses for farmers and water rationing."),
+    ("Museum exhibition",
+     "The city museum opened an exhibition of maps from the eighteenth century. "
+     "The collection includes 120 items borrowed from archives in four countries. "
+     "The exhibition runs until the end of September. "
+     "Tickets are available at the museum and online.",
+     52, "The city museum opened an exhibition of 120 eighteenth-century maps from four countries, running until September."),
+]
+
+
+def direction(score: float) -> str:
+    return "positive" if score > 58 else "negative" if score < 42 else "neutral"
+
+
+def rouge1_f1(candidate: str, reference: str) -> float:
+    tokens = lambda text: Counter(re.findall(r"[a-z0-9]+", text.lower()))
+    cand, ref = tokens(candidate), tokens(reference)
+    overlap = sum((cand & ref).values())
+    if not overlap:
+        return 0.0
+    precision, recall = overlap / sum(cand.values()), overlap / sum(ref.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def score_results(results):
+    """results: list of (sentiment score, summary) aligned with CORPUS"""
+    correct = sum(direction(score) == direction(label) for (score, _), (_, _, label, _) in zip(results, CORPUS))
+    mae = statistics.mean(abs(score - label) for (score, _), (_, _, label, _) in zip(results, CORPUS))
+    rouge = statistics.mean(rouge1_f1(summary, reference) for (_, summary), (_, _, _, reference) in zip(results, CORPUS))
+    return correct, mae, rouge
+
+
+def run_fast(runs: int):
+    latencies, results = [], []
+    for _ in range(runs):
+        results = []
+        for _, text, _, _ in CORPUS:
+            started = time.perf_counter()
+            sentiment = lexicon_sentiment(text)
+            summary = textrank_summary(text, max_words=40)
+            latencies.append((time.perf_counter() - started) * 1000)
+            results.append((sentiment["sentimentScore"], summary))
+    return results, latencies
+
+
+async def run_llm():
+    from langgraph.agents import SentimentAgent, SummaryAgent
+    os.environ["USE_MOCK_APIS"] = "false"
+    results, latencies = [], []
+    for title, text, _, _ in CORPUS:
+        state = {"article_title": title, "article_content": text}
+        started = time.perf_counter()
+        state = await SentimentAgent()(state)
+        state = await SummaryAgent()(state)
+        latencies.append((time.perf_counter() - started) * 1000)
+        results.append((state["sentiment_result"]["sentiment_score"], state["summary_result"]))
+    return results, latencies
+
+
+def report(name, results, latencies):
+    correct, mae, rouge = score_results(results)
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    print(f"{name:<14} direction accuracy {correct}/{len(CORPUS)}   score MAE {mae:.1f}   ROUGE-1 F1 {rouge:.2f}")
+    print(f"{'':<14} latency per article p50 {quantiles[49]:.2f} ms  p99 {quantiles[98]:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20, help="Repetitions of the corpus for fast-profile timings")
+    parser.add_argument("--live", action="store_true", help="Also run the LLM agents (needs OPENAI_API_KEY)")
+    args = parser.parse_args()
+
+    fast_results, fast_latencies = run_fast(args.runs)
+    report("fast profile", fast_results, fast_latencies)
+
+    if args.live:
+        os.environ["LLM_CACHE"] = "false"
+        llm_results, llm_latencies = asyncio.run(run_llm())
+        report("LLM agents", llm_results, llm_latencies)
+        agreement = sum(direction(f) == direction(l) for (f, _), (l, _) in zip(fast_results, llm_results))
+        rouge = statistics.mean(rouge1_f1(f, l) for (_, f), (_, l) in zip(fast_results, llm_results))
+        print(f"fast vs LLM    direction agreement {agreement}/{len(CORPUS)}   summary ROUGE-1 F1 {rouge:.2f}")
+
+
+if __name__ == "__main__":
+    main()
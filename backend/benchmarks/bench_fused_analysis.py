@@ -0,0 +1,194 @@
+"""
+Benchmark fused vs per-agent analysis of credibility, sentiment and summary.
+
+Runs the real agents and the FusedAnalysisAgent against a simulated provider
+whose latency follows a simple model: fixed request overhead, plus prompt
+processing time per input token, plus decode time per output token. Tokens are
+estimated at 4 characters per token. Use --live to call the real API instead
+(needs OPENAI_API_KEY); tokens are then taken from the provider's usage field.
+
+Usage:
+    python benchmarks/bench_fused_analysis.py --words 800 --runs 5
+    python benchmarks/bench_fused_analysis.py --live --runs 3
+
+Reference run (simulated, 800-word article, 0.35 s overhead, 80 output tok/s):
+
+    per-agent (sequential)   3 calls  4942 prompt tok  531 completion tok  7.95 s
+    per-agent (concurrent)   3 calls  4952 prompt tok  531 completion tok  2.92 s
+    fused                    1 call   1865 prompt tok  544 completion tok  7.25 s
+
+Fusing cuts prompt tokens by about 62% and saves two request overheads against
+the sequential pipeline. Completion tokens are unchanged and decoded in one
+stream, so three concurrent per-agent calls would still finish sooner.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Every run must reach the provider
+os.environ["LLM_CACHE"] = "false"
+os.environ["USE_MOCK_APIS"] = "false"
+
+from langgraph.agents import CredibilityAgent, SentimentAgent, SummaryAgent, FusedAnalysisAgent
+from langgraph.llm_gateway import LLMGateway, set_llm_gateway
+
+CREDIBILITY = {
+    "sourceReputationScore": 78,
+    "sourceReputationReasoning": "The outlet has a long record of factual reporting with occasional corrections. " * 2,
+    "titleContentScore": 72,
+    "titleContentReasoning": "The headline reflects the main thrust of the article but omits key caveats. " * 2,
+    "misleadingTitlesScore": 80,
+    "misleadingTitlesReasoning": "The title is framed sharply but is not contradicted by the body. " * 2,
+    "averageScore": 77,
+    "overallConclusion": "Broadly credible reporting with a somewhat sharpened headline. " * 2,
+}
+SENTIMENT = {
+    "sentimentLabel": "slightly negative",
+    "sentimentScore": 42,
+    "subjectivityScore": 35,
+    "justification": ["Critical quotes dominate the second half of the article"] * 4,
+    "keyPhrases": ["critics argue", "remains to be seen", "controversial measure"],
+    "biasAssessment": "Mild bias through selection of critical sources. " * 2,
+}
+SUMMARY = " ".join(["summary"] * 100)
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class Usage:
+    def __init__(self, prompt_tokens: int, completion_tokens: int):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.total_tokens = prompt_tokens + completion_tokens
+
+
+class Response:
+    def __init__(self, content: str, usage: Usage):
+        self.choices = [type("Choice", (), {"message": type("Message", (), {"content": content})()})()]
+        self.usage = usage
+
+
+class SimulatedProvider:
+    """OpenAI-shaped client with a latency model instead of a network"""
+    def __init__(self, overhead: float, prefill_per_token: float, decode_per_token: float):
+        self.overhead = overhead
+        self.prefill_per_token = prefill_per_token
+        self.decode_per_token = decode_per_token
+        self.chat = self
+        self.completions = self
+
+    async def create(self, **kwargs):
+        prompt = "\n".join(m["content"] for m in kwargs["messages"])
+        if '"credibility":' in prompt:
+            content = json.dumps({"credibility": CREDIBILITY, "sentiment": SENTIMENT, "summary": SUMMARY})
+        elif "CredibilityAgent" in prompt:
+            content = json.dumps(CREDIBILITY)
+        elif "SentimentAgent" in prompt:
+            content = json.dumps(SENTIMENT)
+        else:
+            content = SUMMARY
+        usage = Usage(_tokens(prompt), _tokens(content))
+        await asyncio.sleep(
+            self.overhead
+            + usage.prompt_tokens * self.prefill_per_token
+            + usage.completion_tokens * self.decode_per_token
+        )
+        return Response(content, usage)
+
+
+class UsageRecorder:
+    """Wraps a client and records the usage of every completion"""
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+        self.chat = self
+        self.completions = self
+
+    async def create(self, **kwargs):
+        response = await self.client.chat.completions.create(**kwargs)
+        usage = getattr(response, "usage", None)
+        self.calls.append((getattr(usage, "prompt_tokens", 0), getattr(usage, "completion_tokens", 0)))
+        return response
+
+
+def _article(rng: random.Random, words: int) -> str:
+    vocab = ("government policy tariff trade minister said report economy markets critics "
+             "support analysts growth week announced measure industry jobs prices").split()
+    return " ".join(rng.choice(vocab) for _ in range(words))
+
+
+async def _per_agent(state, concurrent: bool):
+    agents = [CredibilityAgent(), SentimentAgent(), SummaryAgent()]
+    if concurrent:
+        await asyncio.gather(*(agent(dict(state)) for agent in agents))
+    else:
+        for agent in agents:
+            state = await agent(state)
+
+
+async def _fused(state):
+    await FusedAnalysisAgent()(state)
+
+
+async def run(args):
+    rng = random.Random(42)
+    if args.live:
+        client = UsageRecorder(LLMGateway(use_mock=False).client)
+    else:
+        client = UsageRecorder(SimulatedProvider(args.overhead, args.prefill_ms / 1000, 1 / args.decode_tps))
+    set_llm_gateway(LLMGateway(client=client, use_mock=False))
+
+    modes = [
+        ("per-agent (sequential)", lambda s: _per_agent(s, concurrent=False)),
+        ("per-agent (concurrent)", lambda s: _per_agent(s, concurrent=True)),
+        ("fused", _fused),
+    ]
+    for label, runner in modes:
+        timings, prompt_tokens, completion_tokens, calls = [], [], [], []
+        for _ in range(args.runs):
+            state = {
+                "article_title": "Trade measures draw mixed reactions",
+                "article_content": _article(rng, args.words),
+                "agents_called": [],
+                "agent_invocation_counts": {},
+            }
+            client.calls = []
+            started = time.perf_counter()
+            await runner(state)
+            timings.append(time.perf_counter() - started)
+            prompt_tokens.append(sum(p for p, _ in client.calls))
+            completion_tokens.append(sum(c for _, c in client.calls))
+            calls.append(len(client.calls))
+        print(
+            f"{label:24s} calls {statistics.mean(calls):.0f}  "
+            f"prompt {statistics.mean(prompt_tokens):7.0f} tok  "
+            f"completion {statistics.mean(completion_tokens):6.0f} tok  "
+            f"latency median {statistics.median(timings):.2f} s"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--words", type=int, default=800, help="Article length in words")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--live", action="store_true", help="Call the real API instead of the simulator")
+    parser.add_argument("--overhead", type=float, default=0.35, help="Simulated per-request overhead (s)")
+    parser.add_argument("--prefill-ms", type=float, default=0.05, help="Simulated prompt time per token (ms)")
+    parser.add_argument("--decode-tps", type=float, default=80, help="Simulated output tokens per second")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import json
+import os
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# One JSON file per in-flight analysis job, removed once its result is saved
+CHECKPOINT_DIR = os.environ.get("CHECKPOINT_DIR", "checkpoints")
+
+def _checkpoint_path(job_id: str) -> str:
+    # Job ids are uuids today, but never let one escape the directory
+    safe_id = "".join(c for c in job_id if c.isalnum() or c in "-_")
+    return os.path.join(CHECKPOINT_DIR, f"{safe_id}.json")
+
+def save_checkpoint(job_id: str, state: Dict[str, Any], request: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    Persist the analysis state of a job after an agent completes.
+
+    The file is written to a temporary path and renamed, so a crash mid-write
+    leaves the previous checkpoint intact.
+    """
+    try:
+        os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+        path = _checkpoint_path(job_id)
+        existing = load_checkpoint(job_id) or {}
+        checkpoint = {
+            "job_id": job_id,
+            "request": request if request is not None else existing.get("request"),
+            "updated_at": datetime.now().isoformat(),
+            "state": state
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        logger.error(f"Error saving checkpoint for job {job_id}: {str(e)}")
+        return False
+
+def load_checkpoint(job_id: str) -> Optional[Dict[str, Any]]:
+    """Load a job's checkpoint, or None if there is none"""
+    path = _checkpoint_path(job_id)
+    try:
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+    except Exception as e:
+        logger.error(f"Error loading checkpoint for job {job_id}: {str(e)}")
+    return None
+
+def delete_checkpoint(job_id: str) -> bool:
+    """Remove a job's checkpoint once its final result has been saved"""
+    path = _checkpoint_path(job_id)
+    try:
+        if os.path.exists(path):
+            os.remove(path)
+            return True
+    except Exception as e:
+        logger.error(f"Error deleting checkpoint for job {job_id}: {str(e)}")
+    return False
+
+def list_checkpoints() -> List[Dict[str, Any]]:
+    """All checkpoints left behind by jobs that did not finish"""
+    if not os.path.isdir(CHECKPOINT_DIR):
+        return []
+    checkpoints = []
+    for name in sorted(os.listdir(CHECKPOINT_DIR)):
+        if name.endswith(".json"):
+            checkpoint = load_checkpoint(name[:-len(".json")])
+            if checkpoint:
+                checkpoints.append(checkpoint)
+    return checkpoints
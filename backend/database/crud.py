@@ -1,8 +1,12 @@
 import json
 import os
-from typing import List, Optional, Dict, Any
+import re
+import hashlib
+import unicodedata
+from typing import List, Optional, Dict, Any, Tuple
 import logging
 from .models import ArticleCreate, ArticleResponse
+from .minhash import MinHashLSHIndex, minhash_signature, signature_to_str, signature_from_str
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -10,6 +14,17 @@ logger = logging.getLogger(__name__)
 
 # Simple JSON file-based DB for development
 DB_FILE = os.environ.get("DB_FILE", "articles_db.json")
+# Maps hashes of normalized article text to the article that was analyzed first
+CONTENT_INDEX_FILE = os.environ.get("CONTENT_INDEX_FILE", "content_index.json")
+# MinHash signatures of analyzed articles for near-duplicate lookups, one JSON line per save
+NEAR_DUP_INDEX_FILE = os.environ.get("NEAR_DUP_INDEX_FILE", "near_dup_index.json")
+# Superseded lines are compacted away once they outnumber the live ones and this minimum
+NEAR_DUP_COMPACT_MIN_LINES = 1000
+# Minimum estimated Jaccard similarity of word shingles to reuse results
+NEAR_DUP_THRESHOLD = float(os.environ.get("NEAR_DUP_THRESHOLD", "0.8"))
+
+# In-memory copy of the near-duplicate index, reloaded when the file changes
+_near_dup_cache: Dict[str, Any] = {"path": None, "mtime": None, "index": None, "lines": 0, "legacy": False}
 
 def _load_db() -> List[Dict]:
     """Load articles from JSON file, create if not exists"""
@@ -55,6 +70,151 @@ def normalize_url(url: str) -> str:
         logger.warning(f"Error normalizing URL {url}: {str(e)}")
         return url
 
+def normalize_content(text: str) -> str:
+    """Normalize article text so trivially different copies hash the same"""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    # Drop punctuation and collapse whitespace so quote styles and spacing don't matter
+    text = re.sub(r"[^\w\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+def compute_content_hash(text: str) -> str:
+    """SHA-256 of the normalized article text"""
+    return hashlib.sha256(normalize_content(text).encode("utf-8")).hexdigest()
+
+def _load_content_index() -> Dict[str, Any]:
+    """Load the content-hash index; a missing file is an empty index"""
+    try:
+        if os.path.exists(CONTENT_INDEX_FILE):
+            with open(CONTENT_INDEX_FILE, "r", encoding="utf-8") as f:
+                index = json.load(f)
+                index.setdefault("hashes", {})
+                index.setdefault("runs_saved", 0)
+                return index
+    except Exception as e:
+        logger.error(f"Error loading content index: {str(e)}")
+    return {"hashes": {}, "runs_saved": 0}
+
+def _save_content_index(index: Dict[str, Any]) -> bool:
+    """Save the content-hash index to its JSON file"""
+    try:
+        with open(CONTENT_INDEX_FILE, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, indent=2)
+        return True
+    except Exception as e:
+        logger.error(f"Error saving content index: {str(e)}")
+        return False
+
+def get_article_by_content_hash(content_hash: str) -> Optional[ArticleResponse]:
+    """Get the analyzed article whose normalized text has this hash"""
+    article_id = _load_content_index()["hashes"].get(content_hash)
+    if not article_id:
+        return None
+    return get_article_by_id(article_id)
+
+def record_dedup_hit() -> int:
+    """Count one pipeline run saved by content dedup; returns the new total"""
+    index = _load_content_index()
+    index["runs_saved"] += 1
+    _save_content_index(index)
+    return index["runs_saved"]
+
+def get_dedup_stats() -> Dict[str, int]:
+    """How many distinct bodies are indexed and how many pipeline runs were saved"""
+    index = _load_content_index()
+    return {
+        "indexed_contents": len(index["hashes"]),
+        "indexed_fingerprints": len(_load_near_dup_index()),
+        "runs_saved": index["runs_saved"]
+    }
+
+def compute_content_fingerprint(text: str) -> str:
+    """MinHash signature of the normalized article text as a hex string"""
+    return signature_to_str(minhash_signature(normalize_content(text)))
+
+def _load_near_dup_index() -> MinHashLSHIndex:
+    """
+    Load the near-duplicate index, reusing the in-memory copy while the file is unchanged.
+    
+    Each line is {"id": ..., "fingerprint": ...} and later lines replace
+    earlier ones for the same article. Files written before the append-only
+    format hold a single {article_id: fingerprint} object, which loads too.
+    """
+    mtime = os.path.getmtime(NEAR_DUP_INDEX_FILE) if os.path.exists(NEAR_DUP_INDEX_FILE) else None
+    cached = _near_dup_cache["index"]
+    if (cached is not None and _near_dup_cache["path"] == NEAR_DUP_INDEX_FILE
+            and _near_dup_cache["mtime"] == mtime and cached.threshold == NEAR_DUP_THRESHOLD):
+        return cached
+    
+    index = MinHashLSHIndex(threshold=NEAR_DUP_THRESHOLD)
+    lines = 0
+    legacy = False
+    try:
+        if mtime is not None:
+            fingerprints: Dict[str, str] = {}
+            with open(NEAR_DUP_INDEX_FILE, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    lines += 1
+                    if set(record) == {"id", "fingerprint"}:
+                        fingerprints[record["id"]] = record["fingerprint"]
+                    else:
+                        fingerprints.update(record)
+                        legacy = True
+            for article_id, fingerprint in fingerprints.items():
+                index.add(article_id, signature_from_str(fingerprint))
+    except Exception as e:
+        logger.error(f"Error loading near-duplicate index: {str(e)}")
+    
+    _near_dup_cache["path"] = NEAR_DUP_INDEX_FILE
+    _near_dup_cache["mtime"] = mtime
+    _near_dup_cache["index"] = index
+    _near_dup_cache["lines"] = lines
+    _near_dup_cache["legacy"] = legacy
+    return index
+
+def _index_near_duplicate(article_id: str, fingerprint: str) -> bool:
+    """
+    Add or replace an article's fingerprint in the near-duplicate index file.
+    
+    Appends one line instead of rewriting the file; the file is only
+    rewritten when superseded lines pile up.
+    """
+    index = _load_near_dup_index()
+    signature = signature_from_str(fingerprint)
+    if index.get(article_id) == signature:
+        return True
+    index.add(article_id, signature)
+    try:
+        stale = _near_dup_cache["lines"] + 1 - len(index)
+        # An old single-object file is converted on its first write
+        if _near_dup_cache["legacy"] or stale > max(len(index), NEAR_DUP_COMPACT_MIN_LINES):
+            with open(NEAR_DUP_INDEX_FILE, "w", encoding="utf-8") as f:
+                for key, value in index.items().items():
+                    f.write(json.dumps({"id": key, "fingerprint": signature_to_str(value)}) + "\n")
+            _near_dup_cache["lines"] = len(index)
+            _near_dup_cache["legacy"] = False
+        else:
+            with open(NEAR_DUP_INDEX_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"id": article_id, "fingerprint": fingerprint}) + "\n")
+            _near_dup_cache["lines"] += 1
+        _near_dup_cache["mtime"] = os.path.getmtime(NEAR_DUP_INDEX_FILE)
+        return True
+    except Exception as e:
+        logger.error(f"Error saving near-duplicate index: {str(e)}")
+        return False
+
+def find_near_duplicate(fingerprint: str) -> Optional[Tuple[ArticleResponse, float]]:
+    """Get the most similar analyzed article above NEAR_DUP_THRESHOLD, with its similarity"""
+    match = _load_near_dup_index().query(signature_from_str(fingerprint))
+    if not match:
+        return None
+    article = get_article_by_id(match[0])
+    if not article:
+        return None
+    return article, match[1]
+
 def get_article_by_url(url: str) -> Optional[ArticleResponse]:
     """Get article by URL, with normalization for better matching"""
     articles = _load_db()
@@ -100,14 +260,38 @@ def save_article(article: ArticleCreate) -> bool:
             found_at_index = i
             break
     
+    previous = None
     if found_at_index is not None:
         # Update existing article
+        previous = articles[found_at_index]
         articles[found_at_index] = article_dict
     else:
         # Add new article
         articles.append(article_dict)
     
-    return _save_db(articles)
+    saved = _save_db(articles)
+    
+    # Index the body of fresh analyses; reused results point at an already indexed article
+    results = article.analysis_results or {}
+    content_hash = results.get("content_hash")
+    previous_hash = ((previous or {}).get("analysis_results") or {}).get("content_hash")
+    if saved and (content_hash or previous_hash):
+        index = _load_content_index()
+        changed = False
+        # A refreshed article whose text changed no longer has its old body
+        if previous_hash and previous_hash != content_hash and index["hashes"].get(previous_hash) == previous.get("id"):
+            del index["hashes"][previous_hash]
+            changed = True
+        if content_hash and not results.get("reused_from") and content_hash not in index["hashes"]:
+            index["hashes"][content_hash] = article.id
+            changed = True
+        if changed:
+            _save_content_index(index)
+    
+    if saved and content_hash and not results.get("reused_from") and results.get("content_fingerprint"):
+        _index_near_duplicate(article.id, results["content_fingerprint"])
+    
+    return saved
 
 def get_articles(limit: int = 100, skip: int = 0) -> List[ArticleResponse]:
     """Get all articles with pagination"""
@@ -0,0 +1,166 @@
+"""
+MinHash signatures and an LSH index for near-duplicate article detection.
+
+Copies of a story that differ only by a byline, an "updated at" line or ad
+text share almost all of their word shingles, so the Jaccard similarity of
+their shingle sets stays close to 1. A MinHash signature estimates that
+similarity from a fixed number of hash minima; the LSH index groups the
+signature into bands so a lookup only compares against articles that agree on
+at least one whole band instead of scanning every stored article.
+"""
+
+import hashlib
+import random
+import struct
+from typing import Dict, List, Optional, Tuple, Union
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 3
+
+# Universal hashing (a * x + b) mod p stands in for random permutations
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_PACK_FORMAT = f">{NUM_PERMUTATIONS}I"
+_rng = random.Random(1)  # Fixed seed: signatures must be comparable across processes
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+
+def _shingle_hashes(words: List[str]) -> List[int]:
+    if len(words) < SHINGLE_SIZE:
+        shingles = [" ".join(words)] if words else []
+    else:
+        shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    return [
+        int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "big")
+        for s in shingles
+    ]
+
+
+def minhash_signature(normalized_text: str) -> List[int]:
+    """MinHash signature over word 3-shingles of already normalized text"""
+    hashes = _shingle_hashes(normalized_text.split())
+    if not hashes:
+        return [_MAX_HASH] * NUM_PERMUTATIONS
+    return [
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def signature_to_str(signature: List[int]) -> str:
+    """Compact hex encoding for JSON storage"""
+    return "".join(f"{v:08x}" for v in signature)
+
+
+def signature_from_str(value: str) -> List[int]:
+    return [int(value[i:i + 8], 16) for i in range(0, len(value), 8)]
+
+
+def estimated_similarity(a: List[int], b: List[int]) -> float:
+    """Estimated Jaccard similarity: share of permutations with the same minimum"""
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+class MinHashLSHIndex:
+    """
+    In-memory LSH index over MinHash signatures.
+
+    With 16 bands of 4 rows, pairs with Jaccard similarity 0.8 become
+    candidates with probability > 0.999 while pairs below 0.2 only do so about
+    2.5% of the time; candidates are then checked against the threshold.
+
+    Signatures are packed into bytes and each band table maps a band hash to a
+    row number (or a list of rows on collision), which keeps a million stored
+    articles under 2 GB instead of several times that with plain lists.
+
+    Args:
+        threshold: Minimum estimated Jaccard similarity for a match
+    """
+    def __init__(self, threshold: float = 0.8):
+        self.threshold = threshold
+        self._keys: List[Optional[str]] = []
+        self._signatures: List[bytes] = []
+        self._rows: Dict[str, int] = {}
+        self._tables: List[Dict[int, Union[int, List[int]]]] = [{} for _ in range(BANDS)]
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @staticmethod
+    def _band_hashes(packed: bytes) -> List[int]:
+        width = ROWS_PER_BAND * 4
+        return [hash(packed[band * width:(band + 1) * width]) for band in range(BANDS)]
+
+    def add(self, key: str, signature: List[int]) -> None:
+        """Index a signature under a key (e.g. an article id), replacing any earlier one"""
+        packed = struct.pack(_PACK_FORMAT, *signature)
+        if key in self._rows:
+            if self._signatures[self._rows[key]] == packed:
+                return
+            self.remove(key)
+        row = len(self._keys)
+        self._keys.append(key)
+        self._signatures.append(packed)
+        self._rows[key] = row
+        for table, band_hash in zip(self._tables, self._band_hashes(packed)):
+            existing = table.get(band_hash)
+            if existing is None:
+                table[band_hash] = row
+            elif isinstance(existing, list):
+                existing.append(row)
+            else:
+                table[band_hash] = [existing, row]
+
+    def remove(self, key: str) -> bool:
+        """Drop a key from the band tables; its row stays behind as an empty slot"""
+        row = self._rows.pop(key, None)
+        if row is None:
+            return False
+        for table, band_hash in zip(self._tables, self._band_hashes(self._signatures[row])):
+            existing = table.get(band_hash)
+            if isinstance(existing, list):
+                existing.remove(row)
+                if len(existing) == 1:
+                    table[band_hash] = existing[0]
+            elif existing == row:
+                del table[band_hash]
+        self._keys[row] = None
+        self._signatures[row] = b""
+        return True
+
+    def get(self, key: str) -> Optional[List[int]]:
+        """The signature indexed under a key, if any"""
+        row = self._rows.get(key)
+        return None if row is None else list(struct.unpack(_PACK_FORMAT, self._signatures[row]))
+
+    def query(self, signature: List[int]) -> Optional[Tuple[str, float]]:
+        """Return the most similar indexed key at or above the threshold, with its similarity"""
+        packed = struct.pack(_PACK_FORMAT, *signature)
+        candidates = set()
+        for table, band_hash in zip(self._tables, self._band_hashes(packed)):
+            rows = table.get(band_hash)
+            if rows is None:
+                continue
+            if isinstance(rows, list):
+                candidates.update(rows)
+            else:
+                candidates.add(rows)
+
+        best: Optional[Tuple[str, float]] = None
+        for row in candidates:
+            score = estimated_similarity(signature, struct.unpack(_PACK_FORMAT, self._signatures[row]))
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (self._keys[row], score)
+        return best
+
+    def items(self) -> Dict[str, List[int]]:
+        return {
+            key: list(struct.unpack(_PACK_FORMAT, packed))
+            for key, packed in zip(self._keys, self._signatures)
+            if key is not None
+        }
@@ -0,0 +1,92 @@
+import json
+import os
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# One JSON line per finished analysis job with its LLM usage per agent. Stored
+# results are overwritten when an article is re-analyzed, so costs are summed
+# from this append-only log instead.
+LLM_USAGE_LOG_FILE = os.environ.get("LLM_USAGE_LOG_FILE", "llm_usage_log.jsonl")
+
+USAGE_FIELDS = ("calls", "cache_hits", "prompt_tokens", "cached_prompt_tokens", "completion_tokens",
+                "latency_ms", "cost_usd")
+
+def record_llm_usage(article_id: str, url: str, source: Optional[str], processed_at: datetime,
+                     usage: Dict[str, Any]) -> bool:
+    """Append a job's usage ledger (see langgraph/usage.py) to the log"""
+    if not usage or not usage.get("agents"):
+        return False
+    entry = {
+        "article_id": article_id,
+        "url": url,
+        "source": source or urlparse(url).netloc or "unknown",
+        "processed_at": processed_at.isoformat(),
+        "agents": usage["agents"]
+    }
+    try:
+        with open(LLM_USAGE_LOG_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return True
+    except Exception as e:
+        logger.error(f"Error recording LLM usage for {article_id}: {str(e)}")
+        return False
+
+def _load_usage_log() -> List[Dict[str, Any]]:
+    entries = []
+    if not os.path.exists(LLM_USAGE_LOG_FILE):
+        return entries
+    try:
+        with open(LLM_USAGE_LOG_FILE, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # A line cut short by a crash mid-write
+                    continue
+    except Exception as e:
+        logger.error(f"Error loading LLM usage log: {str(e)}")
+    return entries
+
+def _finish(totals: Dict[str, float]) -> Dict[str, Any]:
+    calls = totals["calls"]
+    result = {"jobs": int(totals["jobs"])}
+    result.update({field: int(totals[field]) for field in USAGE_FIELDS if field not in ("latency_ms", "cost_usd")})
+    result["cost_usd"] = round(totals["cost_usd"], 6)
+    result["mean_latency_ms"] = round(totals["latency_ms"] / calls, 1) if calls else 0.0
+    return result
+
+def get_llm_usage_stats(days: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Tokens, latency and cost of logged jobs, in total and per day, source and agent.
+
+    days limits the report to jobs processed in the last that many days.
+    """
+    since = datetime.now().timestamp() - days * 86400 if days else None
+    new_totals = lambda: defaultdict(float)
+    total, by_day, by_source, by_agent = new_totals(), defaultdict(new_totals), defaultdict(new_totals), defaultdict(new_totals)
+    for entry in _load_usage_log():
+        try:
+            processed_at = datetime.fromisoformat(entry["processed_at"])
+        except (KeyError, ValueError):
+            continue
+        if since is not None and processed_at.timestamp() < since:
+            continue
+        groups = (total, by_day[processed_at.date().isoformat()], by_source[entry.get("source", "unknown")])
+        for totals in groups:
+            totals["jobs"] += 1
+        for agent, counts in entry.get("agents", {}).items():
+            by_agent[agent]["jobs"] += 1
+            for totals in groups + (by_agent[agent],):
+                for field in USAGE_FIELDS:
+                    totals[field] += counts.get(field, 0)
+    return {
+        "total": _finish(total),
+        "by_day": {day: _finish(totals) for day, totals in sorted(by_day.items())},
+        "by_source": {source: _finish(totals) for source, totals in sorted(by_source.items(), key=lambda item: -item[1]["cost_usd"])},
+        "by_agent": {agent: _finish(totals) for agent, totals in sorted(by_agent.items(), key=lambda item: -item[1]["cost_usd"])},
+    }
@@ -8,6 +8,7 @@ from .sentiment_agent import SentimentAgent
 from .summary_agent import SummaryAgent
 from .validator_agent import ValidatorAgent
 from .head_node import HeadNode
+from .fused_agent import FusedAnalysisAgent
 
 __all__ = [
     "FakeNewsAgent",
@@ -15,5 +16,6 @@ __all__ = [
     "SentimentAgent",
     "SummaryAgent",
     "ValidatorAgent",
-    "HeadNode"
+    "HeadNode",
+    "FusedAnalysisAgent"
 ] 
\ No newline at end of file
@@ -5,16 +5,38 @@ FakeNewsAgent - Analyzes an article for potentially false claims
 import asyncio
 import logging
 import os
-import json
-import re
+import time
 import aiohttp
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlparse
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
 # Import the AnalysisState type
 from ..types import AnalysisState
+from ..claim_cache import get_claim_cache
+from ..llm_gateway import LLMUnavailableError, get_llm_gateway
+from ..llm_json import JSON_MODE, parse_llm_json, record_degraded
+from ..prompts import claim_source_message, feedback_messages
+from utils import metrics
+from utils.circuit_breaker import circuit_breaker
+from utils.hedging import first_results
+
+# Bump when the prompts below change so cached LLM responses are not reused
+PROMPT_VERSION = "4"
+
+# Claims of one article verified at the same time; the LLM gateway and search
+# client still bound the calls across all articles
+CLAIM_CONCURRENCY = int(os.environ.get("CLAIM_CONCURRENCY", "4"))
+
+# Evidence for a claim: the top result pages are fetched concurrently and the
+# first ones with usable text win; the rest are cancelled
+EVIDENCE_FETCH_TOP_K = int(os.environ.get("EVIDENCE_FETCH_TOP_K", "3"))
+EVIDENCE_PAGES = int(os.environ.get("EVIDENCE_PAGES", "1"))
+# Seconds allowed for one page, and for the whole race
+EVIDENCE_FETCH_TIMEOUT = float(os.environ.get("EVIDENCE_FETCH_TIMEOUT", "8"))
+EVIDENCE_FETCH_BUDGET = float(os.environ.get("EVIDENCE_FETCH_BUDGET", "10"))
 
 class FakeNewsAgent:
     """
@@ -25,30 +47,8 @@ class FakeNewsAgent:
         """Process the article to detect fake news claims"""
         logger.info("FakeNewsAgent: Processing article")
         
-        # Check if we should use mock APIs or real ones
-        use_mock = os.environ.get("USE_MOCK_APIS", "true").lower() == "true"
-        
-        if use_mock:
-            logger.info("FakeNewsAgent: Using mock implementation")
-            return await self._mock_implementation(state)
-        else:
-            logger.info("FakeNewsAgent: Using real API implementation")
-            return await self._real_implementation(state)
-
-    async def _real_implementation(self, state: AnalysisState) -> AnalysisState:
-        """Real implementation using OpenAI and search APIs"""
-        logger.info("Using real APIs to analyze the article")
-        
-        # Import the necessary libraries for real implementation
-        try:
-            from openai import AsyncOpenAI
-        except ImportError as e:
-            logger.error(f"Failed to import required libraries: {e}")
-            return await self._mock_implementation(state)
-        
-        # Get article content and title
+        # Get article content
         article_content = state.get("article_content", "")
-        article_title = state.get("article_title", "Untitled Article")
         
         # Get the number of claims to extract from state
         num_claims = state.get("num_claims", 2)
@@ -58,62 +58,61 @@ class FakeNewsAgent:
             logger.warning("No article content provided")
             return state
             
-        # Initialize OpenAI client
-        openai_api_key = os.environ.get("OPENAI_API_KEY")
-        if not openai_api_key:
-            logger.warning("No OpenAI API key found in environment variables")
-            return await self._mock_implementation(state)
-            
-        client = AsyncOpenAI(api_key=openai_api_key)
+        # All LLM calls go through the shared, pooled gateway client
+        gateway = get_llm_gateway()
+        if not gateway.is_configured():
+            return self._failed(state, "not_configured", "LLM is not configured (no OpenAI API key)")
         
         # 1. Extract claims from the article
         logger.info("Extracting claims from article")
         try:
             extract_prompt = f"""
-            You are an assistant that extracts exactly {num_claims} factual claims from this article.
-            Return them as a valid JSON array of {num_claims} strings (no commentary, code fences, or backticks).
-
-            Article Title: {article_title}
-            Article Text: {article_content}
+            You are an assistant that extracts exactly {num_claims} factual claims from the article above.
+            Return them as a JSON object {{"claims": [...]}} holding {num_claims} strings (no commentary, code fences, or backticks).
             """
             
-            response = await client.chat.completions.create(
+            response = await gateway.cascade_completion(
+                "fake_news",
+                prompt_version=PROMPT_VERSION,
                 model="gpt-4o-mini",
                 messages=[
+                    claim_source_message(state),
                     {"role": "system", "content": extract_prompt},
-                    {"role": "user", "content": f"List {num_claims} claims in a JSON array now."}
-                ],
-                temperature=0.3
+                    {"role": "user", "content": f"List {num_claims} claims in a JSON object now."}
+                ] + feedback_messages(state, "fake_news"),
+                temperature=0.3,
+                response_format=JSON_MODE
             )
             
             raw_claims = response.choices[0].message.content.strip()
-            # Clean up potential code fences
-            raw_claims = self._remove_code_fences(raw_claims)
             logger.info(f"Raw claims extraction output: {raw_claims}")
                 
             try:
-                claims = json.loads(raw_claims)
+                claims = parse_llm_json(raw_claims, "fake_news")
+                if isinstance(claims, dict):
+                    claims = claims.get("claims", [])
                 if not isinstance(claims, list):
                     raise ValueError("Parsed JSON is not a valid list.")
             except Exception as e:
                 logger.error(f"JSON parse error on extracted claims: {e}")
-                claims = []
+                return self._failed(state, "parse_error", f"Unparseable claim extraction response: {e}")
                 
             claims = claims[:10]  # Ensure we have at most 10 claims
             
+        except LLMUnavailableError:
+            raise
         except Exception as e:
             logger.error(f"Error extracting claims with OpenAI: {e}")
-            claims = []
+            return self._failed(state, "call_error", f"Claim extraction failed: {e}")
             
         if not claims:
-            logger.warning("No claims extracted, falling back to mock data")
-            return await self._mock_implementation(state)
+            return self._failed(state, "no_claims", "No claims could be extracted from the article")
 
         # 2. Analyze each claim using search and verification
         search_api_key = os.environ.get("SEARCH_API_KEY")
         if not search_api_key:
             logger.warning("No Search API key found, using simplified claim verification")
-            all_claims = await self._analyze_claims_simplified(claims, client)
+            all_claims = await self._analyze_claims_simplified(claims, gateway)
         else:
             # Setup search tool
             try:
@@ -121,12 +120,14 @@ class FakeNewsAgent:
                 search_engine_cx = os.environ.get("SEARCH_ENGINE_CX")
                 if not search_engine_cx:
                     logger.warning("No Search Engine CX found, using simplified claim verification")
-                    all_claims = await self._analyze_claims_simplified(claims, client)
+                    all_claims = await self._analyze_claims_simplified(claims, gateway)
                 else:
-                    all_claims = await self._analyze_claims_with_google_search(claims, client, search_api_key, search_engine_cx)
+                    all_claims = await self._analyze_claims_with_google_search(claims, gateway, search_api_key, search_engine_cx)
+            except LLMUnavailableError:
+                raise
             except Exception as e:
                 logger.error(f"Error setting up search: {e}")
-                all_claims = await self._analyze_claims_simplified(claims, client)
+                all_claims = await self._analyze_claims_simplified(claims, gateway)
             
         # 3. Calculate results format matching the original
         found_count = sum(1 for claim in all_claims if claim.get("found", False))
@@ -169,91 +170,179 @@ class FakeNewsAgent:
         
         return state
 
-    async def _analyze_claims_with_google_search(self, claims, client, api_key, cx):
-        """Analyze claims with Google Custom Search"""
-        all_claims = []
+    async def _verify_concurrently(self, claims: List[str], verify) -> List[Dict[str, Any]]:
+        """
+        Run verify(claim) for all claims, at most CLAIM_CONCURRENCY at a time.
+        
+        Results keep the order of the claims. verify handles its own errors so
+        one failed claim does not affect the others; only LLMUnavailableError
+        escapes, and then the remaining claims are cancelled.
+        """
+        semaphore = asyncio.Semaphore(CLAIM_CONCURRENCY)
         
+        async def bounded(claim):
+            async with semaphore:
+                return await verify(claim)
+        
+        tasks = [asyncio.ensure_future(bounded(claim)) for claim in claims]
+        try:
+            return list(await asyncio.gather(*tasks))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+    
+    async def _analyze_claims_with_google_search(self, claims, gateway, api_key, cx):
+        """Analyze claims with Google Custom Search"""
         # Import the search API
         try:
             from utils.search_api import SearchAPI
             search_api = SearchAPI(api_key=api_key, cx=cx)
         except ImportError as e:
             logger.error(f"Error importing SearchAPI: {e}")
-            return await self._analyze_claims_simplified(claims, client)
+            return await self._analyze_claims_simplified(claims, gateway)
+        
+        return await self._verify_concurrently(
+            claims, lambda claim: self._verify_claim_with_search(claim, search_api, gateway)
+        )
+    
+    async def _verify_claim_with_search(self, claim, search_api, gateway):
+        """Search for one claim, fetch evidence and check the claim against it"""
+        logger.info(f"Analyzing claim: {claim}")
+        verdicts = get_claim_cache()
+        await verdicts.warm_index()
+        cached = verdicts.get(claim)
+        if cached is not None:
+            logger.info(f"Reusing verdict from {cached['verified_at']:.0f} for claim: {claim}")
+            result = {
+                "claim": claim,
+                "found": cached["found"],
+                "reason": cached["reason"],
+                "score": cached["score"],
+                "cached": True
+            }
+            if "similarity" in cached:
+                # Matched a reworded claim rather than the same text
+                result["similar_to"] = cached["normalized_claim"]
+            return result
+        try:
+            # Use the SearchAPI to get results
+            search_results = await search_api.search(claim, num_results=3)
+            external_text = ""
+            evidence = []
             
-        for claim in claims:
-            logger.info(f"Analyzing claim: {claim}")
-            try:
-                # Use the SearchAPI to get results
-                search_results = await search_api.search(claim, num_results=3)
-                external_text = ""
-                
-                if search_results:
-                    links_fetched = 0
-                    for item in search_results:
-                        link_url = item.get('link')
-                        if link_url and link_url.startswith("http"):
-                            logger.info(f"Fetching content from: {link_url}")
-                            try:
-                                async with aiohttp.ClientSession() as session:
-                                    async with session.get(link_url, timeout=10) as link_resp:
-                                        if link_resp.status == 200:
-                                            html_content = await link_resp.text()
-                                            page_text = self._extract_text_from_html(html_content, link_url)
-                                            if page_text:
-                                                external_text += f"\n\n[SOURCE: {link_url}]\n{page_text}"
-                                                links_fetched += 1
-                                                # Get only one link per claim
-                                                if links_fetched >= 1:
-                                                    break
-                            except Exception as e:
-                                logger.error(f"Error fetching link: {e}")
-                
-                # If we couldn't fetch any content, add some basic info from search results
-                if not external_text and search_results:
-                    for item in search_results:
-                        snippet = item.get('snippet', '')
-                        title = item.get('title', '')
-                        if snippet:
-                            external_text += f"\n\n[SOURCE: {item.get('link', 'Unknown')}]\n{title}: {snippet}"
-                
-                # Verify the claim against external text
-                if external_text:
-                    verification = await self._check_claim_with_gpt(claim, external_text, client)
-                    all_claims.append(verification)
-                else:
-                    all_claims.append({
-                        "claim": claim,
-                        "found": False,
-                        "reason": "No relevant search results found to verify this claim",
-                        "score": 0
-                    })
-                
-            except Exception as e:
-                logger.error(f"Error analyzing claim with search: {e}")
-                all_claims.append({
-                    "claim": claim,
-                    "found": False,
-                    "reason": f"Error during verification: {str(e)}",
-                    "score": 0
-                })
-                
-        return all_claims
+            if search_results:
+                for link_url, page_text in await self._fetch_evidence(search_results):
+                    external_text += f"\n\n[SOURCE: {link_url}]\n{page_text}"
+                    evidence.append(link_url)
+            
+            # If we couldn't fetch any content, add some basic info from search results
+            if not external_text and search_results:
+                for item in search_results:
+                    snippet = item.get('snippet', '')
+                    title = item.get('title', '')
+                    if snippet:
+                        external_text += f"\n\n[SOURCE: {item.get('link', 'Unknown')}]\n{title}: {snippet}"
+                        if item.get('link'):
+                            evidence.append(item['link'])
+            
+            # Verify the claim against external text
+            if external_text:
+                verdict = await self._check_claim_with_gpt(claim, external_text, gateway)
+                # Only verdicts backed by real results are shared with other articles;
+                # search errors come back as results without links
+                if evidence and not verdict["reason"].startswith("Error"):
+                    verdicts.put(claim, verdict, evidence)
+                return verdict
+            return {
+                "claim": claim,
+                "found": False,
+                "reason": "No relevant search results found to verify this claim",
+                "score": 0
+            }
+            
+        except LLMUnavailableError:
+            raise
+        except Exception as e:
+            logger.error(f"Error analyzing claim with search: {e}")
+            return {
+                "claim": claim,
+                "found": False,
+                "reason": f"Error during verification: {str(e)}",
+                "score": 0
+            }
+        
+    async def _fetch_evidence(self, search_results: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+        """
+        Race the top result pages for a claim and return the first usable ones.
         
-    async def _analyze_claims_simplified(self, claims, client):
+        The first EVIDENCE_FETCH_TOP_K links are fetched concurrently; as soon
+        as EVIDENCE_PAGES of them yield text the others are cancelled. Each fetch
+        is limited to EVIDENCE_FETCH_TIMEOUT and the race to
+        EVIDENCE_FETCH_BUDGET seconds. Returns (url, text) pairs in search rank order.
+        """
+        links = [
+            item.get('link') for item in search_results
+            if (item.get('link') or "").startswith("http")
+        ][:EVIDENCE_FETCH_TOP_K]
+        if not links:
+            return []
+        started = time.monotonic()
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=EVIDENCE_FETCH_TIMEOUT)) as session:
+            pages = await first_results(
+                [self._fetch_page(session, link) for link in links],
+                count=EVIDENCE_PAGES,
+                timeout=EVIDENCE_FETCH_BUDGET
+            )
+        metrics.inc("evidence_fetches_total", len(links), outcome="started")
+        metrics.inc("evidence_fetches_total", len(pages), outcome="used")
+        logger.info(f"Used {len(pages)} of {len(links)} evidence pages after {time.monotonic() - started:.2f}s")
+        return [(links[index], text) for index, text in sorted(pages)]
+    
+    async def _fetch_page(self, session: aiohttp.ClientSession, link_url: str) -> Optional[str]:
+        """Text of one evidence page, None if it cannot be used"""
+        breaker = circuit_breaker(f"fetch:{urlparse(link_url).netloc}")
+        if not breaker.allow():
+            return None
+        logger.info(f"Fetching content from: {link_url}")
+        try:
+            async with session.get(link_url) as link_resp:
+                if link_resp.status >= 500:
+                    breaker.record_failure()
+                    return None
+                if link_resp.status == 429:
+                    # Throttled; the site is up, but this says nothing about its health
+                    breaker.record_ignored()
+                    return None
+                breaker.record_success()
+                if link_resp.status != 200:
+                    return None
+                html_content = await link_resp.text()
+        except asyncio.CancelledError:
+            # Lost the race; says nothing about the site
+            breaker.record_ignored()
+            raise
+        except Exception as e:
+            breaker.record_failure()
+            logger.error(f"Error fetching link: {e}")
+            return None
+        return self._extract_text_from_html(html_content, link_url) or None
+    
+    async def _analyze_claims_simplified(self, claims, gateway):
         """Simplified claim analysis without web search"""
-        all_claims = []
-        for claim in claims:
-            result = await self._analyze_claim(claim, client)
-            all_claims.append({
+        results = await self._verify_concurrently(claims, lambda claim: self._analyze_claim(claim, gateway))
+        return [
+            {
                 "claim": claim,
                 "found": result.get("is_verified", False),
                 "reason": result.get("analysis", "No analysis provided"),
                 "score": 100 if result.get("is_verified", False) else 0
-            })
-        return all_claims
+            }
+            for claim, result in zip(claims, results)
+        ]
     
-    async def _check_claim_with_gpt(self, claim, external_text, client):
+    async def _check_claim_with_gpt(self, claim, external_text, gateway):
         """
         Checks if the external_text supports the given claim. Returns claim verification data.
         """
@@ -265,32 +354,33 @@ You are a fact-checking assistant. You have:
 {external_text}
 
 Does this text SUPPORT the claim or NOT?
-Return ONLY JSON:
+Return ONLY JSON, with your confidence in the verdict from 0 to 100:
 {{
   "supports": true/false,
-  "reason": "short explanation"
+  "reason": "short explanation",
+  "confidence": 85
 }}
 No extra text, no code fences.
 """
 
         try:
-            response = await client.chat.completions.create(
+            response = await gateway.cascade_completion(
+                "fake_news",
+                prompt_version=PROMPT_VERSION,
                 model="gpt-4o-mini",
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": "Return your JSON verdict."}
                 ],
-                temperature=0.3
+                temperature=0.3,
+                response_format=JSON_MODE
             )
             
             raw_response = response.choices[0].message.content.strip()
-            # Clean up potential code fences
-            raw_response = self._remove_code_fences(raw_response)
             logger.info(f"Raw response: {raw_response}")
             
             try:
-                # Parse the response - ensure json is imported
-                result = json.loads(raw_response)
+                result = parse_llm_json(raw_response, "fake_news")
                 supports = result.get("supports", False)
                 reason = result.get("reason", "No reason provided")
                 
@@ -300,7 +390,7 @@ No extra text, no code fences.
                     "reason": reason,
                     "score": 100 if supports else 0
                 }
-            except json.JSONDecodeError as e:
+            except (ValueError, AttributeError) as e:
                 logger.error(f"Failed to parse JSON from GPT response: {e}")
                 logger.error(f"Raw response was: {raw_response}")
                 # Fallback result
@@ -311,6 +401,8 @@ No extra text, no code fences.
                     "score": 0
                 }
                 
+        except LLMUnavailableError:
+            raise
         except Exception as e:
             logger.error(f"Error in claim verification with GPT: {e}")
             return {
@@ -335,16 +427,7 @@ No extra text, no code fences.
             logger.error(f"Error extracting text from HTML: {e}")
             return ""
             
-    def _remove_code_fences(self, text):
-        """
-        Removes Markdown code fences (e.g., ```json) from GPT output.
-        """
-        t = text.strip()
-        t = re.sub(r"^```[a-zA-Z]*", "", t)
-        t = re.sub(r"```$", "", t)
-        return t.strip()
-
-    async def _analyze_claim(self, claim: str, client) -> Dict[str, Any]:
+    async def _analyze_claim(self, claim: str, gateway) -> Dict[str, Any]:
         """Analyze a single claim using OpenAI"""
         try:
             # For simplicity, we'll just use OpenAI to evaluate the claim
@@ -359,27 +442,25 @@ No extra text, no code fences.
             Return your analysis as a JSON object:
             {{
                 "is_verified": true/false,
-                "analysis": "Your analysis here"
+                "analysis": "Your analysis here",
+                "confidence": 85
             }}
+            where confidence (0-100) is how sure you are of the verdict.
             """
             
-            response = await client.chat.completions.create(
+            response = await gateway.cascade_completion(
+                "fake_news",
+                prompt_version=PROMPT_VERSION,
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are a fact-checking assistant. Analyze the given claim and determine if it's likely to be true."},
                     {"role": "user", "content": analysis_prompt}
                 ],
-                temperature=0.3
+                temperature=0.3,
+                response_format=JSON_MODE
             )
             
-            result_text = response.choices[0].message.content.strip()
-            # Clean up potential code fences
-            if result_text.startswith("```") and result_text.endswith("```"):
-                result_text = result_text[3:-3]
-            if result_text.startswith("json"):
-                result_text = result_text[4:]
-                
-            result = json.loads(result_text)
+            result = parse_llm_json(response.choices[0].message.content, "fake_news")
             
             return {
                 "claim": claim,
@@ -387,6 +468,8 @@ No extra text, no code fences.
                 "analysis": result.get("analysis", "No analysis provided")
             }
             
+        except LLMUnavailableError:
+            raise
         except Exception as e:
             logger.error(f"Error analyzing claim with OpenAI: {e}")
             return {
@@ -395,61 +478,18 @@ No extra text, no code fences.
                 "analysis": f"Error during analysis: {str(e)}"
             }
     
-    async def _mock_implementation(self, state: AnalysisState) -> AnalysisState:
-        """Mock implementation for development purposes"""
-        logger.info("Using mock data for FakeNewsAgent")
-        
-        # Get the number of claims to extract
-        num_claims = state.get("num_claims", 2)
-        logger.info(f"Mock implementation using {num_claims} claims")
-        
-        # Simulate processing time
-        await asyncio.sleep(1)
-        
-        # Generate mock detailed claim analysis - astronomy themed
-        all_claims = [
-            {
-                "claim": "ALMA detected hydrogen recombination lines from proplyd disks in the Orion Nebula Cluster",
-                "analysis": "This is verified by the research published by the National Radio Astronomy Observatory and confirmed by multiple independent astronomers. The data from the Atacama Large Millimeter/submillimeter Array (ALMA) provides strong evidence supporting this claim.",
-                "is_verified": True
-            },
-            {
-                "claim": "This is the first-ever detection of hydrogen recombination lines from proplyd disks",
-                "analysis": "Multiple scientific publications confirm this is indeed the first such detection. Previous studies had not observed these specific recombination lines in proplyd disks before this research.",
-                "is_verified": True
-            },
-            {
-                "claim": "The Orion Nebula Cluster is densely packed with stars",
-                "analysis": "This is well-established in astronomy. The Orion Nebula Cluster is one of the closest and most studied star-forming regions, and its dense concentration of stars is well-documented in scientific literature.",
-                "is_verified": True
-            },
-            {
-                "claim": "This discovery helps understand star formation processes",
-                "analysis": "This claim is supported by the broader body of astrophysical research. Understanding protoplanetary disks and their composition provides valuable insights into how stars and their planetary systems form.",
-                "is_verified": True
-            },
-            {
-                "claim": "This discovery proves the existence of alien life",
-                "analysis": "This claim is not supported by the research. The study focuses on hydrogen recombination lines and star formation processes, not the detection of biological signatures or evidence of extraterrestrial life.",
-                "is_verified": False
-            }
-        ]
-        
-        # Limit to the requested number of claims
-        all_claims = all_claims[:num_claims]
-        
-        # Extract verified and unverified claims
-        verified_claims = [claim for claim in all_claims if claim["is_verified"]]
-        unverified_claims = [claim for claim in all_claims if not claim["is_verified"]]
-        
-        # Return fake news detection results with detailed claim analysis
+    def _failed(self, state: AnalysisState, reason: str, error: str) -> AnalysisState:
+        """Record an explicit error result instead of claims when the analysis could not be done"""
+        logger.warning(f"FakeNewsAgent: {error}")
+        record_degraded("fake_news", reason)
         state["fake_news_result"] = {
-            "claims_analyzed": len(all_claims),
-            "claims_verified": len(verified_claims),
-            "verification_score": len(verified_claims) / len(all_claims),
-            "verified_claims": verified_claims,
-            "unverified_claims": unverified_claims,
-            "all_claims": all_claims
+            "error": error,
+            "claims_analyzed": 0,
+            "claims_verified": 0,
+            "verification_score": None,
+            "verified_claims": [],
+            "unverified_claims": [],
+            "all_claims": []
         }
         
         state["last_agent_run"] = "fake_news"
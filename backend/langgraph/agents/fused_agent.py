@@ -0,0 +1,158 @@
+"""
+FusedAnalysisAgent - Runs credibility, sentiment and summary in a single LLM call
+"""
+
+import json
+import logging
+from typing import Dict, Any, List, Optional
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Import the AnalysisState type
+from ..types import AnalysisState
+from ..llm_gateway import get_llm_gateway
+from ..llm_json import JSON_MODE, parse_llm_json
+from ..prompts import shared_article_message
+from .credibility_agent import build_credibility_result
+from .sentiment_agent import build_sentiment_result
+
+# Bump when the prompts below change so cached LLM responses are not reused
+PROMPT_VERSION = "2"
+
+# Instructions and JSON shape of each section, matching the per-agent prompts
+SECTION_PROMPTS = {
+    "credibility": (
+        """Evaluate the article's credibility: Source Reputation (0–100), Title vs Content (0–100) and
+how misleading the title is (0–100, 0=very misleading, 100=not misleading). Compute the average and give reasoning.""",
+        """{
+    "sourceReputationScore": 80,
+    "sourceReputationReasoning": "...",
+    "titleContentScore": 60,
+    "titleContentReasoning": "...",
+    "misleadingTitlesScore": 70,
+    "misleadingTitlesReasoning": "...",
+    "averageScore": 70,
+    "overallConclusion": "..."
+  }"""
+    ),
+    "sentiment": (
+        """Analyze the article's sentiment: overall label ("negative", "positive" or "mixed"), score (0–100,
+0 extremely negative, 50 neutral, 100 extremely positive), subjectivity (0–100, 0 completely objective),
+justification, key phrases supporting the assessment and any detected bias.""",
+        """{
+    "sentimentLabel": "negative",
+    "sentimentScore": 30,
+    "subjectivityScore": 65,
+    "justification": ["Reason 1", "Reason 2", "Reason 3"],
+    "keyPhrases": ["phrase 1", "phrase 2", "phrase 3"],
+    "biasAssessment": "Description of any detected bias"
+  }"""
+    ),
+    "summary": (
+        "Summarize the article in exactly 100 words. No more, no less. Maintain coherence.",
+        '"The 100 word summary"'
+    ),
+}
+
+
+class FusedAnalysisAgent:
+    """
+    Agent that produces the credibility, sentiment and summary results from one
+    structured LLM request, so the article is sent (and billed) once instead of
+    three times.
+
+    Sections missing from the response are left out of the state so the
+    caller can fall back to the per-agent path for them.
+    """
+    def __init__(self, sections: Optional[List[str]] = None):
+        self.sections = [s for s in (sections or list(SECTION_PROMPTS)) if s in SECTION_PROMPTS]
+
+    async def __call__(self, state: AnalysisState) -> AnalysisState:
+        """Run all requested sections in one call and split the result"""
+        logger.info(f"FusedAnalysisAgent: Analyzing {', '.join(self.sections)}")
+
+        gateway = get_llm_gateway()
+        if not gateway.is_configured():
+            logger.warning("No OpenAI API key found in environment variables, using per-agent fallbacks")
+            return state
+
+        try:
+            logger.info("Calling OpenAI for fused analysis")
+            response = await gateway.cascade_completion(
+                "fused",
+                prompt_version=PROMPT_VERSION,
+                model="gpt-4o-mini",
+                messages=[
+                    shared_article_message(state),
+                    {"role": "system", "content": self.build_prompt()},
+                    {"role": "user", "content": "Please return valid JSON."}
+                ],
+                temperature=0.3,
+                response_format=JSON_MODE
+            )
+
+            raw_output = response.choices[0].message.content.strip()
+            logger.info(f"Raw fused output: {raw_output}")
+
+            self.split_output(parse_llm_json(raw_output, "fused"), state)
+
+        except Exception as e:
+            # Nothing is written, so every section falls back to its own agent
+            logger.error(f"Error in fused analysis: {e}")
+
+        return state
+
+    def build_prompt(self) -> str:
+        """One instruction prompt asking for every requested section under its own key"""
+        tasks = "\n".join(
+            f"{i}. \"{section}\": {SECTION_PROMPTS[section][0]}"
+            for i, section in enumerate(self.sections, start=1)
+        )
+        shape = ",\n".join(f'  "{section}": {SECTION_PROMPTS[section][1]}' for section in self.sections)
+        return f"""
+You are a news analysis agent. Perform each of these tasks on the article above:
+{tasks}
+
+Return ONLY JSON in this format:
+{{
+{shape}
+}}
+"""
+
+    def split_output(self, data: Dict[str, Any], state: AnalysisState) -> List[str]:
+        """
+        Write each section of the fused response into the per-agent result keys.
+
+        Returns the sections that were present and usable.
+        """
+        completed = []
+        for section in self.sections:
+            section_data = data.get(section)
+            if section == "summary":
+                if not isinstance(section_data, str) or not section_data.strip():
+                    continue
+                state["summary_result"] = section_data.strip()
+            else:
+                if not isinstance(section_data, dict):
+                    continue
+                builder = build_credibility_result if section == "credibility" else build_sentiment_result
+                state[f"{section}_result"] = builder(section_data)
+                state[f"{section}_raw_output"] = json.dumps(section_data)
+            completed.append(section)
+
+            if "agents_called" not in state:
+                state["agents_called"] = []
+            state["agents_called"].append(section)
+
+        # Counted as its own agent: a rejected section falls back to a first run of its agent,
+        # which keeps that agent's whole re-run budget
+        if "agent_invocation_counts" not in state:
+            state["agent_invocation_counts"] = {}
+        state["agent_invocation_counts"]["fused"] = state["agent_invocation_counts"].get("fused", 0) + 1
+
+        missing = [s for s in self.sections if s not in completed]
+        if missing:
+            logger.warning(f"Fused response missing sections {missing}, they will run separately")
+        state["fused_sections"] = completed
+        return completed
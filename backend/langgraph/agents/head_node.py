@@ -2,8 +2,9 @@
 HeadNode - Decides which agents to call based on article content
 """
 
-import asyncio
 import logging
+import os
+import re
 from typing import Dict, Any
 
 # Set up logging
@@ -12,24 +13,172 @@ logger = logging.getLogger(__name__)
 # Import the AnalysisState type
 from ..types import AnalysisState
 
+# Below this there is no full sentence to extract a claim from; short viral
+# posts above it are exactly what fact-checking is for
+MIN_WORDS_FOR_FAKE_NEWS = int(os.environ.get("HEAD_NODE_MIN_WORDS_FAKE_NEWS", "12"))
+# Below this the text is usually a stub, teaser or paywall page
+MIN_WORDS_FOR_SENTIMENT = int(os.environ.get("HEAD_NODE_MIN_WORDS_SENTIMENT", "25"))
+# Share of sentences that look like checkable claims; above this opinion pieces are fact-checked too
+HIGH_CLAIM_DENSITY = float(os.environ.get("HEAD_NODE_HIGH_CLAIM_DENSITY", "0.35"))
+
+# Keyword signals used to classify the content type (checked against URL, title and text)
+OPINION_URL_PATTERN = re.compile(r"/(opinion|opinions|comment|commentisfree|editorial|editorials|op-ed|oped|columns?|blogs?)/", re.IGNORECASE)
+OPINION_TEXT_PATTERN = re.compile(r"\b(op-ed|opinion|editorial|columnist|i think|i believe|in my view|we must|we should)\b", re.IGNORECASE)
+WEATHER_PATTERN = re.compile(r"\b(forecast|weather|temperatures?|rain(fall)?|showers|thunderstorms?|snow(fall)?|humidity|heatwave|sunny|cloudy|met office|°[cf])", re.IGNORECASE)
+LIVE_BLOG_PATTERN = re.compile(r"\b(live updates?|live blog|as it happened|follow live|latest updates)\b|/live/", re.IGNORECASE)
+# Decimal numbers like "3.45 million" must not count, so "." is only accepted with am/pm
+# Only timestamps that open an entry count; forecasts mention times mid-sentence
+TIMESTAMP_PATTERN = re.compile(
+    r"(?:^|(?<=[.!?\n]))\s*(?:[01]?\d|2[0-3])(?::[0-5]\d|\.[0-5]\d\s*(?:am|pm))\b",
+    re.IGNORECASE | re.MULTILINE
+)
+
+# Numbers that locate or describe rather than assert: times, dates, years,
+# temperatures and measurements. They are removed before looking for claims,
+# otherwise every forecast and live-blog entry would count as one.
+NON_CLAIM_NUMBER_PATTERN = re.compile(
+    r"\b(?:[01]?\d|2[0-3])(?::[0-5]\d|\.[0-5]\d\s*(?:am|pm))(?:\s*(?:am|pm|gmt|bst|utc|[ecmp][sd]?t))?\b|"
+    r"\b\d{1,2}\s*(?:am|pm)\b|"
+    r"\b\d{4}-\d{2}-\d{2}\b|\b\d{1,2}/\d{1,2}/\d{2,4}\b|"
+    r"\b\d{1,2}(?:st|nd|rd|th)?\s+(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\b|"
+    r"\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+\d{1,2}(?:st|nd|rd|th)?\b|"
+    r"\b(?:19|20)\d{2}\b|"
+    r"-?\b\d+(?:\.\d+)?\s*(?:°\s*[cf]?|degrees?(?:\s+(?:celsius|fahrenheit|c|f))?|"
+    r"(?:mm|cm|km|m|in|inches|ft|feet|miles?|mph|km/h|kph|knots?|hpa|mb)\b)|"
+    # Forecast odds and readings: "40% chance of rain", "humidity of 80%"
+    r"\b\d+\s*(?:%|percent)\s+(?:chance|probability|likelihood)\b|\bhumidity\s+(?:of\s+)?\d+\s*(?:%|percent)",
+    re.IGNORECASE
+)
+
+# Sentence-level signals of a checkable factual claim
+CLAIM_PATTERN = re.compile(
+    r"(\d|%|\bpercent\b|\bmillion\b|\bbillion\b|\baccording to\b|\bsaid\b|\bsays\b|\breported\b|"
+    r"\bannounced\b|\bconfirmed\b|\bstudy\b|\bdata\b|\bofficials?\b|\"|“)",
+    re.IGNORECASE
+)
+SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
+
 class HeadNode:
     """
     Determines which agents to call based on article content.
+
+    Uses cheap local heuristics (content type, length and claim density)
+    instead of an LLM call, so routing costs microseconds rather than a request.
+    Set HEAD_NODE_MODE=all to call every agent unconditionally.
     """
     async def __call__(self, state: AnalysisState) -> AnalysisState:
         """Decide which agents to invoke based on the article"""
         logger.info("HeadNode: Deciding which agents to call")
-        
-        # In real implementation, this would use LLM to decide
-        # which agents to call based on article content
-        
-        # Mock implementation for development
-        await asyncio.sleep(0.5)  # Simulate processing time
-        
-        # In most cases, we'll want to call all agents
-        state["call_fake_news"] = True
-        state["call_credibility"] = True
-        state["call_sentiment"] = True
+
+        if os.environ.get("HEAD_NODE_MODE", "heuristic").lower() == "all":
+            decision = {
+                "content_type": "unclassified",
+                "reasons": {
+                    "fake_news": "HEAD_NODE_MODE=all",
+                    "credibility": "HEAD_NODE_MODE=all",
+                    "sentiment": "HEAD_NODE_MODE=all",
+                },
+                "calls": {"fake_news": True, "credibility": True, "sentiment": True},
+            }
+        else:
+            decision = self.classify(
+                state.get("article_content", ""),
+                state.get("article_title", ""),
+                state.get("article_url", "")
+            )
+
+        state["call_fake_news"] = decision["calls"]["fake_news"]
+        state["call_credibility"] = decision["calls"]["credibility"]
+        state["call_sentiment"] = decision["calls"]["sentiment"]
         state["call_summary"] = True  # Summary is always called
-        
-        return state 
\ No newline at end of file
+        state["head_node_decision"] = decision
+
+        logger.info(
+            f"HeadNode: content_type={decision['content_type']}, "
+            f"calls={decision['calls']}"
+        )
+        return state
+
+    def classify(self, text: str, title: str = "", url: str = "") -> Dict[str, Any]:
+        """
+        Classify the article and decide which agents are worth running.
+
+        Returns a dict with the detected content type, the signals used and a
+        call flag plus a short reason for each optional agent.
+        """
+        text = text or ""
+        words = text.split()
+        word_count = len(words)
+        sentences = [s for s in SENTENCE_SPLIT_PATTERN.split(text.strip()) if s]
+        claim_sentences = sum(1 for s in sentences if self._has_claim(s))
+        claim_density = claim_sentences / len(sentences) if sentences else 0.0
+
+        content_type = self._content_type(text, title or "", url or "", word_count)
+
+        calls = {"fake_news": True, "credibility": True, "sentiment": True}
+        reasons = {
+            "fake_news": "Hard news: factual claims should be verified",
+            "credibility": "Source and headline checks apply to all articles",
+            "sentiment": "Tone and bias assessment applies to news coverage",
+        }
+
+        if content_type == "weather":
+            calls["fake_news"] = False
+            calls["sentiment"] = False
+            reasons["fake_news"] = "Weather report: no verifiable news claims"
+            reasons["sentiment"] = "Weather report: sentiment is not meaningful"
+        elif content_type == "live_blog":
+            calls["fake_news"] = False
+            reasons["fake_news"] = "Live blog: claims change between updates, verify the final article instead"
+        elif content_type == "opinion":
+            calls["fake_news"] = False
+            reasons["fake_news"] = "Opinion piece: argument rather than reported claims"
+            reasons["sentiment"] = "Opinion piece: bias and tone are the main signal"
+
+        if word_count < MIN_WORDS_FOR_FAKE_NEWS and calls["fake_news"]:
+            calls["fake_news"] = False
+            reasons["fake_news"] = f"Too short for claim extraction ({word_count} words)"
+        if word_count < MIN_WORDS_FOR_SENTIMENT and calls["sentiment"]:
+            calls["sentiment"] = False
+            reasons["sentiment"] = f"Too short for sentiment analysis ({word_count} words)"
+
+        # Opinion pieces full of reported facts are still fact-checked; weather
+        # and live blogs are not, since their numbers and quotes change by the hour
+        if (content_type == "opinion" and not calls["fake_news"] and claim_density >= HIGH_CLAIM_DENSITY
+                and word_count >= MIN_WORDS_FOR_FAKE_NEWS):
+            calls["fake_news"] = True
+            reasons["fake_news"] = f"High claim density ({claim_density:.2f}) overrides {content_type} classification"
+
+        return {
+            "content_type": content_type,
+            "word_count": word_count,
+            "claim_density": round(claim_density, 3),
+            "calls": calls,
+            "reasons": reasons,
+        }
+
+    def _has_claim(self, sentence: str) -> bool:
+        """Whether a sentence carries a claim signal once times, dates and measurements are removed"""
+        return bool(CLAIM_PATTERN.search(NON_CLAIM_NUMBER_PATTERN.sub(" ", sentence)))
+
+    def _content_type(self, text: str, title: str, url: str, word_count: int) -> str:
+        """Pick the most likely content type from keyword signals"""
+        head = f"{title} {text[:2000]}"
+
+        if LIVE_BLOG_PATTERN.search(url) or LIVE_BLOG_PATTERN.search(title):
+            return "live_blog"
+        # Many timestamped entries are the typical live-blog layout
+        if word_count and len(TIMESTAMP_PATTERN.findall(text)) >= max(5, word_count // 150):
+            return "live_blog"
+
+        weather_hits = len(WEATHER_PATTERN.findall(head))
+        if weather_hits >= 3 or ("/weather" in url.lower() and weather_hits >= 1):
+            return "weather"
+
+        if OPINION_URL_PATTERN.search(url):
+            return "opinion"
+        if len(OPINION_TEXT_PATTERN.findall(head)) >= 3:
+            return "opinion"
+
+        return "hard_news"
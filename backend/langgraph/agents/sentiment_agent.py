@@ -4,15 +4,141 @@ SentimentAgent - Analyzes the sentiment and bias of a news article
 
 import asyncio
 import logging
-import os
 import json
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
 # Import the AnalysisState type
 from ..types import AnalysisState
+from ..llm_gateway import LLMUnavailableError, get_llm_gateway
+from ..llm_json import JSON_MODE, parse_llm_json, record_degraded
+from ..tokens import count_tokens
+from ..prompts import article_chunks, article_message, feedback_messages
+from ..compression import article_view
+from ..fast_analysis import FAST_PROFILE, lexicon_sentiment
+
+# Bump when the prompts below change so cached LLM responses are not reused
+PROMPT_VERSION = "3"
+
+def build_sentiment_result(sentiment_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Map the LLM's sentiment JSON onto the sentiment_result shape"""
+    # Transform to match the expected output format of the original agent
+    sentiment_score = sentiment_data.get("sentimentScore", 50)
+    sentiment_label = sentiment_data.get("sentimentLabel", "neutral")
+    
+    # Get detailed reasoning and key phrases
+    justification = sentiment_data.get("justification", [])
+    key_phrases = sentiment_data.get("keyPhrases", [])
+    subjectivity_score = sentiment_data.get("subjectivityScore", 50) / 100.0
+    bias_assessment = sentiment_data.get("biasAssessment", f"{sentiment_label} tone detected")
+    
+    # Convert to original format
+    # Map sentiment_label to polarity value
+    polarity_map = {
+        "very positive": 0.8,
+        "positive": 0.5,
+        "slightly positive": 0.2,
+        "neutral": 0.0,
+        "slightly negative": -0.2,
+        "negative": -0.5,
+        "very negative": -0.8,
+        "mixed": 0.0  # Default for mixed
+    }
+    
+    # Get closest polarity value or default to 0
+    polarity = polarity_map.get(sentiment_label.lower(), 0.0)
+    
+    # Normalize sentiment score to 0-1 range
+    normalized_score = sentiment_score / 100.0
+    
+    # Create justification string from array
+    if isinstance(justification, list):
+        justification_text = ". ".join(justification)
+    else:
+        justification_text = str(justification)
+    
+    # Create comprehensive result with all details
+    return {
+        "polarity": polarity,
+        "subjectivity": subjectivity_score,
+        "emotional_tone": sentiment_label,
+        "bias_assessment": bias_assessment,
+        "justification": justification_text,
+        # Additional detailed fields
+        "detailed_justification": justification if isinstance(justification, list) else [justification_text],
+        "key_phrases": key_phrases if isinstance(key_phrases, list) else [],
+        "sentiment_score": sentiment_score
+    }
+
+def sentiment_error(error: str) -> Dict[str, Any]:
+    """The sentiment_result of a failed analysis: the error instead of scores"""
+    return {
+        "error": error,
+        "polarity": None,
+        "subjectivity": None,
+        "emotional_tone": None,
+        "bias_assessment": None,
+        "justification": None,
+        "sentiment_score": None
+    }
+
+def _label_for_score(score: float) -> str:
+    """Sentiment label for a 0-100 score, matching the polarity map above"""
+    if score >= 80:
+        return "very positive"
+    if score >= 62:
+        return "positive"
+    if score >= 55:
+        return "slightly positive"
+    if score > 45:
+        return "neutral"
+    if score > 38:
+        return "slightly negative"
+    if score > 20:
+        return "negative"
+    return "very negative"
+
+def aggregate_chunk_sentiments(chunk_results: List[Dict[str, Any]], weights: List[int]) -> Dict[str, Any]:
+    """
+    Reduce per-chunk sentiment JSON into one answer for the whole article.
+    
+    Scores are averaged weighted by chunk length. The label is kept when all
+    chunks agree, "mixed" when chunks lean in opposite directions, and
+    otherwise derived from the averaged score.
+    """
+    total = sum(weights) or 1
+    score = sum(r.get("sentimentScore", 50) * w for r, w in zip(chunk_results, weights)) / total
+    subjectivity = sum(r.get("subjectivityScore", 50) * w for r, w in zip(chunk_results, weights)) / total
+    
+    labels = {str(r.get("sentimentLabel", "neutral")).lower() for r in chunk_results}
+    scores = [r.get("sentimentScore", 50) for r in chunk_results]
+    if len(labels) == 1:
+        label = labels.pop()
+    elif min(scores) < 40 and max(scores) > 60:
+        label = "mixed"
+    else:
+        label = _label_for_score(score)
+    
+    def _merge(key: str, limit: int) -> List[str]:
+        merged = []
+        for result in chunk_results:
+            values = result.get(key, [])
+            for value in values if isinstance(values, list) else [values]:
+                if value and value not in merged:
+                    merged.append(value)
+        return merged[:limit]
+    
+    return {
+        "sentimentLabel": label,
+        "sentimentScore": round(score),
+        "subjectivityScore": round(subjectivity),
+        "justification": _merge("justification", 6),
+        "keyPhrases": _merge("keyPhrases", 10),
+        "biasAssessment": " ".join(_merge("biasAssessment", 3)),
+        "chunkScores": scores
+    }
 
 class SentimentAgent:
     """
@@ -24,44 +150,23 @@ class SentimentAgent:
         logger.info("SentimentAgent: Analyzing sentiment")
         
         # Get article content
-        article_text = state.get("article_content", "")
-        
-        # Check if we need to use a mock implementation
-        use_mock = os.environ.get("USE_MOCK_APIS", "true").lower() == "true"
+        article_text = article_view(state)
         
-        if use_mock:
-            logger.info("Using mock implementation for SentimentAgent")
-            await asyncio.sleep(1)  # Simulate processing time
-            
-            # Return sentiment analysis results with mock data
-            state["sentiment_result"] = {
-                "polarity": -0.2,  # Negative
-                "subjectivity": 0.6,  # Somewhat subjective
-                "emotional_tone": "slightly negative",
-                "bias_assessment": "moderate bias detected",
-                "justification": "The article uses language that suggests skepticism toward certain policies.",
-                "detailed_justification": [
-                    "Uses skeptical framing of policy decisions",
-                    "Includes phrases that suggest doubt about motivations",
-                    "Emphasizes negative consequences over potential benefits"
-                ],
-                "key_phrases": [
-                    "controversial policy",
-                    "critics argue",
-                    "remains to be seen"
-                ],
-                "sentiment_score": 40  # On a 0-100 scale
-            }
+        if state.get("analysis_profile") == FAST_PROFILE:
+            # No LLM call: lexicon scores on CPU, refined later by the full analysis
+            logger.info("Using lexicon scorer for SentimentAgent (fast profile)")
+            state["sentiment_result"] = build_sentiment_result(lexicon_sentiment(article_text))
         else:
             # Use the prompt from initial_langgraph logic.py with enhancements for more detailed output
             system_prompt = """
 You are SentimentAgent, specializing in granular sentiment analysis of newspaper articles.
-Perform a thorough analysis of the article's sentiment covering:
+Perform a thorough analysis of the sentiment of the article above covering:
 1. Overall sentiment label (e.g. "negative," "positive," or "mixed").
 2. Sentiment score (0–100, where 0 is extremely negative, 50 is neutral, 100 is extremely positive).
 3. Provide detailed justification for your analysis.
 4. Identify key phrases that support your assessment.
 5. Assess the level of subjectivity/objectivity (0-100, where 0 is completely objective, 100 is highly subjective).
+6. Rate your confidence in this analysis (0-100).
 
 Return JSON in this format:
 {
@@ -70,153 +175,66 @@ Return JSON in this format:
   "subjectivityScore": 65,
   "justification": ["Reason 1", "Reason 2", "Reason 3"],
   "keyPhrases": ["phrase 1", "phrase 2", "phrase 3"],
-  "biasAssessment": "Description of any detected bias"
+  "biasAssessment": "Description of any detected bias",
+  "confidence": 85
 }
 """
-            # Add article information
-            final_prompt = f"{system_prompt}\n\nArticle Text:\n{article_text}"
-            
             try:
-                # Import OpenAI
-                from openai import AsyncOpenAI
-                
-                # Initialize OpenAI client
-                openai_api_key = os.environ.get("OPENAI_API_KEY")
-                if not openai_api_key:
-                    logger.warning("No OpenAI API key found in environment variables, using mock data")
-                    # Fall back to mock implementation
-                    state["sentiment_result"] = {
-                        "polarity": -0.2,  # Negative
-                        "subjectivity": 0.6,  # Somewhat subjective
-                        "emotional_tone": "slightly negative",
-                        "bias_assessment": "moderate bias detected",
-                        "justification": "The article uses language that suggests skepticism toward certain policies.",
-                        "detailed_justification": [
-                            "Uses skeptical framing of policy decisions",
-                            "Includes phrases that suggest doubt about motivations",
-                            "Emphasizes negative consequences over potential benefits"
-                        ],
-                        "key_phrases": [
-                            "controversial policy",
-                            "critics argue",
-                            "remains to be seen"
-                        ],
-                        "sentiment_score": 40  # On a 0-100 scale
-                    }
+                # All LLM calls go through the shared, pooled gateway client
+                gateway = get_llm_gateway()
+                if not gateway.is_configured():
+                    logger.warning("No OpenAI API key found in environment variables, sentiment not analyzed")
+                    record_degraded("sentiment", "not_configured")
+                    state["sentiment_result"] = sentiment_error("LLM is not configured (no OpenAI API key)")
                 else:
+                    # Articles over the token budget are scored chunk by chunk, concurrently;
+                    # the first chunk is the prefix the other agents send too
+                    chunks = article_chunks(state)
+                    if len(chunks) > 1:
+                        logger.info(f"Article exceeds sentiment token budget, scoring {len(chunks)} chunks")
+                        state.setdefault("article_chunks", {})["sentiment"] = len(chunks)
+                    
                     # Use OpenAI to analyze sentiment
                     logger.info("Calling OpenAI for sentiment analysis")
-                    client = AsyncOpenAI(api_key=openai_api_key)
-                    
-                    response = await client.chat.completions.create(
-                        model="gpt-4o-mini",
-                        messages=[
-                            {"role": "system", "content": final_prompt},
-                            {"role": "user", "content": "Please return valid JSON."}
-                        ],
-                        temperature=0.3
-                    )
+                    raw_outputs = await asyncio.gather(*(
+                        self._analyze(gateway, [
+                            article_message(state.get("article_title", "Untitled Article"), chunk),
+                            {"role": "system", "content": system_prompt}
+                        ], feedback_messages(state, "sentiment")) for chunk in chunks
+                    ))
                     
                     # Get the raw response
-                    raw_output = response.choices[0].message.content.strip()
-                    logger.info(f"Raw sentiment output: {raw_output}")
+                    raw_output = raw_outputs[0]
+                    logger.info(f"Raw sentiment output: {raw_outputs}")
                     
                     # Process the raw output to get the JSON
                     try:
-                        # Remove potential code fences
-                        if raw_output.startswith("```") and raw_output.endswith("```"):
-                            raw_output = raw_output[3:-3]
-                        if raw_output.startswith("json"):
-                            raw_output = raw_output[4:]
-                        
-                        sentiment_data = json.loads(raw_output)
-                        
-                        # Transform to match the expected output format of the original agent
-                        sentiment_score = sentiment_data.get("sentimentScore", 50)
-                        sentiment_label = sentiment_data.get("sentimentLabel", "neutral")
-                        
-                        # Get detailed reasoning and key phrases
-                        justification = sentiment_data.get("justification", [])
-                        key_phrases = sentiment_data.get("keyPhrases", [])
-                        subjectivity_score = sentiment_data.get("subjectivityScore", 50) / 100.0
-                        bias_assessment = sentiment_data.get("biasAssessment", f"{sentiment_label} tone detected")
-                        
-                        # Convert to original format
-                        # Map sentiment_label to polarity value
-                        polarity_map = {
-                            "very positive": 0.8,
-                            "positive": 0.5,
-                            "slightly positive": 0.2,
-                            "neutral": 0.0,
-                            "slightly negative": -0.2,
-                            "negative": -0.5,
-                            "very negative": -0.8,
-                            "mixed": 0.0  # Default for mixed
-                        }
-                        
-                        # Get closest polarity value or default to 0
-                        polarity = polarity_map.get(sentiment_label.lower(), 0.0)
-                        
-                        # Normalize sentiment score to 0-1 range
-                        normalized_score = sentiment_score / 100.0
-                        
-                        # Create justification string from array
-                        if isinstance(justification, list):
-                            justification_text = ". ".join(justification)
+                        # Tolerates fences and truncation, and counts parse failures
+                        if len(chunks) == 1:
+                            sentiment_data = parse_llm_json(raw_output, "sentiment")
                         else:
-                            justification_text = str(justification)
+                            sentiment_data = aggregate_chunk_sentiments(
+                                [parse_llm_json(output, "sentiment") for output in raw_outputs],
+                                [count_tokens(chunk) for chunk in chunks]
+                            )
+                            raw_output = json.dumps(sentiment_data)
                         
-                        # Create comprehensive result with all details
-                        state["sentiment_result"] = {
-                            "polarity": polarity,
-                            "subjectivity": subjectivity_score,
-                            "emotional_tone": sentiment_label,
-                            "bias_assessment": bias_assessment,
-                            "justification": justification_text,
-                            # Additional detailed fields
-                            "detailed_justification": justification if isinstance(justification, list) else [justification_text],
-                            "key_phrases": key_phrases if isinstance(key_phrases, list) else [],
-                            "sentiment_score": sentiment_score
-                        }
+                        state["sentiment_result"] = build_sentiment_result(sentiment_data)
                         
                         # Also store the raw output for validation
                         state["sentiment_raw_output"] = raw_output
                     
                     except Exception as e:
                         logger.error(f"Error processing sentiment response: {e}")
-                        # Fall back to mock implementation on error
-                        state["sentiment_result"] = {
-                            "polarity": -0.2,  # Default to slightly negative
-                            "subjectivity": 0.6,  # Somewhat subjective
-                            "emotional_tone": "neutral",
-                            "bias_assessment": "error in processing",
-                            "justification": f"Error during sentiment analysis: {str(e)}",
-                            "detailed_justification": [f"Error during sentiment analysis: {str(e)}"],
-                            "key_phrases": [],
-                            "sentiment_score": 50
-                        }
+                        record_degraded("sentiment", "parse_error")
+                        state["sentiment_result"] = sentiment_error(f"Unparseable sentiment response: {e}")
             
+            except LLMUnavailableError:
+                raise
             except Exception as e:
                 logger.error(f"Error in sentiment analysis: {e}")
-                # Fall back to mock implementation on error
-                state["sentiment_result"] = {
-                    "polarity": -0.2,  # Negative
-                    "subjectivity": 0.6,  # Somewhat subjective
-                    "emotional_tone": "slightly negative",
-                    "bias_assessment": "moderate bias detected",
-                    "justification": "The article uses language that suggests skepticism toward certain policies.",
-                    "detailed_justification": [
-                        "Uses skeptical framing of policy decisions",
-                        "Includes phrases that suggest doubt about motivations",
-                        "Emphasizes negative consequences over potential benefits"
-                    ],
-                    "key_phrases": [
-                        "controversial policy",
-                        "critics argue",
-                        "remains to be seen"
-                    ],
-                    "sentiment_score": 40  # On a 0-100 scale
-                }
+                record_degraded("sentiment", "call_error")
+                state["sentiment_result"] = sentiment_error(f"Sentiment analysis failed: {e}")
         
         # Update state tracking
         state["last_agent_run"] = "sentiment"
@@ -229,4 +247,19 @@ Return JSON in this format:
             state["agent_invocation_counts"] = {}
         state["agent_invocation_counts"]["sentiment"] = state["agent_invocation_counts"].get("sentiment", 0) + 1
         
-        return state 
\ No newline at end of file
+        return state
+
+    async def _analyze(self, gateway, prompt_messages: List[Dict[str, str]],
+                       feedback: Optional[List[Dict[str, str]]] = None) -> str:
+        """One sentiment request; returns the raw model output"""
+        response = await gateway.cascade_completion(
+            "sentiment",
+            prompt_version=PROMPT_VERSION,
+            model="gpt-4o-mini",
+            messages=prompt_messages + [
+                {"role": "user", "content": "Please return valid JSON."}
+            ] + (feedback or []),
+            temperature=0.3,
+            response_format=JSON_MODE
+        )
+        return response.choices[0].message.content.strip() 
\ No newline at end of file
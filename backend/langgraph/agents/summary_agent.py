@@ -4,14 +4,34 @@ SummaryAgent - Generates a concise summary of a news article
 
 import asyncio
 import logging
-import os
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
 # Import the AnalysisState type
 from ..types import AnalysisState
+from ..llm_gateway import LLMUnavailableError, get_llm_gateway
+from ..tokens import chunk_text, count_tokens
+from ..prompts import article_budget, article_chunks, article_message, feedback_messages, shared_article_message
+from ..compression import article_view
+from ..cascade import response_text
+from ..llm_json import record_degraded
+from ..fast_analysis import FAST_PROFILE, textrank_summary
+
+# Bump when the prompts below change so cached LLM responses are not reused
+PROMPT_VERSION = "2"
+
+def summary_confidence(response) -> float:
+    """Validation score for the model cascade: how close the summary is to the 100 words asked for"""
+    words = len(response_text(response).split())
+    return max(0.0, 1 - abs(words - 100) / 100)
+
+def summary_failed(state: AnalysisState, reason: str, error: str) -> None:
+    """Record a failed summary: no summary_result text, the error in summary_error"""
+    record_degraded("summary", reason)
+    state["summary_result"] = None
+    state["summary_error"] = error
 
 class SummaryAgent:
     """
@@ -23,61 +43,37 @@ class SummaryAgent:
         logger.info("SummaryAgent: Generating summary")
         
         # Get article content
-        article_text = state.get("article_content", "")
+        article_text = article_view(state)
+        article_title = state.get("article_title", "Untitled Article")
         
-        # Check if we need to use a mock implementation
-        use_mock = os.environ.get("USE_MOCK_APIS", "true").lower() == "true"
-        
-        if use_mock:
-            logger.info("Using mock implementation for SummaryAgent")
-            await asyncio.sleep(1)  # Simulate processing time
-            
-            # Return article summary with mock data
-            state["summary_result"] = "This article discusses how US companies, including JM Smucker, are supporting Trump's trade policies that aim to address tariff imbalances. It highlights examples like the 24% EU tariff on jam compared to 4.5% in the US. While some businesses welcome the focus on trade inequities, many are concerned about Trump's broad tariff approach, fearing retaliation and economic disruption."
+        if state.get("analysis_profile") == FAST_PROFILE:
+            # No LLM call: extractive summary on CPU, refined later by the full analysis
+            logger.info("Using TextRank for SummaryAgent (fast profile)")
+            state["summary_result"] = textrank_summary(article_text)
         else:
-            # Use the prompt from initial_langgraph logic.py
-            system_prompt = (
-                "You are a summary agent. Summarize the article in exactly 100 words. "
-                "No more, no less. Maintain coherence."
-            )
-            
-            user_prompt = f"Article text:\n\n{article_text}\n\nSummarize in exactly 100 words."
-            
             try:
-                # Import OpenAI
-                from openai import AsyncOpenAI
-                
-                # Initialize OpenAI client
-                openai_api_key = os.environ.get("OPENAI_API_KEY")
-                if not openai_api_key:
-                    logger.warning("No OpenAI API key found in environment variables, using mock data")
-                    # Fall back to mock implementation
-                    state["summary_result"] = "This article discusses how US companies, including JM Smucker, are supporting Trump's trade policies that aim to address tariff imbalances. It highlights examples like the 24% EU tariff on jam compared to 4.5% in the US. While some businesses welcome the focus on trade inequities, many are concerned about Trump's broad tariff approach, fearing retaliation and economic disruption."
+                # All LLM calls go through the shared, pooled gateway client
+                gateway = get_llm_gateway()
+                if not gateway.is_configured():
+                    logger.warning("No OpenAI API key found in environment variables, no summary generated")
+                    summary_failed(state, "not_configured", "LLM is not configured (no OpenAI API key)")
                 else:
-                    # Use OpenAI to generate summary
-                    logger.info("Calling OpenAI for article summary")
-                    client = AsyncOpenAI(api_key=openai_api_key)
-                    
-                    response = await client.chat.completions.create(
-                        model="gpt-4o-mini",
-                        messages=[
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": user_prompt}
-                        ],
-                        temperature=0.3
-                    )
-                    
-                    # Get the summary
-                    summary = response.choices[0].message.content.strip()
+                    chunks = article_chunks(state)
+                    if len(chunks) == 1:
+                        summary = await self._summarize(gateway, state)
+                    else:
+                        summary = await self._map_reduce(gateway, article_title, chunks, article_budget(), state)
                     logger.info(f"Generated summary: {summary}")
                     
                     # Store the summary
                     state["summary_result"] = summary
+                    state.pop("summary_error", None)
             
+            except LLMUnavailableError:
+                raise
             except Exception as e:
                 logger.error(f"Error in summary generation: {e}")
-                # Fall back to mock implementation on error
-                state["summary_result"] = "This article discusses how US companies, including JM Smucker, are supporting Trump's trade policies that aim to address tariff imbalances. It highlights examples like the 24% EU tariff on jam compared to 4.5% in the US. While some businesses welcome the focus on trade inequities, many are concerned about Trump's broad tariff approach, fearing retaliation and economic disruption."
+                summary_failed(state, "call_error", f"Summary generation failed: {e}")
         
         # Update state tracking
         state["last_agent_run"] = "summary"
@@ -90,4 +86,82 @@ class SummaryAgent:
             state["agent_invocation_counts"] = {}
         state["agent_invocation_counts"]["summary"] = state["agent_invocation_counts"].get("summary", 0) + 1
         
-        return state 
\ No newline at end of file
+        return state
+
+    async def _summarize(self, gateway, state: AnalysisState) -> str:
+        """Summarize text that fits the token budget in one call"""
+        # Use the prompt from initial_langgraph logic.py
+        system_prompt = (
+            "You are a summary agent. Summarize the article above in exactly 100 words. "
+            "No more, no less. Maintain coherence."
+        )
+        
+        user_prompt = "Summarize in exactly 100 words."
+        
+        # Use OpenAI to generate summary
+        logger.info("Calling OpenAI for article summary")
+        response = await gateway.cascade_completion(
+            "summary",
+            confidence=summary_confidence,
+            prompt_version=PROMPT_VERSION,
+            model="gpt-4o-mini",
+            messages=[
+                shared_article_message(state),
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ] + feedback_messages(state, "summary"),
+            temperature=0.3
+        )
+        return response.choices[0].message.content.strip()
+
+    async def _summarize_part(self, gateway, article_title: str, chunk: str, index: int, total: int) -> str:
+        """Map step: summarize one chunk of a long article"""
+        response = await gateway.chat_completion(
+            "summary",
+            prompt_version=PROMPT_VERSION,
+            model="gpt-4o-mini",
+            messages=[
+                article_message(article_title, chunk),
+                {"role": "system", "content": (
+                    f"You are a summary agent. The article text above is part {index} of {total} of a long article. "
+                    "Summarize this part in at most 80 words, keeping names, numbers and claims."
+                )},
+                {"role": "user", "content": "Summarize this part."}
+            ],
+            temperature=0.3
+        )
+        return response.choices[0].message.content.strip()
+
+    async def _map_reduce(self, gateway, article_title: str, chunks: List[str], budget: int, state: AnalysisState) -> str:
+        """
+        Summarize an article over the token budget, given in chunks.
+        
+        Chunks are summarized concurrently, then the partial summaries, in
+        article order, are merged into the final 100-word summary.
+        """
+        logger.info(f"Article exceeds summary budget of {budget} tokens, summarizing {len(chunks)} chunks")
+        state.setdefault("article_chunks", {}).setdefault("summary", len(chunks))
+        
+        partials = await asyncio.gather(*(
+            self._summarize_part(gateway, article_title, chunk, i, len(chunks)) for i, chunk in enumerate(chunks, start=1)
+        ))
+        merged = "\n\n".join(f"Part {i}: {partial}" for i, partial in enumerate(partials, start=1))
+        if count_tokens(merged) > budget:
+            # Very long articles: reduce the partial summaries again
+            return await self._map_reduce(gateway, article_title, chunk_text(merged, budget), budget, state)
+        
+        response = await gateway.chat_completion(
+            "summary",
+            prompt_version=PROMPT_VERSION,
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": (
+                    "You are a summary agent. Below are summaries of consecutive parts of one article. "
+                    "Merge them into a single summary of the whole article in exactly 100 words. "
+                    "No more, no less. Maintain coherence."
+                )},
+                {"role": "user", "content": merged}
+            ] + feedback_messages(state, "summary"),
+            temperature=0.3
+        )
+        return response.choices[0].message.content.strip() 
\ No newline at end of file
@@ -2,32 +2,228 @@
 ValidatorAgent - Validates the output of other agents
 """
 
-import asyncio
+import json
 import logging
-from typing import Dict, Any
+import os
+import time
+from typing import Dict, Any, List, Tuple
+
+from pydantic import ValidationError
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
 # Import the AnalysisState type
 from ..types import AnalysisState
+from ..llm_gateway import get_llm_gateway
+from ..llm_json import JSON_MODE, parse_llm_json
+
+from api.schemas import FakeNewsResult, CredibilityResult, SentimentResult
+
+# Bump when the prompts below change so cached LLM responses are not reused
+PROMPT_VERSION = "1"
+
+# How many times a single agent may be re-run after failing validation
+MAX_RERUNS_PER_AGENT = int(os.environ.get("VALIDATOR_MAX_RERUNS", "1"))
+# How many ambiguous outputs per article may be escalated to the LLM validator
+MAX_LLM_VALIDATIONS = int(os.environ.get("VALIDATOR_MAX_LLM_CHECKS", "2"))
+
+# Result key and schema for each validated agent
+RESULT_SCHEMAS = {
+    "fake_news": ("fake_news_result", FakeNewsResult),
+    "credibility": ("credibility_result", CredibilityResult),
+    "sentiment": ("sentiment_result", SentimentResult),
+}
+
+# Agents that keep their raw LLM output in state when the JSON parsed successfully
+RAW_OUTPUT_KEYS = {
+    "credibility": "credibility_raw_output",
+    "sentiment": "sentiment_raw_output",
+}
+
+VALID = "valid"
+AMBIGUOUS = "ambiguous"
+INVALID = "invalid"
+
 
 class ValidatorAgent:
     """
     Agent that validates the output of other agents.
+
+    Outputs are first checked locally against the pydantic schemas in
+    api/schemas.py plus a few consistency rules. Only outputs that pass the
+    schema but look inconsistent are sent to an LLM validator, and both LLM
+    checks and agent re-runs are capped per article.
     """
     async def __call__(self, state: AnalysisState) -> AnalysisState:
         """Validate agent outputs and refine prompts if needed"""
-        logger.info(f"ValidatorAgent: Validating output from {state['last_agent_run']}")
-        
-        # In real implementation, this would:
-        # 1. Check if the agent output is valid and complete
-        # 2. Refine prompts if necessary
-        
-        # Mock implementation for development
-        await asyncio.sleep(0.5)  # Simulate processing time
-        
-        # Always pass validation in mock mode
-        state["validation_passed"] = True
-        
-        return state 
\ No newline at end of file
+        agent = state.get("last_agent_run", "")
+        logger.info(f"ValidatorAgent: Validating output from {agent}")
+
+        started = time.perf_counter()
+        status, issues = self.check(agent, state)
+        method = "schema"
+
+        if status == AMBIGUOUS:
+            llm_checks = state.get("llm_validation_count", 0)
+            if llm_checks < MAX_LLM_VALIDATIONS and get_llm_gateway().is_configured():
+                state["llm_validation_count"] = llm_checks + 1
+                method = "llm"
+                status, llm_issues = await self._llm_validate(agent, state, issues)
+                issues = issues + llm_issues
+            # Without budget for a second opinion the output is kept and reported as ambiguous
+
+        # Sections of a fused response are validated before their agent has run at all
+        reruns = max(0, state.get("agent_invocation_counts", {}).get(agent, 1) - 1)
+        passed = status != INVALID or reruns >= MAX_RERUNS_PER_AGENT
+
+        if status == INVALID and not passed:
+            if "refined_prompts" not in state:
+                state["refined_prompts"] = {}
+            state["refined_prompts"][agent] = "Previous output was rejected: " + "; ".join(issues)
+        elif status == INVALID:
+            logger.warning(f"ValidatorAgent: {agent} still invalid after {reruns} re-run(s), keeping output")
+
+        if "validation_report" not in state:
+            state["validation_report"] = {}
+        state["validation_report"][agent] = {
+            "status": status,
+            "method": method,
+            "issues": issues,
+            "reruns": reruns,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+        state["validation_passed"] = passed
+
+        return state
+
+    def check(self, agent: str, state: AnalysisState) -> Tuple[str, List[str]]:
+        """
+        Validate an agent's output locally.
+
+        Returns the status (valid, ambiguous or invalid) and a list of issues.
+        """
+        if agent == "summary":
+            if state.get("summary_error") and not state.get("summary_result"):
+                return INVALID, [f"Agent failed: {state['summary_error']}"]
+            return self._check_summary(state.get("summary_result"))
+
+        if agent not in RESULT_SCHEMAS:
+            return VALID, []
+
+        result_key, schema = RESULT_SCHEMAS[agent]
+        result = state.get(result_key)
+        if not isinstance(result, dict):
+            return INVALID, [f"{result_key} is missing"]
+        # Agents report failures as an explicit error result, which is never a usable analysis
+        if result.get("error"):
+            return INVALID, [f"Agent failed: {result['error']}"]
+
+        try:
+            schema.model_validate(result)
+        except ValidationError as e:
+            return INVALID, [
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            ]
+
+        # A parsed LLM answer leaves its raw output behind; without it the agent fell back to defaults
+        raw_key = RAW_OUTPUT_KEYS.get(agent)
+        if raw_key and get_llm_gateway().is_configured() and raw_key not in state:
+            return INVALID, ["Agent fell back to default values instead of a parsed LLM response"]
+
+        issues = getattr(self, f"_consistency_{agent}")(result)
+        return (AMBIGUOUS if issues else VALID), issues
+
+    def _check_summary(self, summary: Any) -> Tuple[str, List[str]]:
+        """Summaries are plain text; require content and flag runaway length"""
+        if not isinstance(summary, str) or not summary.strip():
+            return INVALID, ["summary_result is empty"]
+        word_count = len(summary.split())
+        if word_count < 20:
+            return INVALID, [f"Summary too short ({word_count} words)"]
+        if word_count > 300:
+            return AMBIGUOUS, [f"Summary much longer than requested ({word_count} words)"]
+        return VALID, []
+
+    def _consistency_fake_news(self, result: Dict[str, Any]) -> List[str]:
+        issues = []
+        verified = len(result.get("verified_claims", []))
+        unverified = len(result.get("unverified_claims", []))
+        if result["claims_verified"] != verified:
+            issues.append(f"claims_verified={result['claims_verified']} but {verified} verified claims listed")
+        if result["claims_analyzed"] != verified + unverified:
+            issues.append(f"claims_analyzed={result['claims_analyzed']} but {verified + unverified} claims listed")
+        if result["claims_analyzed"] and abs(result["verification_score"] - verified / result["claims_analyzed"]) > 0.01:
+            issues.append("verification_score does not match the verified claim ratio")
+        return issues
+
+    def _consistency_credibility(self, result: Dict[str, Any]) -> List[str]:
+        issues = []
+        components = (result["source_reputation"] + result["title_content_alignment"]) / 2
+        if abs(result["overall_credibility"] - components) > 0.3:
+            issues.append(
+                f"overall_credibility={result['overall_credibility']:.2f} far from component scores ({components:.2f})"
+            )
+        if not result["evaluation"].strip() or result["evaluation"] == "No conclusion provided":
+            issues.append("evaluation is empty")
+        return issues
+
+    def _consistency_sentiment(self, result: Dict[str, Any]) -> List[str]:
+        issues = []
+        tone = result["emotional_tone"].lower()
+        polarity = result["polarity"]
+        if "positive" in tone and "negative" not in tone and polarity < -0.1:
+            issues.append(f"Tone '{tone}' contradicts negative polarity {polarity}")
+        if "negative" in tone and "positive" not in tone and polarity > 0.1:
+            issues.append(f"Tone '{tone}' contradicts positive polarity {polarity}")
+        if not result["justification"].strip():
+            issues.append("justification is empty")
+        return issues
+
+    async def _llm_validate(self, agent: str, state: AnalysisState, issues: List[str]) -> Tuple[str, List[str]]:
+        """Ask an LLM whether an ambiguous output is acceptable"""
+        gateway = get_llm_gateway()
+        if not gateway.is_configured():
+            logger.warning("No OpenAI API key found in environment variables, accepting ambiguous output")
+            return VALID, []
+
+        result_key = RESULT_SCHEMAS[agent][0] if agent in RESULT_SCHEMAS else "summary_result"
+        system_prompt = f"""
+You are the ValidatorAgent. Another agent ({agent}) analyzed a news article and produced the output below.
+Automatic checks flagged these possible problems:
+{json.dumps(issues, indent=2)}
+
+Decide whether the output is still usable. Return ONLY JSON:
+{{
+  "validation": "pass" or "fail",
+  "reasoning": "short explanation"
+}}
+"""
+        user_prompt = (
+            f"Article Title: {state.get('article_title', '')}\n\n"
+            f"Agent output:\n{json.dumps(state.get(result_key), indent=2, default=str)}"
+        )
+
+        try:
+            logger.info(f"Calling OpenAI to validate ambiguous {agent} output")
+            response = await gateway.chat_completion(
+                "validator",
+                prompt_version=PROMPT_VERSION,
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                temperature=0,
+                response_format=JSON_MODE
+            )
+            verdict = parse_llm_json(response.choices[0].message.content, "validator")
+            if str(verdict.get("validation", "pass")).lower() == "fail":
+                return INVALID, [f"LLM validator: {verdict.get('reasoning', 'no reason given')}"]
+            return VALID, []
+
+        except Exception as e:
+            logger.error(f"Error in LLM validation: {e}")
+            # A broken validator must not block the pipeline
+            return VALID, []
+
@@ -0,0 +1,102 @@
+"""
+Model cascade: a cheaper model answers first, low-confidence answers escalate
+
+With LLM_CASCADE enabled, an agent's request is sent to the first model of
+its tier list. If the answer's confidence is below the agent's threshold the
+request is repeated on the next, stronger model, and so on; the last tier's
+answer is always kept. Confidence is the model's self-reported "confidence"
+field for JSON answers, or an agent-specific validation score. An answer that
+cannot be used at all scores 0 and escalates.
+
+Tiers and thresholds are set per agent:
+
+    LLM_CASCADE_TIERS=gpt-4o-mini,gpt-4o           default for all agents
+    LLM_CASCADE_TIERS_SUMMARY=gpt-4o-mini           one tier = no cascade
+    LLM_CASCADE_THRESHOLD=0.7
+    LLM_CASCADE_THRESHOLD_FAKE_NEWS=0.8
+"""
+
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+from .llm_json import repair_json
+from utils import metrics
+
+LLM_CASCADE = os.environ.get("LLM_CASCADE", "false").lower() == "true"
+DEFAULT_TIERS = os.environ.get("LLM_CASCADE_TIERS", "gpt-4o-mini,gpt-4o")
+DEFAULT_THRESHOLD = float(os.environ.get("LLM_CASCADE_THRESHOLD", "0.7"))
+
+CASCADE_AGENTS = ("fake_news", "credibility", "sentiment", "summary", "fused")
+
+# Scores a response between 0 and 1; None means "no opinion" and accepts it
+ConfidenceFn = Callable[[Any], Optional[float]]
+
+
+def _parse_tiers(value: str) -> List[str]:
+    return [model.strip() for model in value.split(",") if model.strip()]
+
+
+AGENT_TIERS = {
+    agent: _parse_tiers(os.environ.get(f"LLM_CASCADE_TIERS_{agent.upper()}", DEFAULT_TIERS))
+    for agent in CASCADE_AGENTS
+}
+AGENT_THRESHOLDS = {
+    agent: float(os.environ.get(f"LLM_CASCADE_THRESHOLD_{agent.upper()}", DEFAULT_THRESHOLD))
+    for agent in CASCADE_AGENTS
+}
+
+
+def cascade_tiers(agent: str) -> List[str]:
+    """Models an agent's requests go through, cheapest first"""
+    return AGENT_TIERS.get(agent, _parse_tiers(DEFAULT_TIERS))
+
+
+def cascade_threshold(agent: str) -> float:
+    """Confidence below which an agent's answer is escalated"""
+    return AGENT_THRESHOLDS.get(agent, DEFAULT_THRESHOLD)
+
+
+def response_text(response: Any) -> str:
+    try:
+        return response.choices[0].message.content or ""
+    except (AttributeError, IndexError):
+        return ""
+
+
+def json_confidence(response: Any) -> Optional[float]:
+    """
+    Self-reported confidence of a JSON answer.
+
+    Reads a "confidence" field on a 0-1 or 0-100 scale. Answers that are not
+    a JSON object score 0; objects without the field are accepted.
+    """
+    try:
+        data = repair_json(response_text(response))
+    except ValueError:
+        return 0.0
+    if not isinstance(data, dict):
+        return 0.0
+    value = data.get("confidence")
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return max(0.0, min(1.0, value / 100 if value > 1 else float(value)))
+
+
+def record(agent: str, tier: int, model: str, escalated: bool) -> None:
+    metrics.inc("llm_cascade_total", agent=agent, tier=tier, model=model,
+                outcome="escalated" if escalated else "accepted")
+
+
+def cascade_stats() -> Dict[str, Any]:
+    """Answers accepted and escalated per agent and tier, and each agent's escalation rate"""
+    per_agent: Dict[str, Dict[str, Any]] = {}
+    for key, count in metrics.counter_series("llm_cascade_total").items():
+        labels = dict(key)
+        stats = per_agent.setdefault(labels["agent"], {"tiers": {}})
+        tier = stats["tiers"].setdefault(labels["tier"], {"model": labels["model"], "accepted": 0, "escalated": 0})
+        tier[labels["outcome"]] += int(count)
+    for stats in per_agent.values():
+        first = stats["tiers"].get("0", {"accepted": 0, "escalated": 0})
+        total = first["accepted"] + first["escalated"]
+        stats["escalation_rate"] = round(first["escalated"] / total, 4) if total else 0.0
+    return per_agent
@@ -0,0 +1,573 @@
+"""
+Claim verdict cache - verdicts of fact-checked claims shared across articles
+
+Viral claims turn up in many articles, each time phrased a little
+differently. Verifying one costs a web search, several page fetches and an
+LLM call, so verdicts are stored under a hash of the normalized claim text:
+
+  - Unicode NFKC and case folding; punctuation, articles and extra whitespace
+    are dropped
+  - numbers are canonicalized: "1,500", "1.5 thousand" and "one thousand five
+    hundred" all become 1500, and "%" / "per cent" become "percent"
+  - entity aliases are mapped to one name ("U.S.", "USA" -> "united states");
+    CLAIM_ALIASES_FILE may add aliases as a JSON object of alias -> name
+
+Each entry keeps the verdict, its reason, the evidence URLs and when it was
+made. Entries expire after CLAIM_CACHE_TTL_HOURS, since facts change, and can
+be invalidated explicitly. Like the LLM response cache, an in-memory LRU tier
+sits in front of a SQLite tier that survives restarts.
+
+With CLAIM_SEMANTIC_MATCH, a claim without an exact match reuses the verdict
+of the most similar stored claim (see claim_index.py) if their similarity is
+at least CLAIM_SIMILARITY_THRESHOLD and they state the same facts: the same
+numbers, the same negation and, for hashed n-gram vectors, the same content
+words up to inflection and order. Each verdict's vector is stored next to it
+in SQLite, so a restart loads the index instead of re-embedding every claim;
+warm_index() builds it in a worker thread rather than on the event loop.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .claim_index import FlatIndex, HashedNgramEmbedder, content_words, make_embedder, make_index
+from utils import metrics
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+CLAIM_CACHE_ENABLED = os.environ.get("CLAIM_CACHE", "true").lower() == "true"
+CLAIM_CACHE_PATH = os.environ.get("CLAIM_CACHE_PATH", "claim_verdicts.sqlite3")
+CLAIM_CACHE_MEMORY_ENTRIES = int(os.environ.get("CLAIM_CACHE_MEMORY_ENTRIES", "2048"))
+CLAIM_CACHE_TTL = float(os.environ.get("CLAIM_CACHE_TTL_HOURS", "48")) * 3600
+CLAIM_ALIASES_FILE = os.environ.get("CLAIM_ALIASES_FILE")
+CLAIM_SEMANTIC_MATCH = os.environ.get("CLAIM_SEMANTIC_MATCH", "true").lower() == "true"
+CLAIM_SIMILARITY_THRESHOLD = float(os.environ.get("CLAIM_SIMILARITY_THRESHOLD", "0.85"))
+
+ENTITY_ALIASES = {
+    "u.s.": "united states",
+    "u.s.a.": "united states",
+    "usa": "united states",
+    "united states of america": "united states",
+    "america": "united states",
+    "u.k.": "united kingdom",
+    "uk": "united kingdom",
+    "great britain": "united kingdom",
+    "britain": "united kingdom",
+    "e.u.": "european union",
+    "eu": "european union",
+    "u.n.": "united nations",
+    "covid-19": "covid-19",
+    "covid 19": "covid-19",
+    "covid": "covid-19",
+    "covid19": "covid-19",
+    "coronavirus": "covid-19",
+    "sars-cov-2": "covid-19",
+}
+# Aliases that name something else after one of these words ("latin america" is not the united states)
+ALIAS_QUALIFIERS = {
+    "america": {"latin", "south", "central", "north", "meso", "middle", "anglo", "pan"},
+}
+
+_UNITS = {
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13,
+    "fourteen": 14, "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18,
+    "nineteen": 19, "twenty": 20, "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60,
+    "seventy": 70, "eighty": 80, "ninety": 90,
+}
+_SCALES = {"thousand": 10 ** 3, "million": 10 ** 6, "billion": 10 ** 9, "trillion": 10 ** 12}
+_ARTICLES = {"a", "an", "the"}
+# Words that flip a claim; "isn't" is normalized to "isn t"
+_NEGATIONS = {"not", "no", "never", "nor", "without", "t"}
+_NUMBER = re.compile(r"^\d+(\.\d+)?$")
+
+
+def _load_aliases() -> Dict[str, str]:
+    aliases = dict(ENTITY_ALIASES)
+    if CLAIM_ALIASES_FILE:
+        try:
+            with open(CLAIM_ALIASES_FILE, "r", encoding="utf-8") as f:
+                aliases.update({alias.casefold(): name.casefold() for alias, name in json.load(f).items()})
+        except Exception as e:
+            logger.error(f"Error loading claim aliases from {CLAIM_ALIASES_FILE}: {str(e)}")
+    return aliases
+
+
+_aliases = _load_aliases()
+# Longest aliases first so "united states of america" wins over "america"
+_ALIAS_PATTERN = re.compile(
+    r"(?<!\w)(" + "|".join(re.escape(alias) for alias in sorted(_aliases, key=len, reverse=True)) + r")(?!\w)"
+)
+_PRECEDING_WORD = re.compile(r"(\w+)[\s-]*$")
+
+
+def _expand_alias(match: re.Match) -> str:
+    alias = match.group(1)
+    qualifiers = ALIAS_QUALIFIERS.get(alias)
+    if qualifiers:
+        preceding = _PRECEDING_WORD.search(match.string, 0, match.start())
+        if preceding and preceding.group(1) in qualifiers:
+            return alias
+    return _aliases[alias]
+
+
+def _format_number(value: Decimal) -> str:
+    return format(value.normalize(), "f")
+
+
+def _canonical_numbers(tokens: List[str]) -> List[str]:
+    """Fold number words, digits and scale words into one number token each"""
+    out: List[str] = []
+    total = current = None
+    for token in tokens + [""]:
+        if token in _UNITS or token == "hundred" or token in _SCALES or _NUMBER.match(token):
+            if _NUMBER.match(token):
+                if current is not None:
+                    # "5 6" are two numbers, not one
+                    out.append(_format_number(Decimal(total or 0) + current))
+                    total = None
+                current = Decimal(token)
+            elif token in _UNITS:
+                current = (current or 0) + _UNITS[token]
+            elif token == "hundred":
+                current = (current or 1) * 100
+            else:
+                total = (total or 0) + (current if current is not None else 1) * _SCALES[token]
+                current = None
+            continue
+        if token == "and" and current is not None and total is not None:
+            # "one thousand and five"
+            continue
+        if current is not None or total is not None:
+            out.append(_format_number(Decimal(total or 0) + (current or 0)))
+            total = current = None
+        if token:
+            out.append(token)
+    return out
+
+
+def normalize_claim(claim: str) -> str:
+    """Canonical form of a claim's text; differently worded copies of a claim map to the same string"""
+    text = unicodedata.normalize("NFKC", claim or "").casefold()
+    text = _ALIAS_PATTERN.sub(_expand_alias, text)
+    # Thousands separators, percentages and currency amounts
+    text = re.sub(r"(?<=\d),(?=\d{3}\b)", "", text)
+    text = re.sub(r"%|\bper\s+cent\b", " percent ", text)
+    text = re.sub(r"\$\s*(\d[\d.]*(?:\s+(?:thousand|million|billion|trillion))?)", r"\1 dollars", text)
+    # Keep decimal points, drop all other punctuation
+    text = re.sub(r"[^\w\s.]|_", " ", text)
+    text = re.sub(r"(?<!\d)\.|\.(?!\d)", " ", text)
+    tokens = [token for token in text.split() if token not in _ARTICLES]
+    try:
+        tokens = _canonical_numbers(tokens)
+    except InvalidOperation:
+        pass
+    return " ".join(tokens)
+
+
+def claim_key(claim: str) -> str:
+    """Cache key of a claim"""
+    return hashlib.sha256(normalize_claim(claim).encode("utf-8")).hexdigest()
+
+
+def same_facts(first: str, second: str, lexical: bool = False) -> bool:
+    """
+    Whether two normalized claims can share a verdict.
+
+    Their numbers and negations must agree; with lexical, so must their
+    content words, which word-overlap similarity alone cannot vouch for.
+    Hashed n-gram matches are therefore limited to reorderings and
+    inflections; paraphrases need a sentence-transformers embedder.
+    """
+    first_words, second_words = first.split(), second.split()
+    if sorted(w for w in first_words if _NUMBER.match(w)) != sorted(w for w in second_words if _NUMBER.match(w)):
+        return False
+    if sum(w in _NEGATIONS for w in first_words) % 2 != sum(w in _NEGATIONS for w in second_words) % 2:
+        return False
+    return not lexical or set(content_words(first)) == set(content_words(second))
+
+
+class ClaimVerdictCache:
+    """
+    Two-tier store of claim verdicts keyed by normalized claim text.
+
+    Lookups check the memory LRU first, then SQLite; hits and misses are
+    counted for stats() and the claim_verdict_lookups_total metric.
+    """
+    def __init__(
+        self,
+        path: Optional[str] = CLAIM_CACHE_PATH,
+        memory_entries: int = CLAIM_CACHE_MEMORY_ENTRIES,
+        ttl: float = CLAIM_CACHE_TTL,
+        enabled: bool = CLAIM_CACHE_ENABLED,
+        semantic: bool = CLAIM_SEMANTIC_MATCH,
+        threshold: float = CLAIM_SIMILARITY_THRESHOLD,
+        embedder=None
+    ):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self.semantic = semantic
+        self.threshold = threshold
+        self._embedder = embedder
+        # Built from the stored claims by warm_index() or the first semantic lookup
+        self._index: Optional[FlatIndex] = None
+        self._build_lock = threading.Lock()
+        self._index_lock = threading.Lock()
+        # Index updates made while the index is being built, replayed onto it afterwards
+        self._pending: Optional[List[Tuple[str, Optional[np.ndarray]]]] = None
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._stats = {"hits": 0, "semantic_hits": 0, "misses": 0, "expired": 0, "stored": 0, "invalidated": 0}
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> Optional[sqlite3.Connection]:
+        if self._conn is None and self.path:
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._conn = sqlite3.connect(self.path, check_same_thread=False)
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS verdicts ("
+                    " key TEXT PRIMARY KEY, normalized TEXT NOT NULL, payload TEXT NOT NULL,"
+                    " created_at REAL NOT NULL, embedding BLOB, embedder TEXT)"
+                )
+                # Stores written before vectors were persisted get the columns; their rows are embedded once
+                columns = {row[1] for row in self._conn.execute("PRAGMA table_info(verdicts)")}
+                for column, kind in (("embedding", "BLOB"), ("embedder", "TEXT")):
+                    if column not in columns:
+                        self._conn.execute(f"ALTER TABLE verdicts ADD COLUMN {column} {kind}")
+                self._conn.commit()
+            except Exception as e:
+                logger.error(f"Error opening claim verdict cache at {self.path}, using memory only: {str(e)}")
+                self.path = None
+                self._conn = None
+        return self._conn
+
+    def _remember(self, key: str, entry: Dict[str, Any]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _count(self, outcome: str) -> None:
+        self._stats[outcome] += 1
+        metrics.inc("claim_verdict_lookups_total", outcome=outcome)
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._memory.get(key)
+        if entry is None:
+            db = self._db()
+            if db is not None:
+                try:
+                    row = db.execute("SELECT payload FROM verdicts WHERE key = ?", (key,)).fetchone()
+                    if row is not None:
+                        entry = json.loads(row[0])
+                except Exception as e:
+                    logger.error(f"Error reading claim verdict cache: {str(e)}")
+        return entry
+
+    def get(self, claim: str) -> Optional[Dict[str, Any]]:
+        """
+        The stored verdict of a claim, or None.
+
+        Verdicts have the keys found, reason, score, evidence (URLs),
+        normalized_claim and verified_at (a Unix timestamp). A verdict
+        matched by similarity also has the key similarity.
+        """
+        if not self.enabled:
+            return None
+        key = claim_key(claim)
+        entry = self._load(key)
+        if entry is not None and time.time() - entry["verified_at"] > self.ttl:
+            self._drop(key)
+            self._count("expired")
+            return None
+        if entry is None and self.semantic:
+            match = self._similar(normalize_claim(claim))
+            if match is not None:
+                key, entry, similarity = match
+                self._remember(key, entry)
+                self._count("semantic_hits")
+                return {**entry, "similarity": round(similarity, 4)}
+        if entry is None:
+            self._count("misses")
+            return None
+        self._remember(key, entry)
+        self._count("hits")
+        return dict(entry)
+
+    def _get_embedder(self):
+        if self._embedder is None:
+            self._embedder = make_embedder()
+        return self._embedder
+
+    def _embedding_tag(self) -> str:
+        """Identifies the vector space; stored vectors from another embedder are recomputed"""
+        embedder = self._get_embedder()
+        return f"{embedder.name}/{embedder.dim}"
+
+    def _update_index(self, key: str, vector: Optional[np.ndarray] = None) -> None:
+        """Add a claim's vector to the index, or remove the claim when vector is None"""
+        with self._index_lock:
+            if self._index is not None:
+                if vector is None:
+                    self._index.remove(key)
+                else:
+                    self._index.add(key, vector)
+            elif self._pending is not None:
+                self._pending.append((key, vector))
+
+    def _semantic_index(self, wait: bool = True) -> Optional[FlatIndex]:
+        """
+        The vector index of the stored claims, built on first use.
+
+        Without wait, returns None instead of waiting while another thread
+        builds it, so lookups on the event loop never block on the build.
+        """
+        if self._index is None:
+            if not self._build_lock.acquire(blocking=wait):
+                return None
+            try:
+                if self._index is None:
+                    with self._index_lock:
+                        self._pending = []
+                    index = self._build_index()
+                    with self._index_lock:
+                        # Claims stored or dropped during the build
+                        for key, vector in self._pending:
+                            if vector is None:
+                                index.remove(key)
+                            else:
+                                index.add(key, vector)
+                        self._pending = None
+                        self._index = index
+            finally:
+                self._build_lock.release()
+        return self._index
+
+    def _build_index(self) -> FlatIndex:
+        """Load the stored vectors, embedding only claims stored without one (or by another embedder)"""
+        embedder = self._get_embedder()
+        tag = self._embedding_tag()
+        index = make_index(embedder.dim)
+        loaded = embedded = 0
+        if self._db() is None:
+            # Claims only held in memory (no SQLite tier)
+            claims = {key: entry["normalized_claim"] for key, entry in list(self._memory.items())}
+            keys = list(claims)
+            for start in range(0, len(keys), 10000):
+                batch = keys[start:start + 10000]
+                index.add_many(batch, embedder.embed_many([claims[key] for key in batch]))
+            embedded = len(keys)
+        else:
+            # The build runs in a worker thread while lookups and writes use the main connection
+            conn = None
+            try:
+                conn = sqlite3.connect(self.path, timeout=30)
+                last = ""
+                while True:
+                    # One statement per page, so no cursor stays open across the writes below
+                    rows = conn.execute(
+                        "SELECT key, normalized, embedding, embedder FROM verdicts WHERE key > ? ORDER BY key LIMIT 10000",
+                        (last,)
+                    ).fetchall()
+                    if not rows:
+                        break
+                    last = rows[-1][0]
+                    keys, vectors, missing = [], [], []
+                    for key, normalized, blob, stored_tag in rows:
+                        if blob is not None and stored_tag == tag:
+                            keys.append(key)
+                            vectors.append(np.frombuffer(blob, dtype=np.float32))
+                        else:
+                            missing.append((key, normalized))
+                    if keys:
+                        index.add_many(keys, np.stack(vectors))
+                        loaded += len(keys)
+                    if missing:
+                        fresh = embedder.embed_many([normalized for _, normalized in missing])
+                        index.add_many([key for key, _ in missing], fresh)
+                        conn.executemany(
+                            "UPDATE verdicts SET embedding = ?, embedder = ? WHERE key = ?",
+                            [(vector.astype(np.float32).tobytes(), tag, key) for (key, _), vector in zip(missing, fresh)]
+                        )
+                        conn.commit()
+                        embedded += len(missing)
+            except Exception as e:
+                logger.error(f"Error reading claims for the claim index: {str(e)}")
+            finally:
+                if conn is not None:
+                    conn.close()
+        logger.info(f"Built claim index with {embedder.name} vectors: {loaded} loaded, {embedded} embedded")
+        return index
+
+    async def warm_index(self) -> None:
+        """Build the claim index in a worker thread so lookups do not build it on the event loop"""
+        if self.enabled and self.semantic and self._index is None:
+            # Open (and migrate) the store here, so the worker only reads the connection attribute
+            self._db()
+            await asyncio.to_thread(self._semantic_index, False)
+
+    def _similar(self, normalized: str) -> Optional[Tuple[str, Dict[str, Any], float]]:
+        """(key, verdict, similarity) of the closest stored claim stating the same facts, if close enough"""
+        index = self._semantic_index(wait=False)
+        if index is None:
+            # Still being built: exact matches only until it is ready
+            return None
+        vector = self._get_embedder().embed(normalized)
+        lexical = isinstance(self._embedder, HashedNgramEmbedder)
+        now = time.time()
+        for key, similarity in index.search(vector, k=3):
+            if similarity < self.threshold:
+                break
+            entry = self._load(key)
+            if entry is None or now - entry["verified_at"] > self.ttl:
+                continue
+            if same_facts(normalized, entry["normalized_claim"], lexical):
+                logger.info(f"Claim matches {entry['normalized_claim']!r} with similarity {similarity:.3f}")
+                return key, entry, similarity
+        return None
+
+    def put(self, claim: str, verdict: Dict[str, Any], evidence: List[str]) -> None:
+        """Store the verdict on a claim, with the URLs of the evidence it was based on"""
+        if not self.enabled:
+            return
+        key = claim_key(claim)
+        entry = {
+            "found": verdict.get("found", False),
+            "reason": verdict.get("reason", ""),
+            "score": verdict.get("score", 0),
+            "evidence": list(evidence),
+            "normalized_claim": normalize_claim(claim),
+            "verified_at": time.time(),
+        }
+        self._remember(key, entry)
+        self._stats["stored"] += 1
+        blob = tag = None
+        if self.semantic:
+            vector = self._get_embedder().embed(entry["normalized_claim"])
+            self._update_index(key, vector)
+            blob, tag = vector.astype(np.float32).tobytes(), self._embedding_tag()
+
+        db = self._db()
+        if db is None:
+            return
+        try:
+            db.execute(
+                "INSERT OR REPLACE INTO verdicts (key, normalized, payload, created_at, embedding, embedder)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, entry["normalized_claim"], json.dumps(entry, ensure_ascii=False), entry["verified_at"], blob, tag)
+            )
+            db.execute("DELETE FROM verdicts WHERE created_at < ?", (entry["verified_at"] - self.ttl,))
+            db.commit()
+        except Exception as e:
+            logger.error(f"Error writing claim verdict cache: {str(e)}")
+
+    def _drop(self, key: str) -> int:
+        dropped = 1 if self._memory.pop(key, None) is not None else 0
+        self._update_index(key)
+        db = self._db()
+        if db is not None:
+            try:
+                dropped = max(dropped, db.execute("DELETE FROM verdicts WHERE key = ?", (key,)).rowcount)
+                db.commit()
+            except Exception as e:
+                logger.error(f"Error deleting from claim verdict cache: {str(e)}")
+        return dropped
+
+    def invalidate(self, claim: Optional[str] = None, containing: Optional[str] = None) -> int:
+        """
+        Forget verdicts, e.g. after the facts changed; returns how many were dropped.
+
+        Drops the verdict on `claim`, the verdicts on all claims whose
+        normalized text contains the normalized `containing`, or everything
+        when neither is given.
+        """
+        if claim is not None:
+            dropped = self._drop(claim_key(claim))
+        else:
+            needle = normalize_claim(containing) if containing is not None else None
+            keys = {key for key, entry in self._memory.items()
+                    if needle is None or needle in entry["normalized_claim"]}
+            for key in keys:
+                del self._memory[key]
+            dropped = len(keys)
+            db = self._db()
+            if db is not None:
+                try:
+                    if needle is None:
+                        stored = db.execute("SELECT key FROM verdicts").fetchall()
+                        db.execute("DELETE FROM verdicts")
+                    else:
+                        stored = db.execute("SELECT key FROM verdicts WHERE instr(normalized, ?) > 0",
+                                            (needle,)).fetchall()
+                        db.execute("DELETE FROM verdicts WHERE instr(normalized, ?) > 0", (needle,))
+                    dropped = max(dropped, len(stored))
+                    db.commit()
+                    keys.update(key for key, in stored)
+                except Exception as e:
+                    logger.error(f"Error invalidating claim verdict cache: {str(e)}")
+            # The rest of the index stays valid
+            for key in keys:
+                self._update_index(key)
+        self._stats["invalidated"] += dropped
+        logger.info(f"Invalidated {dropped} claim verdicts")
+        return dropped
+
+    def stats(self) -> Dict[str, Any]:
+        """Lookups, hit rate (exact and semantic hits) and size"""
+        hits = self._stats["hits"] + self._stats["semantic_hits"]
+        lookups = hits + self._stats["misses"] + self._stats["expired"]
+        entries = len(self._memory)
+        db = self._db()
+        if db is not None:
+            try:
+                entries = db.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+            except Exception as e:
+                logger.error(f"Error reading claim verdict cache size: {str(e)}")
+        return {
+            "enabled": self.enabled,
+            **self._stats,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "entries": entries,
+            "semantic_match": self.semantic,
+            "index_entries": len(self._index) if self._index is not None else None,
+            "ttl_hours": round(self.ttl / 3600, 2),
+        }
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+_cache: Optional[ClaimVerdictCache] = None
+
+
+def get_claim_cache() -> ClaimVerdictCache:
+    """Return the process-wide claim verdict cache"""
+    global _cache
+    if _cache is None:
+        _cache = ClaimVerdictCache()
+    return _cache
+
+
+def set_claim_cache(cache: Optional[ClaimVerdictCache]) -> None:
+    """Replace the process-wide cache (e.g. with an in-memory one in tests); None resets it"""
+    global _cache
+    _cache = cache
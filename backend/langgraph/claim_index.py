@@ -0,0 +1,298 @@
+"""
+Claim embeddings and an in-process vector index for near-duplicate claims
+
+The claim verdict cache only matches claims whose normalized text is equal.
+Rewordings ("tariffs on jam in the EU exceed 24%" / "EU jam tariff exceeds
+24%") are found by embedding each verified claim and searching for the most
+similar stored one:
+
+  - HashedNgramEmbedder (default) hashes word unigrams, bigrams and character
+    4-grams of the normalized claim into a fixed number of signed dimensions.
+    It needs no model and catches reordering, inflection and added words, but
+    not paraphrases: claims sharing few words ("EU tariffs on jam exceed 24%"
+    / "Europe charges over 24% duty on US jam") are far apart, and the cache
+    additionally requires hashed matches to have the same content words.
+  - SentenceTransformerEmbedder runs a local CPU model (the optional
+    sentence-transformers package) and also catches paraphrases with
+    different words, at a few milliseconds per claim. Select it with
+    CLAIM_EMBEDDER when paraphrases matter; hashed vectors stay the fallback
+    when the package or model is unavailable.
+
+Vectors are L2-normalized, so a dot product is their cosine similarity.
+FlatIndex scans every stored vector with one matrix-vector product, which is
+exact and fast enough for small stores. IVFIndex clusters the vectors with
+k-means once the store reaches CLAIM_IVF_MIN_SIZE and scans only the
+CLAIM_IVF_NPROBE clusters nearest to the query, trading a little recall for
+latency on large stores (see benchmarks/bench_claim_index.py).
+"""
+
+import functools
+import hashlib
+import logging
+import math
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .fast_analysis import STOPWORDS
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# "hashed" or "sentence-transformers:<model name>". Hashed matches only share
+# verdicts between claims with the same content words (reordered or
+# inflected); matching paraphrases needs a sentence-transformers model.
+CLAIM_EMBEDDER = os.environ.get("CLAIM_EMBEDDER", "hashed")
+CLAIM_EMBEDDING_DIM = int(os.environ.get("CLAIM_EMBEDDING_DIM", "256"))
+# "flat" (brute force) or "ivf"
+CLAIM_INDEX = os.environ.get("CLAIM_INDEX", "flat").lower()
+CLAIM_IVF_MIN_SIZE = int(os.environ.get("CLAIM_IVF_MIN_SIZE", "20000"))
+CLAIM_IVF_NPROBE = int(os.environ.get("CLAIM_IVF_NPROBE", "8"))
+
+# Relative weights of the hashed features
+_WORD_WEIGHT = 1.0
+_BIGRAM_WEIGHT = 0.5
+_CHAR_WEIGHT = 0.25
+_CHAR_NGRAM = 4
+
+
+def _stem(word: str) -> str:
+    """Crude suffix stripping so "tariffs" and "tariff", "exceeds" and "exceeded" share features"""
+    if len(word) <= 4 or word.endswith(("ss", "us", "is", "eed")):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    for suffix in ("ing", "ed", "s"):
+        if word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def content_words(text: str) -> List[str]:
+    """Stemmed words of a normalized claim without stopwords and stray letters"""
+    return [_stem(word) for word in text.split() if word not in STOPWORDS and (len(word) > 1 or word.isdigit())]
+
+
+@functools.lru_cache(maxsize=1 << 18)
+def _hash(feature: str) -> int:
+    # Claims share most of their words and n-grams, so hashes are worth caching
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class HashedNgramEmbedder:
+    """Signed feature hashing of a normalized claim's words, word pairs and character n-grams"""
+    name = "hashed"
+
+    def __init__(self, dim: int = CLAIM_EMBEDDING_DIM):
+        self.dim = dim
+
+    def _features(self, text: str) -> Dict[str, float]:
+        words = content_words(text)
+        features: Dict[str, float] = {}
+        for word in words:
+            features[f"w:{word}"] = features.get(f"w:{word}", 0.0) + _WORD_WEIGHT
+            padded = f"<{word}>"
+            for i in range(len(padded) - _CHAR_NGRAM + 1):
+                gram = f"c:{padded[i:i + _CHAR_NGRAM]}"
+                features[gram] = features.get(gram, 0.0) + _CHAR_WEIGHT
+        for first, second in zip(words, words[1:]):
+            features[f"b:{first} {second}"] = _BIGRAM_WEIGHT
+        return features
+
+    def embed(self, text: str) -> np.ndarray:
+        features = self._features(text)
+        hashes = [_hash(feature) for feature in features]
+        # One hash bit picks the sign so collisions cancel out on average
+        weights = [weight if hashed >> 63 else -weight for hashed, weight in zip(hashes, features.values())]
+        vector = np.bincount([hashed % self.dim for hashed in hashes], weights, minlength=self.dim).astype(np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def embed_many(self, texts: Sequence[str]) -> np.ndarray:
+        return np.stack([self.embed(text) for text in texts]) if texts else np.zeros((0, self.dim), np.float32)
+
+
+class SentenceTransformerEmbedder:
+    """A local sentence embedding model on the CPU"""
+    def __init__(self, model_name: str):
+        # Optional dependency, only needed when CLAIM_EMBEDDER selects it
+        from sentence_transformers import SentenceTransformer
+        self.name = f"sentence-transformers:{model_name}"
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts: Sequence[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), np.float32)
+        return self.model.encode(list(texts), normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+
+def make_embedder(spec: str = CLAIM_EMBEDDER):
+    """The embedder named by CLAIM_EMBEDDER, falling back to hashed n-grams"""
+    if spec.startswith("sentence-transformers:"):
+        try:
+            return SentenceTransformerEmbedder(spec.split(":", 1)[1])
+        except Exception as e:
+            logger.error(f"Could not load claim embedding model {spec}, using hashed n-grams: {str(e)}")
+    elif spec != "hashed":
+        logger.error(f"Unknown claim embedder {spec!r}, using hashed n-grams")
+    return HashedNgramEmbedder()
+
+
+class FlatIndex:
+    """
+    Exact nearest-neighbour search by scanning all vectors.
+
+    Vectors must be L2-normalized; scores are cosine similarities. Keys can
+    be replaced and removed; removed rows are zeroed and skipped.
+    """
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._vectors = np.zeros((1024, dim), dtype=np.float32)
+        self._keys: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _reserve(self, size: int) -> None:
+        if size > len(self._vectors):
+            grown = np.zeros((max(size, 2 * len(self._vectors)), self.dim), dtype=np.float32)
+            grown[:len(self._keys)] = self._vectors[:len(self._keys)]
+            self._vectors = grown
+
+    def add(self, key: str, vector: np.ndarray) -> None:
+        self.add_many([key], vector[np.newaxis, :])
+
+    def add_many(self, keys: Sequence[str], vectors: np.ndarray) -> None:
+        """Add or replace many vectors at once (e.g. when loading a store)"""
+        start = len(self._keys)
+        self._reserve(start + len(keys))
+        for key, vector in zip(keys, vectors):
+            row = self._rows.get(key)
+            if row is None:
+                row = self._rows[key] = len(self._keys)
+                self._keys.append(key)
+            self._vectors[row] = vector
+        self._grown(start)
+
+    def _grown(self, start: int) -> None:
+        """Hook for subclasses: rows from start on were appended"""
+
+    def remove(self, key: str) -> bool:
+        row = self._rows.pop(key, None)
+        if row is None:
+            return False
+        self._vectors[row] = 0
+        self._keys[row] = None
+        return True
+
+    def _candidates(self, vector: np.ndarray) -> Optional[np.ndarray]:
+        """Rows to score for a query; None scores all of them"""
+        return None
+
+    def search(self, vector: np.ndarray, k: int = 1) -> List[Tuple[str, float]]:
+        """The k most similar stored keys with their cosine similarity, best first"""
+        if not self._rows:
+            return []
+        rows = self._candidates(vector)
+        if rows is None:
+            scores = self._vectors[:len(self._keys)] @ vector
+            rows = np.arange(len(scores))
+        else:
+            scores = self._vectors[rows] @ vector
+        # A few spare candidates in case some of the best rows were removed
+        top = min(len(scores), k + 8)
+        best = np.argpartition(scores, len(scores) - top)[-top:] if top < len(scores) else np.arange(len(scores))
+        best = best[np.argsort(-scores[best])]
+        results = []
+        for i in best:
+            key = self._keys[rows[i]]
+            if key is not None:
+                results.append((key, float(scores[i])))
+            if len(results) == k:
+                break
+        return results
+
+
+class IVFIndex(FlatIndex):
+    """
+    Inverted-file index: approximate search over the nearest clusters.
+
+    Until the index holds min_size vectors it searches like FlatIndex. It
+    then clusters them with spherical k-means into about sqrt(n) lists and
+    scores only the members of the nprobe lists whose centroids are most
+    similar to the query. Vectors added later join their nearest list; the
+    clusters are retrained when the index has doubled since the last training.
+    """
+    def __init__(self, dim: int, min_size: int = CLAIM_IVF_MIN_SIZE, nprobe: int = CLAIM_IVF_NPROBE,
+                 iterations: int = 8, seed: int = 0):
+        super().__init__(dim)
+        self.min_size = min_size
+        self.nprobe = nprobe
+        self.iterations = iterations
+        self.rng = np.random.default_rng(seed)
+        self.centroids: Optional[np.ndarray] = None
+        self._trained_size = 0
+        self._lists: List[np.ndarray] = []
+        self._extra: List[List[int]] = []
+
+    def _assign(self, vectors: np.ndarray, chunk: int = 65536) -> np.ndarray:
+        labels = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), chunk):
+            labels[start:start + chunk] = np.argmax(vectors[start:start + chunk] @ self.centroids.T, axis=1)
+        return labels
+
+    def train(self) -> None:
+        """Cluster the stored vectors and rebuild the inverted lists"""
+        size = len(self._keys)
+        vectors = self._vectors[:size]
+        nlist = max(1, int(math.sqrt(size)))
+        # k-means on a sample; 64 points per centroid are plenty
+        sample = vectors[self.rng.choice(size, min(size, 64 * nlist), replace=False)]
+        centroids = sample[self.rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(self.iterations):
+            self.centroids = centroids
+            labels = self._assign(sample)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Empty clusters keep their old centroid
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+        self.centroids = centroids
+        labels = self._assign(vectors)
+        order = np.argsort(labels, kind="stable")
+        bounds = np.searchsorted(labels[order], np.arange(nlist + 1))
+        self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(nlist)]
+        self._extra = [[] for _ in range(nlist)]
+        self._trained_size = size
+        logger.info(f"Trained IVF claim index: {size} vectors in {nlist} lists")
+
+    def _grown(self, start: int) -> None:
+        if len(self._keys) >= max(self.min_size, 2 * self._trained_size):
+            self.train()
+        elif self.centroids is not None:
+            # A replaced vector stays in its old list until the next training
+            for row, label in zip(range(start, len(self._keys)), self._assign(self._vectors[start:len(self._keys)])):
+                self._extra[label].append(row)
+
+    def _candidates(self, vector: np.ndarray) -> Optional[np.ndarray]:
+        if self.centroids is None:
+            return None
+        similarities = self.centroids @ vector
+        probe = np.argpartition(-similarities, min(self.nprobe, len(similarities)) - 1)[:self.nprobe]
+        parts = [self._lists[i] for i in probe] + [np.asarray(self._extra[i], dtype=np.int64) for i in probe]
+        return np.concatenate(parts)
+
+
+def make_index(dim: int, kind: str = CLAIM_INDEX) -> FlatIndex:
+    """The index named by CLAIM_INDEX"""
+    if kind == "ivf":
+        return IVFIndex(dim)
+    if kind != "flat":
+        logger.error(f"Unknown claim index {kind!r}, using flat")
+    return FlatIndex(dim)
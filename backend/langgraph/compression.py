@@ -0,0 +1,155 @@
+"""
+Extractive pre-compression of article text before LLM prompts
+
+Scraped articles carry boilerplate (newsletter prompts, captions, "read more"
+links), long quotes and repetition, and every agent pays for those tokens.
+With ARTICLE_COMPRESSION enabled, articles over the compression budget are
+reduced once per job to their most central sentences: each sentence is scored
+by its mean TF-IDF cosine similarity to the rest of the article plus its
+similarity to the title, calls to action ("subscribe", "read more") are
+dropped, near-copies of a sentence already kept are skipped, and the best
+sentences are kept up to the budget in their original order. Sentences are
+copied verbatim, never rewritten.
+
+Agents read the compressed view through article_view(). The full text stays
+in state["article_content"] for the head node's routing and for claim
+extraction, which quotes the article and needs the sentences compression
+drops (prompts.claim_source_message).
+"""
+
+import logging
+import os
+import re
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from .fast_analysis import split_sentences, tfidf_matrix, tokenize, STOPWORDS
+from .tokens import count_tokens
+from utils import metrics
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+ARTICLE_COMPRESSION = os.environ.get("ARTICLE_COMPRESSION", "false").lower() == "true"
+# Articles up to this many tokens are sent as they are; longer ones are cut down to it
+ARTICLE_COMPRESSION_BUDGET = int(os.environ.get("ARTICLE_COMPRESSION_BUDGET", "1500"))
+
+# Sentences more similar than this to one already kept add nothing new
+REDUNDANCY_THRESHOLD = 0.8
+# Quotes carry colour more than facts; their centrality is discounted
+QUOTE_WEIGHT = 0.7
+# Fragments with fewer content words are treated as boilerplate
+MIN_CONTENT_WORDS = 4
+
+_QUOTE = re.compile(r"^[\"“”']|[\"“”']$")
+_BOILERPLATE = re.compile(
+    r"\b(subscribe|subscription|newsletter|sign up|log in|read more|click here|share this|"
+    r"advertisement|cookies?|all rights reserved|follow us|download our app|getty images|"
+    r"(updated|corrected) (with|to)|this (article|story) was updated)\b|\b(photo|image|credit):",
+    re.IGNORECASE
+)
+
+
+def _sentences_by_paragraph(text: str) -> List[Tuple[int, str]]:
+    return [
+        (paragraph_index, sentence)
+        for paragraph_index, paragraph in enumerate(p for p in re.split(r"\n\s*\n|\n", text) if p.strip())
+        for sentence in split_sentences(paragraph)
+    ]
+
+
+def sentence_scores(sentences: List[str], title: str = "") -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Score of each sentence and the sentence-by-sentence cosine similarity.
+
+    Boilerplate and fragments score -inf. Among equal scores earlier
+    sentences win, as news leads with its most important facts.
+    """
+    # The title is an extra row so that it shares the vocabulary and IDF
+    matrix = tfidf_matrix(sentences + [title])
+    title_similarity = matrix[:-1] @ matrix[-1]
+    matrix = matrix[:-1]
+    similarity = matrix @ matrix.T
+    np.fill_diagonal(similarity, 0)
+    scores = similarity.sum(axis=1) / max(1, len(sentences) - 1) + title_similarity
+    scores += 1e-3 * (1 - np.arange(len(sentences)) / len(sentences))
+
+    content_words = np.array([
+        sum(1 for token in tokenize(sentence) if token not in STOPWORDS and len(token) > 2)
+        for sentence in sentences
+    ])
+    quoted = np.array([bool(_QUOTE.search(sentence)) for sentence in sentences])
+    boilerplate = np.array([bool(_BOILERPLATE.search(sentence)) for sentence in sentences])
+    scores = np.where(quoted, scores * QUOTE_WEIGHT, scores)
+    scores = np.where((content_words < MIN_CONTENT_WORDS) | boilerplate, -np.inf, scores)
+    return scores, similarity
+
+
+def compress_text(text: str, max_tokens: int, title: str = "") -> str:
+    """
+    Keep the most central sentences of text up to max_tokens, in their original order.
+
+    Paragraph breaks between kept sentences are preserved. Text within the
+    budget is returned unchanged.
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+    located = _sentences_by_paragraph(text)
+    if len(located) < 2:
+        return text
+    sentences = [sentence for _, sentence in located]
+    scores, similarity = sentence_scores(sentences, title)
+    lengths = [count_tokens(sentence) + 1 for sentence in sentences]
+
+    kept: List[int] = []
+    used = 0
+    for index in np.argsort(-scores, kind="stable"):
+        if scores[index] == -np.inf:
+            break
+        if used + lengths[index] > max_tokens:
+            continue
+        if kept and similarity[index, kept].max() > REDUNDANCY_THRESHOLD:
+            continue
+        kept.append(int(index))
+        used += lengths[index]
+
+    paragraphs: List[List[str]] = []
+    last_paragraph = None
+    for index in sorted(kept):
+        paragraph_index, sentence = located[index]
+        if paragraph_index != last_paragraph:
+            paragraphs.append([])
+            last_paragraph = paragraph_index
+        paragraphs[-1].append(sentence)
+    return "\n\n".join(" ".join(paragraph) for paragraph in paragraphs)
+
+
+def compress_article(state: Dict[str, Any], max_tokens: int = ARTICLE_COMPRESSION_BUDGET) -> Dict[str, Any]:
+    """
+    Pipeline stage: store the compressed view of the article and the token reduction.
+
+    Sets state["compressed_content"] and state["compression"] when the
+    article exceeds the budget; shorter articles are left alone.
+    """
+    text = state.get("article_content", "")
+    original = count_tokens(text)
+    if original <= max_tokens:
+        return state
+    compressed = compress_text(text, max_tokens, state.get("article_title", ""))
+    kept = count_tokens(compressed)
+    state["compressed_content"] = compressed
+    state["compression"] = {
+        "original_tokens": original,
+        "compressed_tokens": kept,
+        "reduction": round(1 - kept / original, 4)
+    }
+    metrics.inc("article_compression_tokens_total", original, stage="original")
+    metrics.inc("article_compression_tokens_total", kept, stage="compressed")
+    logger.info(f"Compressed article from {original} to {kept} tokens")
+    return state
+
+
+def article_view(state: Dict[str, Any]) -> str:
+    """The article text agents should send to the LLM: the compressed view if there is one"""
+    return state.get("compressed_content") or state.get("article_content", "")
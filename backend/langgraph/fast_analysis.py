@@ -0,0 +1,239 @@
+"""
+On-CPU sentiment and summary for the fast analysis profile
+
+The fast profile answers the popup view without any LLM call: sentiment comes
+from a lexicon scorer vectorized with NumPy over the article's tokens, and the
+summary from extractive TextRank over its sentences. Both return the same
+shapes as the LLM agents (the sentiment JSON goes through
+build_sentiment_result), so the full analysis can replace them later.
+"""
+
+import re
+from typing import Any, Dict, List
+
+import numpy as np
+
+FAST_PROFILE = "fast"
+
+# Sentiment lexicon, weights from -3 (very negative) to 3 (very positive)
+_LEXICON_WORDS = {
+    3: "excellent outstanding remarkable triumph breakthrough thrilled celebrate celebrated "
+       "wonderful superb brilliant landmark",
+    2: "success successful win wins won gain gains growth improve improved improvement benefit "
+       "benefits strong strength positive progress praised praise welcome welcomed boost boosted "
+       "record recovery recovered optimistic hope hopeful support supported achieve achieved "
+       "agreement innovative safe secure thriving",
+    1: "good better best rise rising rose increase increased stable help helped helps effective "
+       "efficient confident confidence approve approved advance advanced opportunity "
+       "opportunities solution resolve resolved relief calm fair peaceful",
+    -1: "concern concerns concerned decline declined declining fall fell drop dropped slow slowed "
+        "uncertain uncertainty risk risks doubt doubts criticism critics question questioned "
+        "pressure difficult challenge challenges delay delayed weak weaker cut cuts",
+    -2: "fail failed failure loss losses lose lost crisis damage damaged problem problems "
+        "controversial controversy dispute disputed warn warned warning threat threatens "
+        "threatened angry anger fear fears feared protest protests slump slumped "
+        "accused allegations scandal fraud conflict recession layoffs unemployment poor worse",
+    -3: "disaster catastrophe catastrophic collapse collapsed devastating devastated killed "
+        "deadly death deaths crash crashed tragedy outrage terrible horrific corruption worst",
+}
+
+# Words that signal opinion rather than reporting
+_SUBJECTIVE_WORDS = (
+    "believe believes think thinks feel feels seem seems seemingly apparently clearly obviously "
+    "surely certainly arguably perhaps maybe likely unlikely should must very extremely "
+    "incredibly really truly absolutely totally deeply highly shocking stunning outrageous "
+    "ridiculous absurd alarming amazing awful disgraceful appalling unfair unacceptable "
+    "so-called allegedly supposedly insist insists claim claims claimed"
+)
+
+_NEGATORS = (
+    "not no never nor neither without hardly barely cannot don't doesn't didn't isn't aren't "
+    "wasn't weren't won't wouldn't can't couldn't shouldn't hasn't haven't hadn't"
+)
+
+STOPWORDS = set(
+    "a an the and or but if then so of to in on at by for with from as is are was were be been "
+    "being it its this that these those he she they them his her their we our you your i me my "
+    "has have had do does did not no will would can could may might shall should also than "
+    "there here which who whom what when where why how all any each more most other some such "
+    "only own same too very just into over under about after before between through during "
+    "out up down off again further once said says".split()
+)
+
+_TOKEN = re.compile(r"[a-z]+(?:[-'][a-z]+)*")
+# Words plus the punctuation that ends a negation's scope
+_TOKEN_OR_BREAK = re.compile(r"[a-z]+(?:[-'][a-z]+)*|[.!?;:,]")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z\"'(])")
+
+_VOCAB: Dict[str, int] = {}
+for _weight, _words in _LEXICON_WORDS.items():
+    for _word in _words.split():
+        _VOCAB.setdefault(_word, len(_VOCAB) + 1)
+for _word in (_SUBJECTIVE_WORDS + " " + _NEGATORS).split():
+    _VOCAB.setdefault(_word, len(_VOCAB) + 1)
+
+# Per-vocabulary-id arrays; id 0 is every word outside the lexicon
+_WEIGHTS = np.zeros(len(_VOCAB) + 1)
+_SUBJECTIVE = np.zeros(len(_VOCAB) + 1)
+_NEGATOR = np.zeros(len(_VOCAB) + 1)
+for _weight, _words in _LEXICON_WORDS.items():
+    for _word in _words.split():
+        _WEIGHTS[_VOCAB[_word]] = _weight
+for _word in _SUBJECTIVE_WORDS.split():
+    _SUBJECTIVE[_VOCAB[_word]] = 1
+for _word in _NEGATORS.split():
+    _NEGATOR[_VOCAB[_word]] = 1
+
+# Damps the polarity of texts with only a few sentiment words
+_POLARITY_SMOOTHING = 4.0
+# Share of opinion words at which text counts as fully subjective; sentiment
+# words count a quarter, explicit opinion markers fully
+_SUBJECTIVE_DENSITY = 0.1
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower().replace("’", "'"))
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_END.split(re.sub(r"\s+", " ", text)) if s.strip()]
+
+
+def lexicon_sentiment(text: str) -> Dict[str, Any]:
+    """
+    Score sentiment and subjectivity of text with the lexicon.
+
+    Returns sentiment JSON in the shape the LLM produces (sentimentLabel,
+    sentimentScore, subjectivityScore, justification, keyPhrases,
+    biasAssessment). A negator up to three words before a sentiment word in
+    the same clause flips its sign.
+    """
+    # Imported here because sentiment_agent imports this module
+    from .agents.sentiment_agent import _label_for_score
+
+    tokens = _TOKEN_OR_BREAK.findall(text.lower().replace("’", "'"))
+    is_break = np.fromiter((not token[0].isalpha() for token in tokens), dtype=bool, count=len(tokens))
+    words = len(tokens) - int(is_break.sum())
+    if not words:
+        return {
+            "sentimentLabel": "neutral", "sentimentScore": 50, "subjectivityScore": 0,
+            "justification": ["No text to analyze"], "keyPhrases": [],
+            "biasAssessment": "No text to analyze"
+        }
+
+    ids = np.fromiter((_VOCAB.get(token, 0) for token in tokens), dtype=np.int64, count=len(tokens))
+    weights = _WEIGHTS[ids]
+    # Flip words at most three tokens after a negator, unless punctuation intervenes
+    positions = np.arange(len(ids))
+    last_negator = np.maximum.accumulate(np.where(_NEGATOR[ids] > 0, positions, -10))
+    last_break = np.maximum.accumulate(np.where(is_break, positions, -1))
+    negated = (positions > last_negator) & (positions - last_negator <= 3) & (last_negator > last_break)
+    weights = np.where(negated, -weights, weights)
+
+    # Net share of sentiment mass, between -1 and 1
+    polarity = weights.sum() / (np.abs(weights).sum() + _POLARITY_SMOOTHING)
+    score = int(round(50 + 50 * polarity))
+
+    counts = np.bincount(ids, minlength=len(_WEIGHTS))
+    opinion_words = counts @ (_SUBJECTIVE + (_WEIGHTS != 0) * 0.25)
+    subjectivity = int(round(min(1.0, opinion_words / words / _SUBJECTIVE_DENSITY) * 100))
+
+    positive = int((weights > 0).sum())
+    negative = int((weights < 0).sum())
+
+    # Key phrases: the strongest sentiment words with their content-word neighbours, in article order
+    hits = np.flatnonzero(weights)
+    strongest = hits[np.argsort(-np.abs(weights[hits]), kind="stable")]
+    phrases = []
+    for index in strongest:
+        start, end = index, index + 1
+        if index > 0 and not is_break[index - 1] and tokens[index - 1] not in STOPWORDS:
+            start -= 1
+        if end < len(tokens) and not is_break[end] and tokens[end] not in STOPWORDS:
+            end += 1
+        phrase = " ".join(tokens[start:end])
+        if any(tokens[index] in other.split() for _, other in phrases):
+            continue
+        phrases.append((index, phrase))
+        if len(phrases) == 5:
+            break
+    key_phrases = [phrase for _, phrase in sorted(phrases)]
+
+    justification = [
+        f"{positive} positive and {negative} negative sentiment terms in {words} words",
+        f"Net lexicon polarity of {polarity:+.2f}",
+        f"Opinion words make up {opinion_words / words:.1%} of the text",
+    ]
+    if subjectivity >= 60:
+        bias = "Strongly opinionated language suggests a one-sided presentation"
+    elif subjectivity >= 30:
+        bias = "Some opinionated language alongside factual reporting"
+    else:
+        bias = "Largely factual language with little opinion"
+
+    return {
+        "sentimentLabel": _label_for_score(score),
+        "sentimentScore": score,
+        "subjectivityScore": subjectivity,
+        "justification": justification,
+        "keyPhrases": key_phrases,
+        "biasAssessment": bias,
+    }
+
+
+def tfidf_matrix(sentences: List[str]) -> np.ndarray:
+    """
+    One L2-normalized TF-IDF row per sentence over its content words.
+
+    Rows of sentences without content words are zero, so the dot product of
+    two rows is their cosine similarity.
+    """
+    tokenized = [[t for t in tokenize(sentence) if t not in STOPWORDS and len(t) > 2] for sentence in sentences]
+    vocabulary = {word: i for i, word in enumerate(sorted({t for tokens in tokenized for t in tokens}))}
+    rows = np.repeat(np.arange(len(tokenized)), [len(tokens) for tokens in tokenized])
+    columns = np.fromiter((vocabulary[t] for tokens in tokenized for t in tokens), dtype=np.int64, count=len(rows))
+    matrix = np.zeros((len(sentences), max(1, len(vocabulary))))
+    np.add.at(matrix, (rows, columns), 1)
+
+    idf = np.log(len(sentences) / (1 + (matrix > 0).sum(axis=0))) + 1
+    matrix *= idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def textrank_summary(text: str, max_words: int = 100, damping: float = 0.85) -> str:
+    """
+    Extractive summary of at most about max_words.
+
+    Sentences are ranked by PageRank over their TF-IDF cosine similarity and
+    the best ones are returned in article order.
+    """
+    sentences = split_sentences(text)
+    if len(sentences) <= 2 or len(text.split()) <= max_words:
+        return " ".join(text.split()[:max_words])
+
+    matrix = tfidf_matrix(sentences)
+    similarity = matrix @ matrix.T
+    np.fill_diagonal(similarity, 0)
+    row_sums = similarity.sum(axis=1, keepdims=True)
+    # Sentences similar to nothing link to every sentence equally
+    transition = np.divide(similarity, row_sums, out=np.full_like(similarity, 1 / len(sentences)), where=row_sums > 0)
+
+    ranks = np.full(len(sentences), 1 / len(sentences))
+    for _ in range(100):
+        updated = (1 - damping) / len(sentences) + damping * transition.T @ ranks
+        if np.abs(updated - ranks).sum() < 1e-6:
+            ranks = updated
+            break
+        ranks = updated
+
+    chosen, words = [], 0
+    for index in np.argsort(-ranks, kind="stable"):
+        length = len(sentences[index].split())
+        if chosen and words + length > max_words:
+            continue
+        chosen.append(index)
+        words += length
+        if words >= max_words * 0.8:
+            break
+    return " ".join(sentences[i] for i in sorted(chosen))
@@ -0,0 +1,321 @@
+"""
+LLM response cache - content-addressed, two-tier cache for chat completions
+
+Re-analysis, duplicate articles and repeated runs send byte-identical prompts.
+Responses are keyed by a hash of (model, messages, temperature, prompt version
+and any other generation parameters) and kept in an in-memory LRU tier in front
+of a SQLite tier that survives restarts. The disk tier is bounded by total size
+(least recently used entries are evicted first) and entries expire after a TTL.
+
+Only usable responses are stored: empty answers and, for JSON-mode requests,
+answers that cannot be parsed are never cached. While an agent runs under the
+validator (utility.run_agent_with_validation) its writes are held back with
+defer_writes() and only stored once the validator accepts the agent's output,
+and a re-run ordered by the validator skips cache reads (skip_reads()), so a
+rejected answer is neither kept nor served again.
+"""
+
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .llm_json import repair_json
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE", "true").lower() == "true"
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", "llm_cache.sqlite3")
+LLM_CACHE_MEMORY_ENTRIES = int(os.environ.get("LLM_CACHE_MEMORY_ENTRIES", "512"))
+LLM_CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024
+LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL_HOURS", "168")) * 3600
+
+# Request arguments that do not change what the model generates
+_NON_SEMANTIC_ARGS = {"timeout", "extra_headers", "user"}
+
+# Writes held back until the current agent's output is validated, if any
+_pending_writes: contextvars.ContextVar[Optional[List[Tuple[Any, str, str, Any]]]] = contextvars.ContextVar(
+    "llm_cache_pending_writes", default=None
+)
+_skip_reads: contextvars.ContextVar[bool] = contextvars.ContextVar("llm_cache_skip_reads", default=False)
+
+
+class CachedMessage:
+    def __init__(self, content: str):
+        self.role = "assistant"
+        self.content = content
+
+
+class CachedChoice:
+    def __init__(self, content: str):
+        self.message = CachedMessage(content)
+
+
+class CachedChatCompletion:
+    """The parts of an OpenAI chat completion the agents read, rebuilt from the cache"""
+    def __init__(self, content: str, usage: Optional[Dict[str, Any]] = None, model: Optional[str] = None):
+        self.choices = [CachedChoice(content)]
+        self.usage = usage
+        self.model = model
+        self.cached = True
+
+
+def make_cache_key(prompt_version: str, **kwargs) -> str:
+    """Content-addressed key for a chat completion request"""
+    params = {k: v for k, v in kwargs.items() if k not in _NON_SEMANTIC_ARGS}
+    params["prompt_version"] = prompt_version
+    payload = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def is_cacheable(**kwargs) -> bool:
+    """Streams and multi-choice requests are never cached"""
+    return not kwargs.get("stream") and kwargs.get("n", 1) == 1
+
+
+def is_usable_response(response: Any, **kwargs) -> bool:
+    """A non-empty answer that, for JSON-mode requests, parses"""
+    try:
+        content = response.choices[0].message.content
+    except (AttributeError, IndexError):
+        return False
+    if not content or not content.strip():
+        return False
+    if (kwargs.get("response_format") or {}).get("type") == "json_object":
+        try:
+            repair_json(content)
+        except ValueError:
+            return False
+    return True
+
+
+def defer_writes() -> contextvars.Token:
+    """Hold back cache writes made in the current context until end_deferred_writes(token)"""
+    return _pending_writes.set([])
+
+
+def end_deferred_writes(token: contextvars.Token, commit: bool) -> int:
+    """Store (commit=True) or drop the writes held back since defer_writes(); returns how many"""
+    pending = _pending_writes.get() or []
+    _pending_writes.reset(token)
+    if commit:
+        for cache, agent, key, response in pending:
+            cache.put(agent, key, response)
+    return len(pending)
+
+
+def skip_reads(skip: bool = True) -> contextvars.Token:
+    """Bypass cache reads in the current context until reset_skip_reads(token)"""
+    return _skip_reads.set(skip)
+
+
+def reset_skip_reads(token: contextvars.Token) -> None:
+    _skip_reads.reset(token)
+
+
+def reads_skipped() -> bool:
+    return _skip_reads.get()
+
+
+def store_response(cache: "LLMResponseCache", agent: str, key: str, response: Any) -> None:
+    """Put a response in the cache now, or once the current agent's output is accepted"""
+    pending = _pending_writes.get()
+    if pending is None:
+        cache.put(agent, key, response)
+    else:
+        pending.append((cache, agent, key, response))
+
+
+def _usage_to_dict(usage: Any) -> Optional[Dict[str, Any]]:
+    if usage is None:
+        return None
+    if isinstance(usage, dict):
+        return usage
+    if hasattr(usage, "model_dump"):
+        return usage.model_dump()
+    return {
+        key: getattr(usage, key)
+        for key in ("prompt_tokens", "completion_tokens", "total_tokens")
+        if hasattr(usage, key)
+    }
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache of chat completion responses.
+
+    Lookups check the memory LRU first, then SQLite; disk hits are promoted to
+    memory. Hits and misses are counted per agent.
+    """
+    def __init__(
+        self,
+        path: Optional[str] = LLM_CACHE_PATH,
+        memory_entries: int = LLM_CACHE_MEMORY_ENTRIES,
+        max_bytes: int = LLM_CACHE_MAX_BYTES,
+        ttl: float = LLM_CACHE_TTL
+    ):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> Optional[sqlite3.Connection]:
+        if self._conn is None and self.path:
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._conn = sqlite3.connect(self.path, check_same_thread=False)
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    " key TEXT PRIMARY KEY, agent TEXT, payload TEXT NOT NULL,"
+                    " size INTEGER NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+                self._conn.commit()
+            except Exception as e:
+                logger.error(f"Error opening LLM cache at {self.path}, using memory only: {str(e)}")
+                self.path = None
+                self._conn = None
+        return self._conn
+
+    def _count(self, agent: str, outcome: str) -> None:
+        counts = self._stats.setdefault(agent, {"memory_hits": 0, "disk_hits": 0, "misses": 0})
+        counts[outcome] += 1
+
+    def _remember(self, key: str, payload: str, created_at: float) -> None:
+        self._memory[key] = (payload, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, agent: str, key: str) -> Optional[CachedChatCompletion]:
+        """Return the cached response for a key, or None on a miss"""
+        now = time.time()
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            payload, created_at = entry
+            if now - created_at <= self.ttl:
+                self._memory.move_to_end(key)
+                self._count(agent, "memory_hits")
+                return self._decode(payload)
+            del self._memory[key]
+
+        db = self._db()
+        if db is not None:
+            try:
+                row = db.execute(
+                    "SELECT payload, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    payload, created_at = row
+                    if now - created_at <= self.ttl:
+                        db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                        db.commit()
+                        self._remember(key, payload, created_at)
+                        self._count(agent, "disk_hits")
+                        return self._decode(payload)
+                    db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    db.commit()
+            except Exception as e:
+                logger.error(f"Error reading LLM cache: {str(e)}")
+
+        self._count(agent, "misses")
+        return None
+
+    def put(self, agent: str, key: str, response: Any) -> None:
+        """Store a chat completion response under a key"""
+        try:
+            payload = json.dumps({
+                "content": response.choices[0].message.content,
+                "usage": _usage_to_dict(getattr(response, "usage", None)),
+                "model": getattr(response, "model", None),
+            }, ensure_ascii=False, default=str)
+        except Exception as e:
+            logger.error(f"Could not serialize {agent} response for the LLM cache: {str(e)}")
+            return
+
+        now = time.time()
+        self._remember(key, payload, now)
+
+        db = self._db()
+        if db is None:
+            return
+        try:
+            db.execute(
+                "INSERT OR REPLACE INTO responses (key, agent, payload, size, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, agent, payload, len(payload.encode("utf-8")), now, now)
+            )
+            self._evict(db, now)
+            db.commit()
+        except Exception as e:
+            logger.error(f"Error writing LLM cache: {str(e)}")
+
+    def _evict(self, db: sqlite3.Connection, now: float) -> None:
+        """Drop expired entries, then least recently used ones until under max_bytes"""
+        db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        stale = []
+        for key, size in db.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            if total - freed <= self.max_bytes:
+                break
+            stale.append((key,))
+            freed += size
+        db.executemany("DELETE FROM responses WHERE key = ?", stale)
+        for (key,) in stale:
+            self._memory.pop(key, None)
+        logger.info(f"LLM cache evicted {len(stale)} entries ({freed} bytes)")
+
+    def _decode(self, payload: str) -> CachedChatCompletion:
+        data = json.loads(payload)
+        return CachedChatCompletion(data["content"], data.get("usage"), data.get("model"))
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rates per agent and overall, plus the size of both tiers"""
+        per_agent = {}
+        totals = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        for agent, counts in self._stats.items():
+            lookups = sum(counts.values())
+            hits = counts["memory_hits"] + counts["disk_hits"]
+            per_agent[agent] = {**counts, "hit_rate": round(hits / lookups, 4) if lookups else 0.0}
+            for outcome, count in counts.items():
+                totals[outcome] += count
+
+        lookups = sum(totals.values())
+        disk_entries, disk_bytes = 0, 0
+        db = self._db()
+        if db is not None:
+            try:
+                disk_entries, disk_bytes = db.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+                ).fetchone()
+            except Exception as e:
+                logger.error(f"Error reading LLM cache size: {str(e)}")
+
+        return {
+            "agents": per_agent,
+            **totals,
+            "hit_rate": round((totals["memory_hits"] + totals["disk_hits"]) / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_entries": disk_entries,
+            "disk_bytes": disk_bytes,
+        }
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
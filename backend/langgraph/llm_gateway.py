@@ -0,0 +1,416 @@
+"""
+LLM gateway - the single path through which agents call the LLM provider
+
+Owns one long-lived client with a pooled, keep-alive HTTP connection (HTTP/2
+when available) instead of every agent building a fresh AsyncOpenAI client,
+connection pool and TLS session per call. In mock mode the same interface is
+served by utils.mock_openai.MockOpenAI. Responses are cached in
+llm_cache.LLMResponseCache so identical prompts are only paid for once.
+
+Provider calls are bounded by a process-wide concurrency limit, adapted to
+the provider's latency and throttling (AIMD), and paced to the account's
+requests/tokens per minute. Rate limits, server errors and
+dropped connections are retried with exponential backoff and jitter,
+honouring Retry-After. When retries run out LLMUnavailableError is raised so
+the failure is visible instead of being papered over with default results.
+Server errors and dropped connections also feed a circuit breaker; while it
+is open, calls raise LLMUnavailableError("circuit_open") at once.
+
+Optionally, a call that has not answered by a high percentile of the model's
+recent latencies is hedged: a duplicate is sent, the first answer wins and the
+other request is cancelled. A budget caps the share of hedged calls.
+
+cascade_completion() runs a request through the agent's model cascade
+(cascade.py): cheaper models first, escalating only low-confidence answers.
+
+Tokens, latency and cost of every call are charged to the agent and to the
+job it was made for (usage.py).
+"""
+
+import asyncio
+import importlib.util
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+from . import usage
+from .cascade import LLM_CASCADE, ConfidenceFn, cascade_threshold, cascade_tiers, json_confidence, record
+from .llm_cache import (
+    LLM_CACHE_ENABLED, LLMResponseCache, is_cacheable, is_usable_response, make_cache_key, reads_skipped, store_response
+)
+from .tokens import count_tokens
+from utils import metrics
+from utils.circuit_breaker import CircuitBreaker
+from utils.hedging import HedgeBudget, LatencyTracker, first_success
+from utils.rate_limit import AdaptiveLimiter, ConcurrencyLimiter, RatePacer, backoff_delay, retry_after_seconds
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Connection pool settings for the shared client
+LLM_MAX_CONNECTIONS = int(os.environ.get("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("LLM_MAX_KEEPALIVE_CONNECTIONS", "10"))
+LLM_KEEPALIVE_EXPIRY = float(os.environ.get("LLM_KEEPALIVE_EXPIRY", "60"))
+LLM_HTTP2 = os.environ.get("LLM_HTTP2", "true").lower() == "true"
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", "60"))
+
+# Throttling: calls in flight, per-minute pacing (0 disables) and retries
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "8"))
+# With adaptive concurrency LLM_MAX_CONCURRENCY is the starting point and the
+# limit moves between LLM_CONCURRENCY_MIN and LLM_CONCURRENCY_MAX
+LLM_ADAPTIVE_CONCURRENCY = os.environ.get("LLM_ADAPTIVE_CONCURRENCY", "true").lower() == "true"
+LLM_CONCURRENCY_MIN = int(os.environ.get("LLM_CONCURRENCY_MIN", "1"))
+LLM_CONCURRENCY_MAX = int(os.environ.get("LLM_CONCURRENCY_MAX", "64"))
+LLM_RPM = int(os.environ.get("LLM_RPM", "500"))
+LLM_TPM = int(os.environ.get("LLM_TPM", "200000"))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE = float(os.environ.get("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.environ.get("LLM_BACKOFF_MAX", "30"))
+# Hedging: duplicate calls slower than this percentile of the model's recent
+# latencies, at most LLM_HEDGE_MAX_RATE of all calls
+LLM_HEDGE = os.environ.get("LLM_HEDGE", "false").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.environ.get("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MAX_RATE = float(os.environ.get("LLM_HEDGE_MAX_RATE", "0.05"))
+LLM_HEDGE_MIN_SAMPLES = int(os.environ.get("LLM_HEDGE_MIN_SAMPLES", "20"))
+# Completion tokens assumed for pacing when a request sets no max_tokens
+LLM_COMPLETION_ESTIMATE = int(os.environ.get("LLM_COMPLETION_ESTIMATE", "300"))
+
+
+class LLMUnavailableError(Exception):
+    """The provider kept failing with retryable errors until the retry budget ran out"""
+    def __init__(self, agent: str, reason: str, attempts: int):
+        super().__init__(f"LLM unavailable for {agent} agent after {attempts} attempts ({reason})")
+        self.agent = agent
+        self.reason = reason
+        self.attempts = attempts
+
+
+def retry_reason(error: Exception) -> Optional[str]:
+    """Why an error is worth retrying ("rate_limited", "server_error", "connection"), or None"""
+    status = getattr(error, "status_code", None)
+    if status == 429:
+        return "rate_limited"
+    if status in (408, 409) or (isinstance(status, int) and status >= 500):
+        return "server_error"
+    if status is None:
+        try:
+            from openai import APIConnectionError
+            if isinstance(error, APIConnectionError):
+                return "connection"
+        except ImportError:
+            pass
+        if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+            return "connection"
+    return None
+
+
+def usage_field(usage: Any, *path: str) -> int:
+    """Read a (nested) token count from a usage object or dict, 0 if absent"""
+    value = usage
+    for name in path:
+        if value is None:
+            return 0
+        value = value.get(name) if isinstance(value, dict) else getattr(value, name, None)
+    return value if isinstance(value, int) else 0
+
+
+class LLMGateway:
+    """
+    Shared access point for chat completions.
+
+    Agents call chat_completion() with their own name so that the call path
+    can attribute, pace and account for requests per agent.
+    """
+    def __init__(self, client: Any = None, use_mock: Optional[bool] = None, cache: Optional[LLMResponseCache] = None):
+        if use_mock is None:
+            use_mock = os.environ.get("USE_MOCK_APIS", "true").lower() == "true"
+        self.use_mock = use_mock
+        self._client = client
+        if cache is None and LLM_CACHE_ENABLED:
+            # Mock answers stay in memory so they are never served once real calls are made
+            cache = LLMResponseCache(path=None) if use_mock else LLMResponseCache()
+        self.cache = cache
+        if LLM_ADAPTIVE_CONCURRENCY:
+            self.limiter = AdaptiveLimiter("llm", LLM_MAX_CONCURRENCY, LLM_CONCURRENCY_MIN, LLM_CONCURRENCY_MAX)
+        else:
+            self.limiter = ConcurrencyLimiter(LLM_MAX_CONCURRENCY)
+        self.pacer = RatePacer(LLM_RPM, LLM_TPM)
+        self.max_retries = LLM_MAX_RETRIES
+        self.hedge = LLM_HEDGE
+        self.cascade = LLM_CASCADE
+        self.latency = LatencyTracker()
+        self.hedge_budget = HedgeBudget(LLM_HEDGE_MAX_RATE)
+        self.breaker = CircuitBreaker("llm")
+
+    @property
+    def client(self) -> Any:
+        """The underlying OpenAI-compatible client, created on first use"""
+        if self._client is None:
+            self._client = self._build_client()
+        return self._client
+
+    def is_configured(self) -> bool:
+        """True if calls can be made (mock mode, an injected client or an API key)"""
+        return self.use_mock or self._client is not None or bool(os.environ.get("OPENAI_API_KEY"))
+
+    def _build_client(self) -> Any:
+        if self.use_mock:
+            from utils.mock_openai import MockOpenAI
+            logger.info("LLM gateway using MockOpenAI")
+            return MockOpenAI()
+
+        import httpx
+        from openai import AsyncOpenAI
+
+        http2 = LLM_HTTP2 and importlib.util.find_spec("h2") is not None
+        if LLM_HTTP2 and not http2:
+            logger.warning("LLM_HTTP2 is enabled but the h2 package is not installed, using HTTP/1.1")
+
+        http_client = httpx.AsyncClient(
+            http2=http2,
+            timeout=LLM_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+            )
+        )
+        logger.info(
+            f"LLM gateway using pooled AsyncOpenAI client "
+            f"(max_connections={LLM_MAX_CONNECTIONS}, keepalive={LLM_MAX_KEEPALIVE_CONNECTIONS}, http2={http2})"
+        )
+        # Retries are done by the gateway, which also paces and counts them
+        return AsyncOpenAI(api_key=os.environ.get("OPENAI_API_KEY"), http_client=http_client, max_retries=0)
+
+    async def chat_completion(self, agent: str, prompt_version: str = "1", **kwargs) -> Any:
+        """
+        Create a chat completion on behalf of an agent.
+
+        Accepts the same keyword arguments as client.chat.completions.create.
+        Agents bump prompt_version when they change a prompt so stale cached
+        answers are not served for it. Only usable answers are cached, and
+        under the validator only once the agent's output is accepted.
+        """
+        key = None
+        if self.cache is not None and is_cacheable(**kwargs):
+            key = make_cache_key(prompt_version, **kwargs)
+            cached = None if reads_skipped() else self.cache.get(agent, key)
+            if cached is not None:
+                logger.info(f"LLM cache hit for {agent} agent")
+                usage.record_cache_hit(agent)
+                return cached
+
+        logger.info(f"LLM call from {agent} agent (model={kwargs.get('model')})")
+        started = time.monotonic()
+        response = await self._call_with_retries(agent, **kwargs)
+        self._record_usage(agent, kwargs.get("model"), response, (time.monotonic() - started) * 1000)
+        if key is not None and is_usable_response(response, **kwargs):
+            store_response(self.cache, agent, key, response)
+        return response
+
+    async def cascade_completion(self, agent: str, confidence: ConfidenceFn = json_confidence,
+                                 prompt_version: str = "1", **kwargs) -> Any:
+        """
+        Create a chat completion through the agent's model cascade.
+
+        Each tier replaces the requested model; an answer scoring below the
+        agent's threshold is asked again of the next tier. With the cascade
+        disabled this is chat_completion() with the requested model.
+        """
+        tiers = cascade_tiers(agent) if self.cascade else []
+        if len(tiers) == 1:
+            kwargs["model"] = tiers[0]
+        if len(tiers) < 2:
+            return await self.chat_completion(agent, prompt_version, **kwargs)
+
+        threshold = cascade_threshold(agent)
+        for tier, model in enumerate(tiers):
+            response = await self.chat_completion(agent, prompt_version, **{**kwargs, "model": model})
+            if tier == len(tiers) - 1:
+                break
+            score = confidence(response)
+            if score is None or score >= threshold:
+                break
+            record(agent, tier, model, escalated=True)
+            logger.info(f"Escalating {agent} agent from {model} to {tiers[tier + 1]} (confidence {score:.2f} < {threshold})")
+        record(agent, tier, model, escalated=False)
+        return response
+
+    def _estimate_tokens(self, **kwargs) -> int:
+        prompt = sum(count_tokens(str(m.get("content", ""))) for m in kwargs.get("messages", []))
+        return prompt + (kwargs.get("max_tokens") or LLM_COMPLETION_ESTIMATE)
+
+    async def _call_with_retries(self, agent: str, **kwargs) -> Any:
+        """Send one request under the pacer and concurrency limit, retrying transient failures"""
+        estimated = self._estimate_tokens(**kwargs)
+        attempt = 0
+        while True:
+            # While the provider is down, fail fast instead of waiting out timeouts and retries;
+            # the breaker is the only gate, checked before any pacing or queueing
+            if not self.breaker.allow():
+                raise self._circuit_open(agent, attempt)
+            try:
+                waited = await self.pacer.acquire(estimated)
+                if waited:
+                    metrics.inc("llm_pacer_wait_seconds_total", waited, agent=agent)
+
+                queued_at = time.monotonic()
+                async with self.limiter:
+                    queued = time.monotonic() - queued_at
+                    if queued > 0.001:
+                        metrics.inc("llm_concurrency_wait_seconds_total", queued, agent=agent)
+                    metrics.set_gauge("llm_in_flight", self.limiter.in_flight)
+                    started = time.monotonic()
+                    try:
+                        response = await self._create(agent, **kwargs)
+                    except Exception as e:
+                        reason = retry_reason(e)
+                        # Throttling and bad requests say nothing about whether the provider is up
+                        if reason in ("server_error", "connection"):
+                            self.breaker.record_failure()
+                        else:
+                            self.breaker.record_ignored()
+                        if reason is None:
+                            metrics.inc("llm_requests_total", agent=agent, outcome="error")
+                            raise
+                        self.limiter.record_overload(started, reason)
+                        error = e
+                    else:
+                        latency = time.monotonic() - started
+                        self.breaker.record_success()
+                        self.limiter.record_success(latency)
+                        self.latency.observe(kwargs.get("model", ""), latency)
+                        metrics.inc("llm_requests_total", agent=agent, outcome="ok")
+                        self.pacer.settle(estimated, usage_field(getattr(response, "usage", None), "total_tokens") or estimated)
+                        return response
+                    finally:
+                        metrics.set_gauge("llm_in_flight", self.limiter.in_flight - 1)
+            except asyncio.CancelledError:
+                self.breaker.record_ignored()
+                raise
+
+            metrics.inc("llm_throttled_total", agent=agent, reason=reason)
+            if attempt >= self.max_retries:
+                metrics.inc("llm_requests_total", agent=agent, outcome="exhausted")
+                logger.error(f"LLM call from {agent} agent failed after {attempt + 1} attempts: {error}")
+                raise LLMUnavailableError(agent, reason, attempt + 1) from error
+
+            response_headers = getattr(getattr(error, "response", None), "headers", None)
+            retry_after = retry_after_seconds(response_headers)
+            delay = backoff_delay(attempt, LLM_BACKOFF_BASE, LLM_BACKOFF_MAX, retry_after)
+            if retry_after is not None:
+                # The provider told us when it will take requests again; hold everyone back
+                self.pacer.pause(delay)
+            logger.warning(f"LLM call from {agent} agent {reason} (attempt {attempt + 1}), retrying in {delay:.2f}s")
+            metrics.inc("llm_retries_total", agent=agent, reason=reason)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _circuit_open(self, agent: str, attempt: int) -> LLMUnavailableError:
+        metrics.inc("llm_requests_total", agent=agent, outcome="circuit_open")
+        return LLMUnavailableError(agent, "circuit_open", attempt)
+
+    def _hedge_delay(self, model: str) -> Optional[float]:
+        """Seconds to wait before hedging a call to this model, None if it is not hedged"""
+        if not self.hedge or self.latency.count(model) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return self.latency.percentile(model, LLM_HEDGE_PERCENTILE)
+
+    async def _create(self, agent: str, **kwargs) -> Any:
+        """
+        One provider call, hedged if it runs past the model's latency percentile.
+
+        The duplicate needs a free concurrency slot and hedge budget; it is
+        never queued, so hedging stops when the provider is saturated.
+        """
+        self.hedge_budget.record_request()
+        delay = self._hedge_delay(kwargs.get("model", ""))
+        if delay is None:
+            return await self.client.chat.completions.create(**kwargs)
+
+        primary = asyncio.ensure_future(self.client.chat.completions.create(**kwargs))
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                return await primary
+            if not self.limiter.try_acquire():
+                metrics.inc("llm_hedges_skipped_total", agent=agent, reason="concurrency")
+                return await primary
+            if not self.hedge_budget.try_spend():
+                self.limiter.release()
+                metrics.inc("llm_hedges_skipped_total", agent=agent, reason="budget")
+                return await primary
+        except BaseException:
+            primary.cancel()
+            raise
+
+        logger.info(f"Hedging LLM call from {agent} agent after {delay:.2f}s")
+        metrics.inc("llm_hedges_total", agent=agent)
+        try:
+            hedge = asyncio.ensure_future(self.client.chat.completions.create(**kwargs))
+            response, winner = await first_success(primary, hedge)
+        finally:
+            self.limiter.release()
+        metrics.inc("llm_hedge_wins_total", agent=agent, winner=winner)
+        return response
+
+    def _record_usage(self, agent: str, model: Optional[str], response: Any, latency_ms: float) -> None:
+        """
+        Count billed tokens, including prompt tokens served from the provider's
+        prefix cache, and charge the call to the current job's usage ledger.
+        """
+        response_usage = getattr(response, "usage", None)
+        prompt = usage_field(response_usage, "prompt_tokens")
+        cached = usage_field(response_usage, "prompt_tokens_details", "cached_tokens")
+        completion = usage_field(response_usage, "completion_tokens")
+        if response_usage is not None:
+            metrics.inc("llm_prompt_tokens_total", prompt, agent=agent)
+            metrics.inc("llm_cached_prompt_tokens_total", cached, agent=agent)
+            metrics.inc("llm_completion_tokens_total", completion, agent=agent)
+        usage.record_call(agent, model, prompt, cached, completion, latency_ms)
+
+    def token_stats(self) -> Dict[str, Any]:
+        """Prompt, provider-cached and completion tokens per agent"""
+        per_agent: Dict[str, Dict[str, Any]] = {}
+        for field in ("prompt_tokens", "cached_prompt_tokens", "completion_tokens"):
+            for key, value in metrics.counter_series(f"llm_{field}_total").items():
+                counts = per_agent.setdefault(dict(key)["agent"], {
+                    "prompt_tokens": 0, "cached_prompt_tokens": 0, "completion_tokens": 0
+                })
+                counts[field] = int(value)
+        for counts in per_agent.values():
+            prompt = counts["prompt_tokens"]
+            counts["cached_ratio"] = round(counts["cached_prompt_tokens"] / prompt, 4) if prompt else 0.0
+        return per_agent
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Response cache hit rates per agent"""
+        if self.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.cache.stats()}
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP connections"""
+        if self._client is not None and hasattr(self._client, "close"):
+            await self._client.close()
+        self._client = None
+        if self.cache is not None:
+            self.cache.close()
+
+
+_gateway: Optional[LLMGateway] = None
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Return the process-wide LLM gateway"""
+    global _gateway
+    if _gateway is None:
+        _gateway = LLMGateway()
+    return _gateway
+
+
+def set_llm_gateway(gateway: Optional[LLMGateway]) -> None:
+    """Replace the process-wide gateway (e.g. with a custom client in tests); None resets it"""
+    global _gateway
+    _gateway = gateway
@@ -0,0 +1,185 @@
+"""
+Tolerant JSON parsing of LLM output
+
+Agents request JSON mode, but answers can still arrive wrapped in code fences,
+with prose around them, with trailing commas or cut off at the token limit.
+IncrementalJSONParser scans output as it arrives (a whole response or stream
+chunks) and can return the most complete value parsed so far. A truncated
+object is closed at the last complete member rather than discarded.
+"""
+
+import json
+import logging
+from typing import Any, List, Optional, Tuple
+
+from utils import metrics
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Request argument that puts the provider in JSON mode
+JSON_MODE = {"type": "json_object"}
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class IncrementalJSONParser:
+    """
+    Scans JSON text chunk by chunk, keeping only the state needed to repair it.
+
+    Text before the first { or [ (prose, an opening ```json fence) and after
+    the top-level value closes (a closing fence) is ignored. Trailing commas
+    before a closing bracket are dropped while scanning.
+    """
+    def __init__(self):
+        self._out: List[str] = []
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._started = False
+        self._complete = False
+        # Points where the text can be cut and closed: (length of output, closers needed)
+        self._cuts: List[Tuple[int, str]] = []
+
+    @property
+    def complete(self) -> bool:
+        """True once the top-level value has been closed"""
+        return self._complete
+
+    def feed(self, chunk: str) -> None:
+        """Consume the next piece of output"""
+        for ch in chunk:
+            if self._complete:
+                return
+            if not self._started:
+                if ch not in _CLOSERS:
+                    continue
+                self._started = True
+
+            if self._in_string:
+                self._out.append(ch)
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in _CLOSERS:
+                self._stack.append(_CLOSERS[ch])
+            elif ch in "}]":
+                if not self._stack or self._stack[-1] != ch:
+                    continue  # Stray bracket, skip it
+                self._drop_trailing_comma()
+                self._stack.pop()
+                self._out.append(ch)
+                if not self._stack:
+                    self._complete = True
+                continue
+            elif ch == ",":
+                self._cuts.append((len(self._out), "".join(reversed(self._stack))))
+            self._out.append(ch)
+
+    def _drop_trailing_comma(self) -> None:
+        i = len(self._out) - 1
+        while i >= 0 and self._out[i].isspace():
+            i -= 1
+        if i >= 0 and self._out[i] == ",":
+            del self._out[i:]
+            self._cuts = [cut for cut in self._cuts if cut[0] < i]
+
+    def value(self) -> Any:
+        """
+        The parsed value, repairing a truncated tail if needed.
+
+        Raises ValueError if nothing usable has been seen yet.
+        """
+        if not self._started:
+            raise ValueError("No JSON object or array found in output")
+
+        text = "".join(self._out)
+        if self._complete:
+            return json.loads(text)
+
+        # Close the open string and brackets, then retry from earlier cut points
+        tail = text
+        if self._in_string:
+            tail = (tail[:-1] if self._escape else tail) + '"'
+        candidates = [tail + "".join(reversed(self._stack))]
+        candidates += [text[:pos] + closers for pos, closers in reversed(self._cuts)]
+        candidates.append(text[0] + _CLOSERS[text[0]])
+        for candidate in candidates:
+            try:
+                return json.loads(candidate)
+            except json.JSONDecodeError:
+                continue
+        raise ValueError("Could not repair truncated JSON output")
+
+    def partial(self) -> Optional[Any]:
+        """Best-effort value parsed so far, or None"""
+        try:
+            return self.value()
+        except ValueError:
+            return None
+
+
+def repair_json(text: str) -> Any:
+    """Parse LLM output that should contain JSON, repairing it where possible"""
+    parser = IncrementalJSONParser()
+    parser.feed(text)
+    return parser.value()
+
+
+def parse_llm_json(text: str, agent: str = "unknown") -> Any:
+    """
+    Parse an agent's JSON answer and record the outcome.
+
+    Outcomes are counted in the llm_json_parse_total metric as "ok" (valid
+    JSON as returned), "repaired" or "failed". Raises ValueError on failure.
+    """
+    try:
+        data = json.loads(text)
+        metrics.inc("llm_json_parse_total", agent=agent, outcome="ok")
+        return data
+    except (json.JSONDecodeError, TypeError):
+        pass
+
+    try:
+        data = repair_json(text or "")
+    except ValueError as e:
+        metrics.inc("llm_json_parse_total", agent=agent, outcome="failed")
+        logger.error(f"Unparseable JSON from {agent} agent: {str(e)}")
+        raise
+    metrics.inc("llm_json_parse_total", agent=agent, outcome="repaired")
+    logger.info(f"Repaired malformed JSON from {agent} agent")
+    return data
+
+
+def record_degraded(agent: str, reason: str) -> None:
+    """
+    Count an agent result replaced by an explicit error result.
+
+    reason is "parse_error" (the answer was unusable), "call_error",
+    "not_configured" or "no_claims"; counted in llm_degraded_results_total.
+    """
+    metrics.inc("llm_degraded_results_total", agent=agent, reason=reason)
+
+
+def parse_stats() -> dict:
+    """Parse outcomes, failure rate and results degraded to errors per agent"""
+    per_agent = {}
+    for key, count in metrics.counter_series("llm_json_parse_total").items():
+        labels = dict(key)
+        counts = per_agent.setdefault(labels["agent"], {"ok": 0, "repaired": 0, "failed": 0, "degraded": 0})
+        counts[labels["outcome"]] += int(count)
+    for key, count in metrics.counter_series("llm_degraded_results_total").items():
+        labels = dict(key)
+        counts = per_agent.setdefault(labels["agent"], {"ok": 0, "repaired": 0, "failed": 0, "degraded": 0})
+        counts["degraded"] += int(count)
+    for counts in per_agent.values():
+        total = counts["ok"] + counts["repaired"] + counts["failed"]
+        counts["failure_rate"] = round(counts["failed"] / total, 4) if total else 0.0
+    return per_agent
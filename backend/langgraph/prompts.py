@@ -0,0 +1,101 @@
+"""
+Shared prompt layout for provider-side prompt caching
+
+Providers cache the longest identical prefix of a request (OpenAI from 1024
+tokens on). Every agent that reads the article therefore starts its messages
+with the same block: a fixed preamble, the title and the article text. Only
+after that come the agent-specific instructions. The 4-5 calls made for one
+article then share a cached prefix instead of each paying for the article
+in full.
+
+For that the article text must be byte-identical across agents, so it is
+prepared once per job (article_chunks): the article as agents read it
+(compression.article_view, i.e. the compressed view when ARTICLE_COMPRESSION
+is on) split at the smallest token budget of the agents below. Agents that
+trim long articles send the first chunk, and agents that map-reduce them send
+every chunk, so the first request of each agent starts with the same message
+(shared_article_message). Claim extraction is the exception for compressed
+articles: it reads the full text (claim_source_message), since claims are
+quoted and searched for word for word.
+
+Validator feedback for a re-run goes last (feedback_messages), after the
+agent's instructions, so a re-run still shares the article prefix.
+"""
+
+from typing import Any, Dict, List
+
+from .compression import article_view
+from .tokens import chunk_text, token_budget, truncate_to_budget
+
+# Agents whose requests start with the shared article message
+SHARED_PREFIX_AGENTS = ("fake_news", "credibility", "sentiment", "summary")
+
+ARTICLE_PREAMBLE = (
+    "You are one of several agents analyzing the news article below. "
+    "Your task instructions follow after the article."
+)
+
+
+def article_message(title: str, text: str) -> Dict[str, str]:
+    """
+    The leading message every article-reading agent sends.
+
+    Its content must depend only on the article, never on the agent, or the
+    shared prefix is lost.
+    """
+    return {
+        "role": "system",
+        "content": f"{ARTICLE_PREAMBLE}\n\nArticle Title: {title}\nArticle Text:\n{text}"
+    }
+
+
+def article_budget() -> int:
+    """Token budget of the shared article text: the smallest budget of the agents sharing it"""
+    return min(token_budget(agent) for agent in SHARED_PREFIX_AGENTS)
+
+
+def article_chunks(state: Dict[str, Any]) -> List[str]:
+    """
+    The article text of the shared prefix, in chunks of at most article_budget() tokens.
+
+    Built on first use and kept in state["article_prefix_chunks"] for the
+    rest of the job, so every agent reads exactly the same text.
+    """
+    chunks = state.get("article_prefix_chunks")
+    if chunks is None:
+        chunks = chunk_text(article_view(state), article_budget())
+        state["article_prefix_chunks"] = chunks
+    return chunks
+
+
+def shared_article_message(state: Dict[str, Any], chunk: int = 0) -> Dict[str, str]:
+    """The leading message for one chunk of the shared article text; the first by default"""
+    return article_message(state.get("article_title", "Untitled Article"), article_chunks(state)[chunk])
+
+
+def claim_source_message(state: Dict[str, Any]) -> Dict[str, str]:
+    """
+    The leading message of claim extraction.
+
+    The shared article message, unless the article was compressed: then the
+    full text trimmed to the fake news budget, at the cost of the shared prefix.
+    """
+    if not state.get("compressed_content"):
+        return shared_article_message(state)
+    text = truncate_to_budget(state.get("article_content", ""), token_budget("fake_news"))
+    return article_message(state.get("article_title", "Untitled Article"), text)
+
+
+def feedback_messages(state: Dict[str, Any], agent: str) -> List[Dict[str, str]]:
+    """
+    The validator's objections to the agent's previous output, if it is being re-run.
+
+    Appended after the agent's own messages; empty on a first run.
+    """
+    feedback = state.get("refined_prompts", {}).get(agent)
+    if not feedback:
+        return []
+    return [{
+        "role": "user",
+        "content": f"{feedback}\nCorrect these issues in your new answer and keep the requested format."
+    }]
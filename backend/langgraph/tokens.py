@@ -0,0 +1,107 @@
+"""
+Token counting, per-agent token budgets and chunking of long articles
+
+Counts use tiktoken when it is installed and otherwise a character-based
+estimate (about four characters per token for English text), which is close
+enough for deciding whether an article fits a budget.
+"""
+
+import importlib.util
+import logging
+import os
+import re
+from typing import List, Optional
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Article tokens an agent may send in one prompt; longer articles are chunked or trimmed
+DEFAULT_TOKEN_BUDGET = int(os.environ.get("TOKEN_BUDGET_DEFAULT", "6000"))
+AGENT_TOKEN_BUDGETS = {
+    agent: int(os.environ.get(f"TOKEN_BUDGET_{agent.upper()}", DEFAULT_TOKEN_BUDGET))
+    for agent in ("fake_news", "credibility", "sentiment", "summary", "fused")
+}
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_encodings = {}
+
+
+def token_budget(agent: str) -> int:
+    """Article token budget of an agent"""
+    return AGENT_TOKEN_BUDGETS.get(agent, DEFAULT_TOKEN_BUDGET)
+
+
+def _encoding(model: str) -> Optional[object]:
+    if model not in _encodings:
+        encoding = None
+        if importlib.util.find_spec("tiktoken") is not None:
+            try:
+                import tiktoken
+                try:
+                    encoding = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    encoding = tiktoken.get_encoding("o200k_base")
+            except Exception as e:
+                logger.warning(f"tiktoken unavailable for {model}, estimating tokens: {str(e)}")
+        _encodings[model] = encoding
+    return _encodings[model]
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """Number of tokens in text for the given model"""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return max(len(text) // 4, len(text.split()))
+
+
+def _split_oversized(piece: str, max_tokens: int, model: str) -> List[str]:
+    """Split a paragraph that alone exceeds the budget into sentences, then words"""
+    if count_tokens(piece, model) <= max_tokens:
+        return [piece]
+    sentences = _SENTENCE_END.split(piece)
+    if len(sentences) > 1:
+        return [part for sentence in sentences for part in _split_oversized(sentence, max_tokens, model)]
+    words = piece.split()
+    # Split a run-on sentence by word count, scaled to the budget
+    step = max(1, int(len(words) * max_tokens / count_tokens(piece, model)))
+    return [" ".join(words[i:i + step]) for i in range(0, len(words), step)]
+
+
+def chunk_text(text: str, max_tokens: int, model: str = "gpt-4o-mini") -> List[str]:
+    """
+    Split text into consecutive chunks of at most max_tokens.
+
+    Chunks break at paragraph boundaries where possible, then at sentence
+    boundaries, and only split inside a sentence as a last resort.
+    """
+    if count_tokens(text, model) <= max_tokens:
+        return [text]
+
+    pieces = [
+        part
+        for paragraph in re.split(r"\n\s*\n|\n", text) if paragraph.strip()
+        for part in _split_oversized(paragraph.strip(), max_tokens, model)
+    ]
+
+    chunks, current, current_tokens = [], [], 0
+    for piece in pieces:
+        piece_tokens = count_tokens(piece, model) + 1  # The paragraph separator
+        if current and current_tokens + piece_tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += piece_tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def truncate_to_budget(text: str, max_tokens: int, model: str = "gpt-4o-mini") -> str:
+    """Keep the leading chunk of text that fits the budget"""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    logger.info(f"Truncating article from {count_tokens(text, model)} to {max_tokens} tokens")
+    return chunk_text(text, max_tokens, model)[0]
@@ -11,19 +11,36 @@ class AnalysisState(TypedDict, total=False):
     This state is passed between agents and tracks the analysis process.
     """
     article_content: str
+    compressed_content: str
+    compression: Dict[str, Any]
+    llm_usage: Dict[str, Any]
     article_title: str
     article_url: str
     article_source: Optional[str]
+    content_hash: str
+    content_fingerprint: str
+    reused_from: Dict[str, Any]
     fake_news_result: Dict
     credibility_result: Dict
     sentiment_result: Dict
-    summary_result: str
+    summary_result: Optional[str]
+    summary_error: str
     agents_called: List[str]
+    agents_reused: List[str]
+    fused_sections: List[str]
+    article_chunks: Dict[str, int]
+    agent_fingerprints: Dict[str, str]
     agent_invocation_counts: Dict[str, int]
     last_agent_run: str
     validation_passed: bool
+    validation_report: Dict[str, Dict[str, Any]]
+    llm_validation_count: int
     refined_prompts: Dict[str, str]
     call_fake_news: bool
     call_credibility: bool
     call_sentiment: bool
-    call_summary: bool 
\ No newline at end of file
+    call_summary: bool
+    head_node_decision: Dict[str, Any]
+    num_claims: int
+    analysis_profile: str
+    analysis_time_ms: Dict[str, float] 
\ No newline at end of file
@@ -0,0 +1,127 @@
+"""
+Token and cost accounting per analysis job and agent
+
+The gateway reports every LLM call here: prompt, provider-cached and
+completion tokens from the response's usage field, the call's latency and
+its cost at the model's price. Calls are added to the process-wide metrics
+and to the usage ledger of the job they were made for. process_article()
+opens the ledger with track_usage(); agents need not pass it along because it
+travels with the asyncio context, including into tasks the job starts.
+
+A ledger is a plain dict so that it is checkpointed and stored with the
+analysis results:
+
+    {"agents": {"sentiment": {"calls": 1, "prompt_tokens": 900, ...}}, "total": {...}}
+
+Prices are US dollars per million tokens (input, cached input, output) and
+can be overridden with LLM_PRICES, e.g.
+LLM_PRICES='{"gpt-4o-mini": [0.15, 0.075, 0.6]}'.
+"""
+
+import contextvars
+import json
+import logging
+import os
+from typing import Any, Dict, Optional
+
+from utils import metrics
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRICES = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-3.5-turbo": (0.50, 0.50, 1.50),
+}
+
+
+def _load_prices() -> Dict[str, tuple]:
+    prices = dict(DEFAULT_PRICES)
+    try:
+        prices.update({model: tuple(price) for model, price in json.loads(os.environ.get("LLM_PRICES", "{}")).items()})
+    except (ValueError, TypeError, AttributeError) as e:
+        logger.warning(f"Ignoring invalid LLM_PRICES: {e}")
+    return prices
+
+
+MODEL_PRICES = _load_prices()
+
+USAGE_FIELDS = ("calls", "cache_hits", "prompt_tokens", "cached_prompt_tokens", "completion_tokens",
+                "latency_ms", "cost_usd")
+
+_ledger: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("llm_usage", default=None)
+
+
+def model_price(model: Optional[str]) -> Optional[tuple]:
+    """Price of a model, matching dated snapshots (gpt-4o-2024-08-06) to their base model"""
+    if not model:
+        return None
+    if model in MODEL_PRICES:
+        return MODEL_PRICES[model]
+    # Longest prefix first so gpt-4o-mini-... is not priced as gpt-4o
+    for name in sorted(MODEL_PRICES, key=len, reverse=True):
+        if model.startswith(name + "-"):
+            return MODEL_PRICES[name]
+    return None
+
+
+def call_cost(model: Optional[str], prompt_tokens: int, cached_prompt_tokens: int, completion_tokens: int) -> float:
+    """Cost of one call in US dollars; 0 for models without a known price"""
+    price = model_price(model)
+    if price is None:
+        return 0.0
+    uncached = max(0, prompt_tokens - cached_prompt_tokens)
+    return (uncached * price[0] + cached_prompt_tokens * price[1] + completion_tokens * price[2]) / 1_000_000
+
+
+def new_usage() -> Dict[str, Any]:
+    """An empty ledger"""
+    return {"agents": {}, "total": {field: 0 for field in USAGE_FIELDS}}
+
+
+def add_usage(ledger: Dict[str, Any], agent: str, counts: Dict[str, float]) -> None:
+    """Add counts to an agent's entry and the ledger total"""
+    for entry in (ledger["agents"].setdefault(agent, {field: 0 for field in USAGE_FIELDS}), ledger["total"]):
+        for field, value in counts.items():
+            entry[field] = round(entry.get(field, 0) + value, 6 if field == "cost_usd" else 1)
+
+
+def track_usage(ledger: Dict[str, Any]) -> contextvars.Token:
+    """Attribute the LLM calls of the current context to ledger until reset_usage(token)"""
+    return _ledger.set(ledger)
+
+
+def reset_usage(token: contextvars.Token) -> None:
+    _ledger.reset(token)
+
+
+def current_usage() -> Optional[Dict[str, Any]]:
+    return _ledger.get()
+
+
+def record_call(agent: str, model: Optional[str], prompt_tokens: int, cached_prompt_tokens: int,
+                completion_tokens: int, latency_ms: float) -> float:
+    """Account for one call to the provider; returns its cost"""
+    cost = call_cost(model, prompt_tokens, cached_prompt_tokens, completion_tokens)
+    metrics.inc("llm_cost_usd_total", cost, agent=agent, model=model or "unknown")
+    ledger = _ledger.get()
+    if ledger is not None:
+        add_usage(ledger, agent, {
+            "calls": 1,
+            "prompt_tokens": prompt_tokens,
+            "cached_prompt_tokens": cached_prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "latency_ms": latency_ms,
+            "cost_usd": cost,
+        })
+    return cost
+
+
+def record_cache_hit(agent: str) -> None:
+    """Account for a call answered by the local response cache, which costs nothing"""
+    ledger = _ledger.get()
+    if ledger is not None:
+        add_usage(ledger, agent, {"cache_hits": 1})
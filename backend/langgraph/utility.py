@@ -3,9 +3,12 @@ Utility functions for the LangGraph workflow
 """
 
 import asyncio
+import hashlib
+import json
 import logging
 import os
-from typing import Dict, Any, Optional
+import time
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 import aiohttp
 from dotenv import load_dotenv
@@ -26,19 +29,61 @@ from .agents import (
     CredibilityAgent,
     SentimentAgent,
     SummaryAgent,
-    ValidatorAgent
+    ValidatorAgent,
+    FusedAnalysisAgent
 )
+from .agents.validator_agent import INVALID
 
-# Mock OpenAI client for development
+from database.crud import (
+    compute_content_hash,
+    compute_content_fingerprint,
+    get_article_by_content_hash,
+    find_near_duplicate,
+    normalize_url,
+    record_dedup_hit
+)
+from database.checkpoints import save_checkpoint, load_checkpoint
+from .tokens import count_tokens, token_budget
+from .fast_analysis import FAST_PROFILE
+from .compression import ARTICLE_COMPRESSION, compress_article
+from .prompts import article_chunks
+from .usage import current_usage, new_usage, reset_usage, track_usage
+from .llm_cache import defer_writes, end_deferred_writes, reset_skip_reads, skip_reads
+from utils.circuit_breaker import circuit_breaker
+
+# Seconds before an article fetch is given up
+ARTICLE_FETCH_TIMEOUT = float(os.environ.get("ARTICLE_FETCH_TIMEOUT", "20"))
+
+# Bodies shorter than this (paywall teasers, cookie walls) are too generic to dedupe on
+CONTENT_DEDUP_MIN_WORDS = int(os.environ.get("CONTENT_DEDUP_MIN_WORDS", "50"))
+
+# State keys each agent's output depends on; a result is reusable while these are unchanged
+AGENT_INPUTS = {
+    "fake_news": ["article_content", "num_claims"],
+    "credibility": ["article_source", "article_title", "article_content"],
+    "sentiment": ["article_content"],
+    "summary": ["article_content"],
+}
+
+# State keys holding each agent's output
+AGENT_RESULT_KEYS = {
+    "fake_news": ["fake_news_result"],
+    "credibility": ["credibility_result", "credibility_raw_output"],
+    "sentiment": ["sentiment_result", "sentiment_raw_output"],
+    "summary": ["summary_result"],
+}
+
+# Answer credibility, sentiment and summary with one LLM request instead of three
+FUSED_ANALYSIS = os.environ.get("FUSED_ANALYSIS", "false").lower() == "true"
+FUSED_AGENTS = ["credibility", "sentiment", "summary"]
+
+# LLM clients (real and mock) are owned by the shared gateway in llm_gateway.py
+
+# Mock search client for development
 try:
-    from utils.mock_openai import MockOpenAI
     from utils.mock_search import MockSearchAPI
 except ImportError:
     # Fallback for when imports fail
-    class MockOpenAI:
-        async def chat_create(self, *args, **kwargs):
-            return {"choices": [{"message": {"content": "Mock response from OpenAI"}}]}
-            
     class MockSearchAPI:
         async def search(self, *args, **kwargs):
             return ["Mock search result 1", "Mock search result 2"]
@@ -46,19 +91,13 @@ except ImportError:
 # Use real or mock clients based on environment
 if os.environ.get("USE_MOCK_APIS", "true").lower() == "true":
     logger.info("Using MOCK APIs for development")
-    openai_client = MockOpenAI()
     search_api = MockSearchAPI()
 else:
     logger.info("Using REAL APIs")
     
-    # Initialize OpenAI client
-    openai_api_key = os.environ.get("OPENAI_API_KEY")
-    if not openai_api_key:
+    if not os.environ.get("OPENAI_API_KEY"):
         logger.warning("No OpenAI API key found in environment variables")
     
-    from openai import AsyncOpenAI
-    openai_client = AsyncOpenAI(api_key=openai_api_key)
-    
     # Initialize Google Search API
     search_api_key = os.environ.get("SEARCH_API_KEY")
     search_engine_cx = os.environ.get("SEARCH_ENGINE_CX")
@@ -82,14 +121,32 @@ else:
         search_api = SearchAPI(api_key=search_api_key, cx=search_engine_cx)
 
 async def fetch_article_content(url: str) -> Dict[str, Any]:
-    """Fetch article content from URL"""
+    """
+    Fetch article content from URL
+    
+    Each site has its own circuit breaker: after repeated timeouts,
+    connection errors or 5xx from a site, its articles fall back to
+    placeholder content at once until a trial fetch succeeds.
+    """
     logger.info(f"Fetching article content from: {url}")
+    from urllib.parse import urlparse
+    breaker = circuit_breaker(f"fetch:{urlparse(url).netloc}")
+    if not breaker.allow():
+        logger.warning(f"Circuit open for {urlparse(url).netloc}, using placeholder content")
+        return create_mock_content(url)
     
     # In a production implementation, this would use a more robust scraper
     try:
         # Basic article fetching
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=ARTICLE_FETCH_TIMEOUT)) as session:
             async with session.get(url) as response:
+                # Any answer short of a server error shows the site is up
+                if response.status >= 500:
+                    breaker.record_failure()
+                elif response.status == 429:
+                    breaker.record_ignored()
+                else:
+                    breaker.record_success()
                 if response.status != 200:
                     logger.warning(f"Failed to fetch article: {response.status}")
                     # Fall back to mock content
@@ -111,8 +168,12 @@ async def fetch_article_content(url: str) -> Dict[str, Any]:
                     "url": url,
                     "date": datetime.now().strftime("%Y-%m-%d")
                 }
+    except asyncio.CancelledError:
+        breaker.record_ignored()
+        raise
     except Exception as e:
         logger.error(f"Error fetching article: {str(e)}")
+        breaker.record_failure()
         # Fall back to mock content
         return create_mock_content(url)
 
@@ -228,7 +289,202 @@ async def create_workflow() -> Any:
     logger.warning("LangGraph is not being used; using sequential processing instead")
     return None
 
-async def process_article(url: str, title: Optional[str] = None, source: Optional[str] = None, num_claims: int = 2) -> Dict[str, Any]:
+def find_reusable_analysis(content: str, url: str, title: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Look up an earlier analysis of the same article body published under another URL.
+    
+    Tries an exact match on the normalized text hash first, then a MinHash
+    near-duplicate match (NEAR_DUP_THRESHOLD) for copies that differ only by a
+    byline, timestamp or ad text. Returns a copy of the stored results
+    re-labelled for the new URL, with "reused_from" pointing at the original
+    article, or None if there is no match.
+    """
+    if os.environ.get("CONTENT_DEDUP", "true").lower() != "true":
+        return None
+    if len((content or "").split()) < CONTENT_DEDUP_MIN_WORDS:
+        return None
+    
+    content_hash = compute_content_hash(content)
+    fingerprint = compute_content_fingerprint(content)
+    existing = get_article_by_content_hash(content_hash)
+    reused_from = {"match": "exact", "similarity": 1.0}
+    if not existing:
+        near_duplicate = find_near_duplicate(fingerprint)
+        if near_duplicate:
+            existing, score = near_duplicate
+            reused_from = {"match": "near_duplicate", "similarity": round(score, 4)}
+    if not existing or not existing.analysis_results:
+        return None
+    
+    runs_saved = record_dedup_hit()
+    logger.info(f"Content of {url} matches article {existing.id} ({reused_from['match']}), reusing results ({runs_saved} runs saved so far)")
+    
+    results = dict(existing.analysis_results)
+    results["article_url"] = url
+    if title:
+        results["article_title"] = title
+    results["content_hash"] = content_hash
+    results["content_fingerprint"] = fingerprint
+    # The original paid for the analysis; this copy cost nothing
+    results["llm_usage"] = new_usage()
+    results["reused_from"] = {
+        "article_id": existing.id,
+        "url": existing.url,
+        **reused_from
+    }
+    return results
+
+def compute_agent_fingerprints(state: AnalysisState) -> Dict[str, str]:
+    """Hash the inputs of each agent so unchanged results can be reused on re-analysis"""
+    fingerprints = {}
+    for name, keys in AGENT_INPUTS.items():
+        payload = json.dumps([state.get(key) for key in keys], sort_keys=True, default=str)
+        fingerprints[name] = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return fingerprints
+
+def reuse_previous_result(name: str, state: AnalysisState, previous_results: Optional[Dict[str, Any]]) -> bool:
+    """
+    Copy an agent's output from the previous analysis if its inputs are unchanged.
+    
+    Returns True if the previous result was merged into the state.
+    """
+    if not previous_results:
+        return False
+    previous_fingerprint = previous_results.get("agent_fingerprints", {}).get(name)
+    result_key = AGENT_RESULT_KEYS[name][0]
+    if previous_fingerprint != state["agent_fingerprints"][name] or result_key not in previous_results:
+        return False
+    previous = previous_results[result_key]
+    if previous is None or (isinstance(previous, dict) and previous.get("error")):
+        # A failed analysis is tried again rather than carried forward
+        return False
+    
+    for key in AGENT_RESULT_KEYS[name]:
+        if key in previous_results:
+            state[key] = previous_results[key]
+    state["agents_reused"].append(name)
+    logger.info(f"Inputs of {name} agent unchanged, reusing previous result")
+    return True
+
+def checkpoint_state(checkpoint: Optional[Dict[str, Any]], url: str) -> Optional[AnalysisState]:
+    """
+    The state of a checkpoint if it belongs to this request, else None.
+    
+    A checkpoint is only resumed when it was written for the same URL and
+    its article text still matches the content hash it was analyzed under.
+    """
+    if not checkpoint or not checkpoint.get("state"):
+        return None
+    state = checkpoint["state"]
+    request_url = (checkpoint.get("request") or {}).get("url", state.get("article_url"))
+    if normalize_url(request_url or "") != normalize_url(url) or normalize_url(state.get("article_url") or "") != normalize_url(url):
+        logger.warning(f"Checkpoint of job {checkpoint.get('job_id')} is for {request_url}, not {url}; ignoring it")
+        return None
+    if state.get("content_hash") != compute_content_hash(state.get("article_content", "")):
+        logger.warning(f"Checkpoint of job {checkpoint.get('job_id')} does not match its content hash; ignoring it")
+        return None
+    return state
+
+async def run_agent_with_validation(name: str, agent: Any, validator: ValidatorAgent, state: AnalysisState) -> AnalysisState:
+    """
+    Run an agent, validate its output and re-run it while validation fails.
+    
+    The validator caps re-runs, so this loop always terminates. Agent errors
+    are recorded in the state as "<name>_error" and never re-raised. The
+    agent's LLM responses are only cached once the validator accepts its
+    output, and re-runs do not read the cache.
+    """
+    rerun = False
+    while True:
+        logger.info(f"Running {name.replace('_', ' ')} agent")
+        writes = defer_writes()
+        reads = skip_reads(rerun)
+        try:
+            state = await agent(state)
+        except Exception as e:
+            logger.error(f"Error in {name.replace('_', ' ')} agent: {str(e)}")
+            state[f"{name}_error"] = str(e)
+            reset_skip_reads(reads)
+            end_deferred_writes(writes, commit=False)
+            return state
+        reset_skip_reads(reads)
+        
+        state = await validator(state)
+        accepted = state.get("validation_report", {}).get(name, {}).get("status") != INVALID
+        end_deferred_writes(writes, commit=accepted)
+        if state.get("validation_passed", True):
+            return state
+        logger.info(f"Validation failed for {name} agent, re-running")
+        rerun = True
+
+async def run_fused_analysis(sections: List[str], validator: ValidatorAgent, state: AnalysisState) -> AnalysisState:
+    """
+    Produce several agents' results with one FusedAnalysisAgent call and validate each.
+    
+    Sections that are missing from the fused response or fail validation are
+    removed from the state again, so the caller runs those agents on their own.
+    The fused response is only cached if every section was accepted.
+    """
+    logger.info(f"Running fused analysis for {', '.join(sections)}")
+    writes = defer_writes()
+    try:
+        state = await FusedAnalysisAgent(sections)(state)
+    except Exception as e:
+        logger.error(f"Error in fused analysis: {str(e)}")
+        end_deferred_writes(writes, commit=False)
+        return state
+    
+    accepted = True
+    for name in sections:
+        if AGENT_RESULT_KEYS[name][0] not in state:
+            accepted = False
+            continue
+        state["last_agent_run"] = name
+        state = await validator(state)
+        # The fused attempt gets no re-run of its own; a rejected section goes to its agent,
+        # whose re-run budget is untouched
+        if state["validation_report"][name]["status"] == INVALID:
+            logger.info(f"Validation failed for fused {name} result, running {name} agent separately")
+            accepted = False
+            for key in AGENT_RESULT_KEYS[name]:
+                state.pop(key, None)
+    end_deferred_writes(writes, commit=accepted)
+    return state
+
+async def run_fast_analysis(url: str, title: Optional[str] = None, source: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Analyze an article without any LLM or search call.
+    
+    Sentiment and summary are computed on CPU by the agents' fast profile;
+    fake news and credibility are left to the full analysis, which refines
+    these results later.
+    """
+    started = time.perf_counter()
+    article_data = await fetch_article_content(url)
+    fetched = time.perf_counter()
+    
+    state: AnalysisState = {
+        "article_content": article_data["content"],
+        "article_title": title or article_data["title"],
+        "article_url": url,
+        "article_source": source or article_data.get("source"),
+        "analysis_profile": FAST_PROFILE,
+        "agents_called": [],
+        "agent_invocation_counts": {}
+    }
+    state = await SentimentAgent()(state)
+    state = await SummaryAgent()(state)
+    
+    state["analysis_time_ms"] = {
+        "fetch": round((fetched - started) * 1000, 1),
+        "analysis": round((time.perf_counter() - fetched) * 1000, 1)
+    }
+    logger.info(f"Fast analysis of {url} took {state['analysis_time_ms']}")
+    return state
+
+async def process_article(url: str, title: Optional[str] = None, source: Optional[str] = None, num_claims: int = 2,
+                          previous_results: Optional[Dict[str, Any]] = None, job_id: Optional[str] = None,
+                          article_id: Optional[str] = None, article_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     Process a news article with sequential processing of each agent.
     
@@ -239,82 +495,142 @@ async def process_article(url: str, title: Optional[str] = None, source: Optiona
         title: Optional title of the article
         source: Optional source name of the article
         num_claims: Number of claims to extract and analyze (default: 2)
+        previous_results: Stored analysis of this article when re-analyzing it;
+            only agents whose inputs changed since then are run again
+        job_id: Optional job ID; the state is checkpointed after every agent
+            under this ID and a later call with the same ID and URL resumes from it
+        article_id: Optional ID the result will be stored under, kept in the
+            checkpoint so a resumed job saves to the same article
+        article_data: The article already fetched by the caller ("content",
+            "title", "source"), e.g. by the fast analysis; it is not fetched again
     """
     logger.info(f"Processing article from URL: {url} with {num_claims} claims")
+    usage_token = None
     
     try:
-        # Fetch article content
-        article_data = await fetch_article_content(url)
+        resumed = checkpoint_state(load_checkpoint(job_id), url) if job_id else None
         
-        # Use provided title/source if available
-        if title:
-            article_data["title"] = title
-        if source:
-            article_data["source"] = source
+        if resumed:
+            state: AnalysisState = resumed
+            logger.info(f"Resuming job {job_id} from checkpoint (completed: {state.get('agents_called', [])})")
+        else:
+            # Fetch article content unless the caller already did
+            article_data = dict(article_data) if article_data else await fetch_article_content(url)
+            
+            # Use provided title/source if available
+            if title:
+                article_data["title"] = title
+            if source:
+                article_data["source"] = source
+            
+            # The same story is often republished under many URLs; reuse the first analysis
+            if not previous_results:
+                reused = find_reusable_analysis(article_data["content"], url, title)
+                if reused:
+                    return reused
+            
+            # Initialize state
+            state = {
+                "article_content": article_data["content"],
+                "article_title": article_data["title"],
+                "article_url": url,
+                "article_source": article_data.get("source"),
+                "content_hash": compute_content_hash(article_data["content"]),
+                "content_fingerprint": compute_content_fingerprint(article_data["content"]),
+                "agents_called": [],
+                "agents_reused": [],
+                "agent_invocation_counts": {},
+                "num_claims": num_claims  # Add the number of claims to the state
+            }
+            state["agent_fingerprints"] = compute_agent_fingerprints(state)
+            
+            # Agents read the article's most central sentences; claim extraction keeps the full text
+            if ARTICLE_COMPRESSION:
+                state = compress_article(state)
+            
+            # Run head node to decide which agents to call
+            state = await HeadNode()(state)
+            
+            if job_id:
+                save_checkpoint(job_id, state, request={
+                    "url": url,
+                    "title": title,
+                    "source": source,
+                    "num_claims": num_claims,
+                    "article_id": article_id
+                })
         
-        # Initialize state
-        state: AnalysisState = {
-            "article_content": article_data["content"],
-            "article_title": article_data["title"],
-            "article_url": url,
-            "article_source": article_data.get("source"),
-            "agents_called": [],
-            "agent_invocation_counts": {},
-            "num_claims": num_claims  # Add the number of claims to the state
-        }
+        # Charge the job's LLM calls to its results; a resumed job continues its checkpointed ledger
+        usage_token = track_usage(state.setdefault("llm_usage", new_usage()))
         
         # Sequential processing - this is now the only path
         logger.info("Using sequential processing")
-        head_node = HeadNode()
-        fake_news_agent = FakeNewsAgent()
-        credibility_agent = CredibilityAgent()
-        sentiment_agent = SentimentAgent()
-        summary_agent = SummaryAgent()
+        validator = ValidatorAgent()
         
-        # Run head node to decide which agents to call
-        state = await head_node(state)
-        
-        # Run fake news agent if needed
-        if state.get("call_fake_news", True):  # Default to True for complete analysis
-            logger.info("Running fake news agent")
-            try:
-                state = await fake_news_agent(state)
-            except Exception as e:
-                logger.error(f"Error in fake news agent: {str(e)}")
-                state["fake_news_error"] = str(e)
-        
-        # Run credibility agent if needed
-        if state.get("call_credibility", True):  # Default to True
-            logger.info("Running credibility agent")
-            try:
-                state = await credibility_agent(state)
-            except Exception as e:
-                logger.error(f"Error in credibility agent: {str(e)}")
-                state["credibility_error"] = str(e)
-        
-        # Run sentiment agent if needed
-        if state.get("call_sentiment", True):  # Default to True
-            logger.info("Running sentiment agent")
-            try:
-                state = await sentiment_agent(state)
-            except Exception as e:
-                logger.error(f"Error in sentiment agent: {str(e)}")
-                state["sentiment_error"] = str(e)
-        
-        # Always run summary agent
-        logger.info("Running summary agent")
-        try:
-            state = await summary_agent(state)
-        except Exception as e:
-            logger.error(f"Error in summary agent: {str(e)}")
-            state["summary_error"] = str(e)
+        # Default sequence: fake_news → credibility → sentiment → summary (always run)
+        pipeline = [
+            ("fake_news", "call_fake_news", FakeNewsAgent()),
+            ("credibility", "call_credibility", CredibilityAgent()),
+            ("sentiment", "call_sentiment", SentimentAgent()),
+            ("summary", "call_summary", SummaryAgent()),
+        ]
+        fused_attempted = not FUSED_ANALYSIS
+        for name, call_flag, agent in pipeline:
+            if not state.get(call_flag, True):  # Default to True for complete analysis
+                continue
+            if AGENT_RESULT_KEYS[name][0] in state:
+                logger.info(f"Skipping {name} agent, result already in state")
+                continue
+            if reuse_previous_result(name, state, previous_results):
+                if job_id:
+                    save_checkpoint(job_id, state)
+                continue
+            
+            if name in FUSED_AGENTS and not fused_attempted:
+                fused_attempted = True
+                # Later agents with an unchanged previous result keep it rather than join the fused call
+                pending = []
+                reused = False
+                for other, other_flag, _ in pipeline:
+                    if other not in FUSED_AGENTS or not state.get(other_flag, True):
+                        continue
+                    if AGENT_RESULT_KEYS[other][0] in state:
+                        continue
+                    if reuse_previous_result(other, state, previous_results):
+                        reused = True
+                    else:
+                        pending.append(other)
+                if reused and job_id:
+                    save_checkpoint(job_id, state)
+                # A single remaining agent gains nothing from fusing, and long
+                # articles are better served by the agents' own map-reduce
+                chunks = article_chunks(state)
+                fits = len(chunks) == 1 and count_tokens(chunks[0]) <= token_budget("fused")
+                if len(pending) > 1 and fits:
+                    state = await run_fused_analysis(pending, validator, state)
+            
+            if AGENT_RESULT_KEYS[name][0] not in state:
+                state = await run_agent_with_validation(name, agent, validator, state)
+            if job_id:
+                save_checkpoint(job_id, state)
         
+        # The compressed view and the shared article text are only inputs; the stored results keep their token counts
+        state.pop("compressed_content", None)
+        state.pop("article_prefix_chunks", None)
+        logger.info(f"LLM usage for {url}: {state['llm_usage']['total']}")
         return state
     
     except Exception as e:
         logger.error(f"Error processing article: {str(e)}")
-        return {
+        failed = {
             "error": f"Processing failed: {str(e)}",
             "article_url": url,
             "article_title": title or "Unknown"
-        } 
\ No newline at end of file
+        }
+        # Calls made before the failure were still paid for
+        if usage_token is not None:
+            failed["llm_usage"] = current_usage()
+        return failed
+    finally:
+        if usage_token is not None:
+            reset_usage(usage_token) 
\ No newline at end of file
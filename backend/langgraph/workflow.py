@@ -21,7 +21,8 @@ from .agents import (
     SentimentAgent,
     SummaryAgent,
     ValidatorAgent,
-    HeadNode
+    HeadNode,
+    FusedAnalysisAgent
 )
 
 # Re-export the router functions
@@ -31,5 +32,6 @@ from .routers import router, validation_router
 from .utility import (
     fetch_article_content,
     create_workflow,
-    process_article
+    process_article,
+    run_fast_analysis
 ) 
\ No newline at end of file
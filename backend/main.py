@@ -1,15 +1,31 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Header, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import os
 import json
+import asyncio
+import logging
+import secrets
+import uuid
 from datetime import datetime
 from typing import Optional, Dict, Any
 
 # Import our modules
 from database.models import ArticleCreate, ArticleResponse
-from database.crud import get_article_by_url, save_article, get_articles
-from langgraph.workflow import process_article
+from database.crud import get_article_by_url, save_article, get_articles, get_dedup_stats
+from database.checkpoints import delete_checkpoint, list_checkpoints
+from database.usage_log import get_llm_usage_stats, record_llm_usage
+from langgraph.workflow import process_article, run_fast_analysis
+from langgraph.llm_gateway import get_llm_gateway
+from langgraph.llm_json import parse_stats
+from langgraph.cascade import cascade_stats
+from langgraph.claim_cache import get_claim_cache
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Key for the /admin endpoints, sent in the X-Admin-Key header; unset disables them
+ADMIN_API_KEY = os.environ.get("ADMIN_API_KEY", "")
 
 app = FastAPI(title="News Processing API", description="API for processing news articles via LangGraph")
 
@@ -28,6 +44,7 @@ class ArticleRequest(BaseModel):
     title: Optional[str] = None
     source: Optional[str] = None
     num_claims: Optional[int] = 2  # Default is 2 claims
+    refresh: bool = False  # Re-analyze an updated article, re-running only agents whose inputs changed
 
 class ProcessResponse(BaseModel):
     message: str
@@ -35,6 +52,33 @@ class ProcessResponse(BaseModel):
     cached: bool = False
     results: Optional[Dict[str, Any]] = None
 
+@app.on_event("startup")
+async def resume_interrupted_jobs():
+    """Resume analyses that were in flight when the previous process stopped"""
+    for checkpoint in list_checkpoints():
+        request = checkpoint.get("request")
+        if not request:
+            continue
+        logger.info(f"Resuming interrupted job {checkpoint['job_id']} for {request['url']}")
+        # Checkpoints written before job ids were separate used the article id as job id
+        article_id = request.get("article_id") or checkpoint["job_id"]
+        asyncio.create_task(process_article_task(ArticleRequest(**request), article_id, job_id=checkpoint["job_id"]))
+
+@app.on_event("startup")
+async def warm_claim_index():
+    """Load the claim index in the background so the first fact check does not wait for it"""
+    asyncio.create_task(get_claim_cache().warm_index())
+
+@app.on_event("shutdown")
+async def close_llm_gateway():
+    """Release the pooled LLM connections"""
+    await get_llm_gateway().aclose()
+
+@app.on_event("shutdown")
+async def close_claim_cache():
+    """Close the claim verdict store"""
+    get_claim_cache().close()
+
 @app.get("/")
 async def root():
     return {"message": "News Processing API is running"}
@@ -44,11 +88,12 @@ async def process_news_article(article: ArticleRequest, background_tasks: Backgr
     """
     Process a news article by URL. If already processed, returns cached results.
     Otherwise, queues processing in the background and returns a message.
+    With refresh=true an already processed article is re-analyzed incrementally.
     """
     # Check if this URL has already been processed
     existing_article = get_article_by_url(article.url)
     
-    if existing_article:
+    if existing_article and not article.refresh:
         return ProcessResponse(
             message="Article already processed",
             article_id=existing_article.id,
@@ -56,6 +101,16 @@ async def process_news_article(article: ArticleRequest, background_tasks: Backgr
             results=existing_article.analysis_results
         )
     
+    if existing_article:
+        background_tasks.add_task(
+            process_article_task, article, existing_article.id, existing_article.analysis_results
+        )
+        return ProcessResponse(
+            message="Article re-analysis started",
+            article_id=existing_article.id,
+            cached=False
+        )
+    
     # Queue processing in background
     article_id = f"{datetime.now().strftime('%Y%m%d%H%M%S')}"
     background_tasks.add_task(process_article_task, article, article_id)
@@ -66,6 +121,49 @@ async def process_news_article(article: ArticleRequest, background_tasks: Backgr
         cached=False
     )
 
+@app.post("/process/fast", response_model=ProcessResponse)
+async def process_news_article_fast(article: ArticleRequest, background_tasks: BackgroundTasks):
+    """
+    Instant analysis for the popup view, without any LLM call.
+    
+    Sentiment and summary are computed on CPU and returned right away, and
+    the full analysis is queued to refine them. Already processed articles
+    return their full results as /process does. The response time includes
+    fetching the article, which the full analysis then reuses.
+    """
+    existing_article = get_article_by_url(article.url)
+    
+    if existing_article and not article.refresh:
+        return ProcessResponse(
+            message="Article already processed",
+            article_id=existing_article.id,
+            cached=True,
+            results=existing_article.analysis_results
+        )
+    
+    results = await run_fast_analysis(article.url, article.title, article.source)
+    # The full analysis works on the article fetched here instead of downloading it again
+    fetched = {
+        "content": results["article_content"],
+        "title": results["article_title"],
+        "source": results.get("article_source")
+    }
+    
+    if existing_article:
+        article_id = existing_article.id
+        background_tasks.add_task(process_article_task, article, article_id, existing_article.analysis_results,
+                                  prefetched=fetched)
+    else:
+        article_id = f"{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        background_tasks.add_task(process_article_task, article, article_id, prefetched=fetched)
+    
+    return ProcessResponse(
+        message="Fast analysis ready, full analysis started",
+        article_id=article_id,
+        cached=False,
+        results=results
+    )
+
 @app.get("/articles/{article_id}", response_model=ArticleResponse)
 async def get_article(article_id: str):
     """Get the processed results for a specific article by ID"""
@@ -87,16 +185,86 @@ async def get_article_by_url_param(url: str):
         raise HTTPException(status_code=404, detail="Article not found")
     return {"article": article}
 
+@app.get("/stats/dedup")
+async def dedup_stats():
+    """Report how many pipeline runs content-hash dedup has saved"""
+    return get_dedup_stats()
+
+@app.get("/stats/llm-cache")
+async def llm_cache_stats():
+    """Report LLM response cache hit rates per agent"""
+    return get_llm_gateway().cache_stats()
+
+@app.get("/stats/llm-tokens")
+async def llm_token_stats():
+    """Report prompt tokens per agent and how many the provider served from its prompt cache"""
+    return get_llm_gateway().token_stats()
+
+@app.get("/stats/llm-cost")
+async def llm_cost_stats(days: Optional[int] = None):
+    """Report LLM tokens, latency and cost of analysis jobs per day, source and agent"""
+    return get_llm_usage_stats(days)
+
+@app.get("/stats/llm-parse")
+async def llm_parse_stats():
+    """Report how often agents' JSON output was valid, repaired or unusable"""
+    return parse_stats()
+
+@app.get("/stats/llm-cascade")
+async def llm_cascade_stats():
+    """Report how often each agent's cheap-tier answers were kept or escalated"""
+    return cascade_stats()
+
+@app.get("/stats/claim-cache")
+async def claim_cache_stats():
+    """Report how often claim verdicts were reused across articles"""
+    return get_claim_cache().stats()
+
+@app.get("/metrics")
+async def get_metrics():
+    """All in-process counters and gauges"""
+    return metrics.snapshot()
+
+def require_admin_key(x_admin_key: Optional[str] = Header(None)):
+    """Reject admin requests without the configured ADMIN_API_KEY"""
+    if not ADMIN_API_KEY:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set ADMIN_API_KEY")
+    if not x_admin_key or not secrets.compare_digest(x_admin_key.encode(), ADMIN_API_KEY.encode()):
+        raise HTTPException(status_code=401, detail="Missing or wrong X-Admin-Key header")
+
+@app.delete("/admin/claim-verdicts", dependencies=[Depends(require_admin_key)])
+async def invalidate_claim_verdicts(
+    claim: Optional[str] = None,
+    containing: Optional[str] = None,
+    all_verdicts: bool = Query(False, alias="all")
+):
+    """Forget stored claim verdicts after the facts changed"""
+    if claim is None and containing is None and not all_verdicts:
+        raise HTTPException(status_code=400, detail="Pass claim, containing or all=true")
+    return {"invalidated": get_claim_cache().invalidate(claim=claim, containing=containing)}
+
 # Background task for processing articles
-async def process_article_task(article: ArticleRequest, article_id: str):
-    """Background task to process an article with LangGraph"""
+async def process_article_task(article: ArticleRequest, article_id: str, previous_results: Optional[Dict[str, Any]] = None,
+                               job_id: Optional[str] = None, prefetched: Optional[Dict[str, Any]] = None):
+    """
+    Background task to process an article with LangGraph.
+    
+    Each run is checkpointed under its own job id, never the article id:
+    article ids have one-second resolution and a refresh reuses the id.
+    An article the endpoint already fetched is passed in as prefetched.
+    """
+    job_id = job_id or uuid.uuid4().hex
     try:
         # Process the article with our LangGraph workflow
         result = await process_article(
             article.url, 
             article.title, 
             article.source,
-            num_claims=article.num_claims
+            num_claims=article.num_claims,
+            previous_results=previous_results,
+            job_id=job_id,
+            article_id=article_id,
+            article_data=prefetched
         )
         
         # Save the results to our database
@@ -108,7 +276,11 @@ async def process_article_task(article: ArticleRequest, article_id: str):
             processed_at=datetime.now(),
             analysis_results=result
         )
-        save_article(article_data)
+        record_llm_usage(article_id, article.url, result.get("article_source") or article.source,
+                         article_data.processed_at, result.get("llm_usage"))
+        if save_article(article_data):
+            # The final result is stored, the job no longer needs to be resumable
+            delete_checkpoint(job_id)
     except Exception as e:
         print(f"Error processing article {article_id}: {str(e)}")
         # In production, you'd want to log this to a monitoring system
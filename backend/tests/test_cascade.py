@@ -0,0 +1,86 @@
+import pytest
+import json
+import os
+import sys
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langgraph import cascade
+from langgraph.llm_cache import LLMResponseCache
+from langgraph.llm_gateway import LLMGateway, set_llm_gateway
+from langgraph.workflow import CredibilityAgent, SummaryAgent
+from utils import metrics
+from utils.mock_openai import MockChatCompletionResponse
+
+class TieredClient:
+    """The small model is unsure about articles titled "Hard", the large model is always sure"""
+    def __init__(self):
+        self.models = []
+        self.chat = self
+        self.completions = self
+
+    async def create(self, **kwargs):
+        model = kwargs["model"]
+        self.models.append(model)
+        hard = "Article Title: Hard" in kwargs["messages"][0]["content"]
+        if kwargs["messages"][-1]["content"].startswith("Summarize"):
+            words = 30 if model == "small" and hard else 100
+            return MockChatCompletionResponse(" ".join(["word"] * words))
+        confidence = 40 if model == "small" and hard else 90
+        return MockChatCompletionResponse(json.dumps({
+            "sourceReputationScore": 80 if model == "large" else 60,
+            "titleContentScore": 80,
+            "misleadingTitlesScore": 80,
+            "averageScore": 80,
+            "overallConclusion": f"Assessed by {model}",
+            "confidence": confidence
+        }))
+
+@pytest.fixture
+def cascade_gateway(monkeypatch):
+    monkeypatch.setenv("USE_MOCK_APIS", "false")
+    for agent in ("credibility", "summary"):
+        monkeypatch.setitem(cascade.AGENT_TIERS, agent, ["small", "large"])
+        monkeypatch.setitem(cascade.AGENT_THRESHOLDS, agent, 0.7)
+    metrics.reset()
+    gateway = LLMGateway(client=TieredClient(), use_mock=False, cache=LLMResponseCache(path=None))
+    gateway.cascade = True
+    set_llm_gateway(gateway)
+    yield gateway
+    set_llm_gateway(None)
+
+@pytest.mark.asyncio
+async def test_low_confidence_answers_escalate(cascade_gateway):
+    """Confident answers from the cheap tier are kept, unsure ones are asked again of the strong tier"""
+    easy = await CredibilityAgent()({"article_title": "Easy", "article_content": "A plain report."})
+    assert easy["credibility_result"]["evaluation"] == "Assessed by small"
+    hard = await CredibilityAgent()({"article_title": "Hard", "article_content": "A contested report."})
+    assert hard["credibility_result"]["evaluation"] == "Assessed by large"
+    assert cascade_gateway.client.models == ["small", "small", "large"]
+
+    stats = cascade.cascade_stats()["credibility"]
+    assert stats["escalation_rate"] == 0.5
+    assert stats["tiers"]["0"] == {"model": "small", "accepted": 1, "escalated": 1}
+    assert stats["tiers"]["1"] == {"model": "large", "accepted": 1, "escalated": 0}
+
+@pytest.mark.asyncio
+async def test_summary_escalates_on_validation_score(cascade_gateway):
+    """Summaries far from the requested length count as low confidence"""
+    state = await SummaryAgent()({"article_title": "Hard", "article_content": "A contested report."})
+    assert len(state["summary_result"].split()) == 100
+    assert cascade_gateway.client.models == ["small", "large"]
+
+@pytest.mark.asyncio
+async def test_cascade_disabled_keeps_requested_model(cascade_gateway):
+    cascade_gateway.cascade = False
+    await CredibilityAgent()({"article_title": "Hard", "article_content": "A contested report."})
+    assert cascade_gateway.client.models == ["gpt-4o-mini"]
+
+def test_json_confidence():
+    def answer(text):
+        return MockChatCompletionResponse(text)
+    assert cascade.json_confidence(answer('{"confidence": 85}')) == 0.85
+    assert cascade.json_confidence(answer('{"confidence": 0.3}')) == 0.3
+    assert cascade.json_confidence(answer('{"supports": true}')) is None
+    assert cascade.json_confidence(answer("I cannot answer that")) == 0.0
@@ -0,0 +1,162 @@
+import pytest
+import asyncio
+import os
+import sys
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langgraph import llm_gateway
+from langgraph.llm_cache import LLMResponseCache
+from langgraph.llm_gateway import LLMGateway, LLMUnavailableError
+from utils import metrics, search_api
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+@pytest.mark.asyncio
+async def test_breaker_states():
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_seconds=0.05, enabled=True)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    # A success in between resets the count
+    breaker.record_success()
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+    assert metrics.get_gauge("circuit_breaker_state", dependency="test") == 2
+
+    # After the reset period one trial call goes through; a failed trial opens it again
+    await asyncio.sleep(0.06)
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN and breaker.retry_in() > 0
+
+    # An inconclusive trial frees the slot for another; a successful one closes the breaker
+    await asyncio.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_ignored()
+    assert breaker.state == HALF_OPEN and breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+
+
+class DownClient:
+    """A provider whose connections all fail"""
+    def __init__(self):
+        self.chat = self
+        self.completions = self
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        raise ConnectionError("connection refused")
+
+
+@pytest.mark.asyncio
+async def test_gateway_fails_fast_while_provider_is_down(monkeypatch):
+    monkeypatch.setattr(llm_gateway, "LLM_BACKOFF_BASE", 0.001)
+    client = DownClient()
+    gateway = LLMGateway(client=client, use_mock=False, cache=LLMResponseCache(path=None))
+    gateway.breaker = CircuitBreaker("llm-test", failure_threshold=3, reset_seconds=60, enabled=True)
+    request = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "hi"}]}
+
+    # Retries stop as soon as the breaker opens
+    with pytest.raises(LLMUnavailableError) as raised:
+        await gateway.chat_completion("summary", **request)
+    assert raised.value.reason == "circuit_open"
+    assert client.calls == 3
+
+    # Later calls never reach the provider
+    with pytest.raises(LLMUnavailableError):
+        await gateway.chat_completion("sentiment", **request)
+    assert client.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_search_fails_fast_while_provider_is_down(monkeypatch):
+    monkeypatch.setattr(search_api, "search_breaker",
+                        CircuitBreaker("search-test", failure_threshold=2, reset_seconds=60, enabled=True))
+    calls = []
+
+    async def timing_out(self, params, query):
+        calls.append(query)
+        raise asyncio.TimeoutError()
+
+    monkeypatch.setattr(search_api.SearchAPI, "_request", timing_out)
+    api = search_api.SearchAPI(api_key="key", cx="cx")
+    for _ in range(4):
+        results = await api.search("claim")
+        assert results[0]["title"] == "Error"
+    assert len(calls) == 2
+    assert "unavailable" in results[0]["snippet"]
+
+
+@pytest.mark.asyncio
+async def test_disabled_breakers_never_reject(monkeypatch):
+    breaker = CircuitBreaker("disabled-test", failure_threshold=1, reset_seconds=60, enabled=False)
+    for _ in range(5):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.retry_in() == 0
+
+    # The gateway keeps retrying a down provider instead of failing fast
+    monkeypatch.setattr(llm_gateway, "LLM_BACKOFF_BASE", 0.001)
+    client = DownClient()
+    gateway = LLMGateway(client=client, use_mock=False, cache=LLMResponseCache(path=None))
+    gateway.breaker = breaker
+    gateway.max_retries = 2
+    request = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "hi"}]}
+    for _ in range(2):
+        with pytest.raises(LLMUnavailableError) as raised:
+            await gateway.chat_completion("summary", **request)
+        assert raised.value.reason == "connection"
+    assert client.calls == 6
+
+    # So does search
+    monkeypatch.setattr(search_api, "search_breaker", breaker)
+    calls = []
+
+    async def timing_out(self, params, query):
+        calls.append(query)
+        raise asyncio.TimeoutError()
+
+    monkeypatch.setattr(search_api.SearchAPI, "_request", timing_out)
+    api = search_api.SearchAPI(api_key="key", cx="cx")
+    for _ in range(3):
+        results = await api.search("claim")
+        assert "timed out" in results[0]["snippet"]
+    assert len(calls) == 3
+
+
+class ThrottlingSession:
+    """An aiohttp session stand-in whose pages all answer 429"""
+    def get(self, url):
+
+        class Response:
+            status = 429
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return Response()
+
+
+@pytest.mark.asyncio
+async def test_throttled_fetch_neither_closes_nor_opens_the_breaker(monkeypatch):
+    from langgraph.workflow import FakeNewsAgent
+    from utils import circuit_breaker as breakers
+    breaker = CircuitBreaker("fetch:example.com", failure_threshold=1, reset_seconds=0, enabled=True)
+    monkeypatch.setitem(breakers._breakers, "fetch:example.com", breaker)
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    # The half-open trial is throttled: no verdict on the site, and the next call may try again
+    assert await FakeNewsAgent()._fetch_page(ThrottlingSession(), "https://example.com/story") is None
+    assert breaker.state == HALF_OPEN and breaker.failures == 1
+    assert breaker.allow()
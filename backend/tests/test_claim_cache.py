@@ -0,0 +1,277 @@
+import pytest
+import json
+import os
+import asyncio
+import sqlite3
+import sys
+import threading
+import time
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langgraph.agents.fake_news_agent import FakeNewsAgent
+from langgraph.claim_cache import ClaimVerdictCache, claim_key, normalize_claim, set_claim_cache
+from langgraph.claim_index import HashedNgramEmbedder
+from langgraph.llm_cache import LLMResponseCache
+from langgraph.llm_gateway import LLMGateway, set_llm_gateway
+from utils import search_api
+from utils.mock_openai import MockChatCompletionResponse
+from utils.rate_limit import RatePacer
+
+
+def test_normalize_claim():
+    # Case, punctuation, articles, number formats and entity aliases do not matter
+    assert claim_key("The U.S. spent $1.5 million on COVID-19 vaccines.") == \
+           claim_key("united states of america spent 1,500,000 dollars on Covid 19 vaccines")
+    assert normalize_claim("Unemployment rose 5% in twenty-five states") == \
+           normalize_claim("unemployment rose five per cent in 25 States") == \
+           "unemployment rose 5 percent in 25 states"
+    assert normalize_claim("One thousand five hundred") == normalize_claim("1.5 thousand") == "1500"
+    # Different numbers are different claims
+    assert claim_key("Unemployment rose 5%") != claim_key("Unemployment rose 6%")
+    # America alone is the United States, but not after a qualifier
+    assert normalize_claim("America charges 4.5%") == "united states charges 4.5 percent"
+    for region in ("Latin America", "South America", "Central America"):
+        assert normalize_claim(f"{region} grew 3%") == f"{region.lower()} grew 3 percent"
+
+
+def test_verdicts_persist_expire_and_invalidate(tmp_path):
+    path = str(tmp_path / "verdicts.sqlite3")
+    cache = ClaimVerdictCache(path=path)
+    cache.put("The EU banned plastic straws", {"found": True, "reason": "Directive 2019/904", "score": 100},
+              ["https://example.org/straws"])
+    cache.put("UK inflation hit 11%", {"found": True, "reason": "ONS figures", "score": 100},
+              ["https://example.org/inflation"])
+    cache.close()
+
+    # A new process finds the verdicts on disk
+    cache = ClaimVerdictCache(path=path)
+    verdict = cache.get("the European Union banned plastic straws")
+    assert verdict["found"] and verdict["evidence"] == ["https://example.org/straws"]
+    assert cache.get("The EU banned plastic bags") is None
+    assert cache.stats()["hit_rate"] == 0.5
+
+    # Invalidation by claim, then by topic
+    assert cache.invalidate(claim="The E.U. banned plastic straws") == 1
+    assert cache.get("The EU banned plastic straws") is None
+    assert cache.invalidate(containing="United Kingdom inflation") == 1
+    assert cache.stats()["entries"] == 0
+
+    cache = ClaimVerdictCache(path=None, ttl=0)
+    cache.put("claim", {"found": False, "reason": "no", "score": 0}, ["https://example.org"])
+    assert cache.get("claim") is None
+    assert cache.stats()["expired"] == 1
+
+
+def test_rewordings_reuse_verdicts_when_facts_agree():
+    cache = ClaimVerdictCache(path=None, threshold=0.85)
+    cache.put("EU tariffs on jam exceed 24%", {"found": True, "reason": "Tariff schedule", "score": 100},
+              ["https://example.org/tariffs"])
+    assert cache.get("EU tariffs on jam exceed 24%")["found"]
+
+    verdict = cache.get("The EU's tariff on jam exceeds 24 percent")
+    assert verdict["reason"] == "Tariff schedule" and verdict["similarity"] >= 0.85
+    # Different numbers, a negation or another product make it another claim
+    assert cache.get("EU tariffs on jam exceed 30%") is None
+    assert cache.get("EU tariffs on jam do not exceed 24%") is None
+    assert cache.get("Tariffs on cheese in the EU exceed 24%") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["semantic_hits"], stats["misses"]) == (1, 1, 3)
+
+    # Claims stored after the index was built are found too, and invalidated ones are not
+    cache.put("Unemployment rose to 5% in March", {"found": False, "reason": "It fell", "score": 0},
+              ["https://example.org/jobs"])
+    assert cache.get("In March, unemployment rose to 5%")["reason"] == "It fell"
+    index = cache._index
+    assert cache.invalidate(containing="unemployment") == 1
+    assert cache.get("In March, unemployment rose to 5%") is None
+    # Invalidation removes the dropped claims instead of discarding the index
+    assert cache._index is index and len(index) == 1
+
+
+def test_hashed_vectors_miss_paraphrases():
+    # A documented limitation: without a sentence embedding model, a
+    # paraphrase sharing few words is a different claim
+    cache = ClaimVerdictCache(path=None)
+    cache.put("EU tariffs on jam exceed 24%", {"found": True, "reason": "Tariff schedule", "score": 100},
+              ["https://example.org/tariffs"])
+    assert cache.get("Europe charges over 24% duty on US jam") is None
+    assert cache.stats()["misses"] == 1
+
+
+class CountingEmbedder(HashedNgramEmbedder):
+    def __init__(self):
+        super().__init__()
+        self.embedded = []
+
+    def embed_many(self, texts):
+        self.embedded.extend(texts)
+        return super().embed_many(texts)
+
+
+@pytest.mark.asyncio
+async def test_index_loads_stored_vectors(tmp_path):
+    path = str(tmp_path / "verdicts.sqlite3")
+    # A store written before vectors were persisted
+    legacy = sqlite3.connect(path)
+    legacy.execute("CREATE TABLE verdicts (key TEXT PRIMARY KEY, normalized TEXT NOT NULL, payload TEXT NOT NULL,"
+                   " created_at REAL NOT NULL)")
+    entry = {"found": True, "reason": "Tariff schedule", "score": 100, "evidence": [],
+             "normalized_claim": normalize_claim("EU tariffs on jam exceed 24%"), "verified_at": time.time()}
+    legacy.execute("INSERT INTO verdicts VALUES (?, ?, ?, ?)",
+                   (claim_key("EU tariffs on jam exceed 24%"), entry["normalized_claim"], json.dumps(entry),
+                    entry["verified_at"]))
+    legacy.commit()
+    legacy.close()
+
+    embedder = CountingEmbedder()
+    cache = ClaimVerdictCache(path=path, embedder=embedder)
+    cache.put("Unemployment rose to 5% in March", {"found": False, "reason": "It fell", "score": 0}, [])
+    await cache.warm_index()
+    # Only the legacy row is embedded; the new verdict was stored with its vector
+    assert embedder.embedded == [entry["normalized_claim"]]
+    assert cache.stats()["index_entries"] == 2
+    cache.close()
+
+    # After a restart every vector comes from the store
+    embedder = CountingEmbedder()
+    cache = ClaimVerdictCache(path=path, embedder=embedder)
+    await cache.warm_index()
+    assert embedder.embedded == []
+    assert cache.get("The EU's tariff on jam exceeds 24 percent")["reason"] == "Tariff schedule"
+    assert cache.get("In March, unemployment rose to 5%")["reason"] == "It fell"
+    cache.close()
+
+    # Vectors from another embedder are recomputed
+    embedder = CountingEmbedder()
+    embedder.dim = 128
+    cache = ClaimVerdictCache(path=path, embedder=embedder)
+    await cache.warm_index()
+    assert len(embedder.embedded) == 2
+    cache.close()
+
+
+class VerdictClient:
+    """Extracts one claim per article and supports every claim it is asked to check"""
+    def __init__(self, claims):
+        self.chat = self
+        self.completions = self
+        self.claims = list(claims)
+        self.checks = 0
+
+    async def create(self, **kwargs):
+        prompt = " ".join(message["content"] for message in kwargs["messages"])
+        if "extracts exactly" in prompt:
+            return MockChatCompletionResponse(json.dumps({"claims": [self.claims.pop(0)]}))
+        self.checks += 1
+        return MockChatCompletionResponse(json.dumps({"supports": True, "reason": "Reported widely", "confidence": 90}))
+
+
+@pytest.mark.asyncio
+async def test_agent_reuses_verdicts_across_articles(monkeypatch):
+    monkeypatch.setenv("USE_MOCK_APIS", "false")
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("SEARCH_API_KEY", "key")
+    monkeypatch.setenv("SEARCH_ENGINE_CX", "cx")
+    searches = []
+
+    async def search(self, query, num_results=5):
+        searches.append(query)
+        return [{"title": query, "link": "https://example.org/report", "snippet": f"Evidence about {query}"}]
+
+    async def no_pages(self, search_results):
+        return []
+
+    monkeypatch.setattr(search_api.SearchAPI, "search", search)
+    monkeypatch.setattr(FakeNewsAgent, "_fetch_evidence", no_pages)
+    client = VerdictClient(["The U.S. has 50 states", "United States has fifty states"])
+    gateway = LLMGateway(client=client, use_mock=False, cache=LLMResponseCache(path=None))
+    gateway.pacer = RatePacer(0, 0)
+    cache = ClaimVerdictCache(path=None)
+    set_llm_gateway(gateway)
+    set_claim_cache(cache)
+    try:
+        results = []
+        for title in ("First article", "Second article"):
+            state = await FakeNewsAgent()({"article_title": title, "article_content": "Text.", "num_claims": 1})
+            results.append(state["fake_news_result"]["all_claims"][0])
+    finally:
+        set_llm_gateway(None)
+        set_claim_cache(None)
+
+    # The second article's rewording is answered without searching or checking again
+    assert searches == ["The U.S. has 50 states"]
+    assert client.checks == 1
+    assert results[1]["claim"] == "United States has fifty states"
+    assert results[1]["found"] and results[1]["cached"]
+    assert cache.stats()["hits"] == 1
+
+
+def test_invalidation_endpoint_requires_admin_key(monkeypatch):
+    from fastapi.testclient import TestClient
+    import main
+
+    cache = ClaimVerdictCache(path=None)
+    cache.put("UK inflation hit 11%", {"found": True, "reason": "ONS figures", "score": 100}, [])
+    set_claim_cache(cache)
+    # Without the context manager the startup hooks (job resumption) do not run
+    client = TestClient(main.app)
+    try:
+        monkeypatch.setattr(main, "ADMIN_API_KEY", "")
+        assert client.delete("/admin/claim-verdicts", params={"all": "true"}).status_code == 403
+
+        monkeypatch.setattr(main, "ADMIN_API_KEY", "s3cret")
+        assert client.delete("/admin/claim-verdicts", params={"all": "true"}).status_code == 401
+        assert client.delete("/admin/claim-verdicts", params={"all": "true"},
+                             headers={"X-Admin-Key": "wrong"}).status_code == 401
+        assert cache.get("UK inflation hit 11%") is not None
+
+        response = client.delete("/admin/claim-verdicts", params={"claim": "uk inflation hit 11 percent"},
+                                 headers={"X-Admin-Key": "s3cret"})
+        assert response.status_code == 200
+        assert response.json() == {"invalidated": 1}
+        assert cache.get("UK inflation hit 11%") is None
+    finally:
+        set_claim_cache(None)
+
+
+class BlockingEmbedder(HashedNgramEmbedder):
+    """Holds the index build until released"""
+    def __init__(self):
+        super().__init__()
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def embed_many(self, texts):
+        self.started.set()
+        assert self.release.wait(5)
+        return super().embed_many(texts)
+
+
+@pytest.mark.asyncio
+async def test_lookups_do_not_wait_for_the_index_build(tmp_path):
+    path = str(tmp_path / "verdicts.sqlite3")
+    cache = ClaimVerdictCache(path=path, semantic=False)
+    cache.put("EU tariffs on jam exceed 24%", {"found": True, "reason": "Tariff schedule", "score": 100}, [])
+    cache.close()
+
+    embedder = BlockingEmbedder()
+    cache = ClaimVerdictCache(path=path, embedder=embedder)
+    build = asyncio.create_task(cache.warm_index())
+    assert await asyncio.to_thread(embedder.started.wait, 5)
+    # Exact matches still work and rewordings miss instead of blocking the event loop
+    assert cache.get("EU tariffs on jam exceed 24%")["reason"] == "Tariff schedule"
+    assert cache.get("The EU's tariff on jam exceeds 24 percent") is None
+    # A claim stored and a claim dropped during the build are reflected in the index
+    cache.put("Unemployment rose to 5% in March", {"found": False, "reason": "It fell", "score": 0}, [])
+    cache.put("UK inflation hit 11%", {"found": True, "reason": "ONS figures", "score": 100}, [])
+    cache.invalidate(claim="UK inflation hit 11%")
+    await cache.warm_index()
+    embedder.release.set()
+    await build
+
+    assert cache.stats()["index_entries"] == 2
+    assert cache.get("The EU's tariff on jam exceeds 24 percent")["reason"] == "Tariff schedule"
+    assert cache.get("In March, unemployment rose to 5%")["reason"] == "It fell"
+    cache.close()
@@ -0,0 +1,60 @@
+import os
+import sys
+
+import numpy as np
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langgraph.claim_cache import normalize_claim
+from langgraph.claim_index import FlatIndex, HashedNgramEmbedder, IVFIndex
+
+
+def test_hashed_vectors_rank_rewordings_first():
+    embedder = HashedNgramEmbedder(dim=256)
+    stored = ["EU tariffs on jam exceed 24%", "The president visited Paris on Monday",
+              "Unemployment rose to 5% in March", "Tariffs on cheese in the EU exceed 24%"]
+    index = FlatIndex(embedder.dim)
+    for claim in stored:
+        index.add(claim, embedder.embed(normalize_claim(claim)))
+
+    matches = index.search(embedder.embed(normalize_claim("The EU's tariff on jam exceeds 24 percent")), k=2)
+    assert matches[0][0] == "EU tariffs on jam exceed 24%"
+    assert matches[0][1] > 0.85 > matches[1][1]
+    assert index.search(embedder.embed(normalize_claim("Paris was visited by the president")))[0][0] == \
+           "The president visited Paris on Monday"
+
+    # Removed claims are never returned; replacing a claim keeps one row
+    assert index.remove("EU tariffs on jam exceed 24%")
+    assert index.search(embedder.embed(normalize_claim("EU tariffs on jam exceed 24%")))[0][0] != \
+           "EU tariffs on jam exceed 24%"
+    index.add("Unemployment rose to 5% in March", embedder.embed(normalize_claim("Unemployment rose to 5% in March")))
+    assert len(index) == 3
+
+
+def test_ivf_index_finds_near_duplicates():
+    rng = np.random.default_rng(1)
+    dim, size = 64, 6000
+    # Clustered data, like claims about the same stories
+    centers = rng.standard_normal((50, dim))
+    vectors = centers[rng.integers(0, 50, size)] + 0.5 * rng.standard_normal((size, dim))
+    vectors = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+    keys = [f"claim-{i}" for i in range(size)]
+
+    flat, ivf = FlatIndex(dim), IVFIndex(dim, min_size=4000, nprobe=4)
+    flat.add_many(keys[:5000], vectors[:5000])
+    ivf.add_many(keys[:5000], vectors[:5000])
+    assert ivf.centroids is not None and len(ivf.centroids) == 70
+    # Vectors added after training join their nearest list
+    for key, vector in zip(keys[5000:], vectors[5000:]):
+        flat.add(key, vector)
+        ivf.add(key, vector)
+
+    queries = rng.integers(0, size, 200)
+    found = 0
+    for i in queries:
+        query = vectors[i] + 0.05 * rng.standard_normal(dim).astype(np.float32)
+        query /= np.linalg.norm(query)
+        assert flat.search(query)[0][0] == keys[i]
+        found += ivf.search(query)[0][0] == keys[i]
+    assert found / len(queries) > 0.95
@@ -0,0 +1,126 @@
+import pytest
+import asyncio
+import json
+import os
+import sys
+import time
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langgraph.agents import fake_news_agent
+from langgraph.agents.fake_news_agent import FakeNewsAgent
+from langgraph.claim_cache import ClaimVerdictCache, set_claim_cache
+from langgraph.llm_cache import LLMResponseCache
+from langgraph.llm_gateway import LLMGateway, set_llm_gateway
+from utils import search_api
+from utils.mock_openai import MockChatCompletionResponse
+from utils.rate_limit import RatePacer
+
+CLAIMS = ["Claim one", "Claim two", "Claim broken", "Claim four", "Claim five"]
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+class ClaimClient:
+    """Extracts CLAIMS, then answers each check after a delay, failing the broken claim"""
+    def __init__(self, delay: float):
+        self.chat = self
+        self.completions = self
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create(self, **kwargs):
+        prompt = " ".join(message["content"] for message in kwargs["messages"])
+        if "extracts exactly" in prompt:
+            return MockChatCompletionResponse(json.dumps({"claims": CLAIMS}))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        if "Claim broken" in prompt:
+            raise BadRequest("malformed request")
+        verified = "Claim two" not in prompt
+        return MockChatCompletionResponse(json.dumps({
+            "supports": verified, "is_verified": verified, "reason": "checked", "analysis": "checked"
+        }))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("with_search", [False, True])
+async def test_claims_are_verified_concurrently(monkeypatch, with_search):
+    monkeypatch.setenv("USE_MOCK_APIS", "false")
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(fake_news_agent, "CLAIM_CONCURRENCY", 2)
+    if with_search:
+        monkeypatch.setenv("SEARCH_API_KEY", "key")
+        monkeypatch.setenv("SEARCH_ENGINE_CX", "cx")
+
+        async def search(self, query, num_results=5):
+            return [{"title": query, "link": "", "snippet": f"Evidence about {query}"}]
+        monkeypatch.setattr(search_api.SearchAPI, "search", search)
+    else:
+        monkeypatch.delenv("SEARCH_API_KEY", raising=False)
+
+    client = ClaimClient(delay=0.2)
+    gateway = LLMGateway(client=client, use_mock=False, cache=LLMResponseCache(path=None))
+    # Pacing to the account's request rate would dominate the timings here
+    gateway.pacer = RatePacer(0, 0)
+    set_llm_gateway(gateway)
+    set_claim_cache(ClaimVerdictCache(path=None))
+    try:
+        started = time.perf_counter()
+        state = await FakeNewsAgent()({"article_title": "Title", "article_content": "Text.", "num_claims": 5})
+        elapsed = time.perf_counter() - started
+    finally:
+        set_llm_gateway(None)
+        set_claim_cache(None)
+
+    # Five 0.2 s checks two at a time take three rounds instead of five
+    assert client.max_in_flight == 2
+    assert elapsed < 0.8
+    results = state["fake_news_result"]["all_claims"]
+    assert [result["claim"] for result in results] == CLAIMS
+    # The broken claim fails on its own
+    assert [result["found"] for result in results] == [True, False, False, True, True]
+    assert "Error" in results[2]["reason"]
+
+
+@pytest.mark.asyncio
+async def test_evidence_pages_are_raced(monkeypatch):
+    monkeypatch.setattr(fake_news_agent, "EVIDENCE_FETCH_TOP_K", 4)
+    monkeypatch.setattr(fake_news_agent, "EVIDENCE_PAGES", 2)
+    monkeypatch.setattr(fake_news_agent, "EVIDENCE_FETCH_BUDGET", 1.0)
+    delays = {"https://slow.example": 5, "https://empty.example": 0.01,
+              "https://second.example": 0.1, "https://first.example": 0.05}
+    cancelled = []
+
+    async def fetch_page(self, session, link_url):
+        try:
+            await asyncio.sleep(delays[link_url])
+        except asyncio.CancelledError:
+            cancelled.append(link_url)
+            raise
+        return None if "empty" in link_url else f"Text of {link_url}"
+
+    monkeypatch.setattr(FakeNewsAgent, "_fetch_page", fetch_page)
+    results = [{"link": link} for link in delays] + [{"link": "https://fifth.example"}]
+
+    started = time.perf_counter()
+    pages = await FakeNewsAgent()._fetch_evidence(results)
+    # The slow page does not hold up the claim, and the fifth result is never fetched
+    assert time.perf_counter() - started < 0.5
+    assert cancelled == ["https://slow.example"]
+    # The winning pages keep their search rank order
+    assert [link for link, _ in pages] == ["https://second.example", "https://first.example"]
+
+    # With nothing usable in time the race ends at the budget
+    monkeypatch.setattr(fake_news_agent, "EVIDENCE_FETCH_BUDGET", 0.2)
+    started = time.perf_counter()
+    assert await FakeNewsAgent()._fetch_evidence([{"link": "https://slow.example"}]) == []
+    assert time.perf_counter() - started < 0.5
@@ -0,0 +1,53 @@
+import os
+import sys
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langgraph.compression import article_view, compress_article, compress_text
+from langgraph.tokens import count_tokens
+
+ARTICLE = (
+    "The city council approved a new transit plan on Tuesday after months of debate.\n\n"
+    "Subscribe to our newsletter to get the top stories delivered to your inbox every morning.\n\n"
+    "The transit plan adds three bus lines and extends light rail service to the airport. "
+    "Council members said the transit plan would cut commute times for thousands of residents.\n\n"
+    "Photo: council chamber during the vote on Tuesday evening.\n\n"
+    "Funding for the transit plan comes from a regional sales tax approved by voters last year. "
+    "Critics argued the light rail extension is too expensive and will take a decade to build. "
+    "The city council approved a new transit plan on Tuesday after months of debate.\n\n"
+    "Read more: the ten most popular stories of the week from around the region."
+)
+TITLE = "Council approves transit plan"
+
+
+def test_compress_text():
+    compressed = compress_text(ARTICLE, 80, TITLE)
+    assert count_tokens(compressed) <= 80
+    # Boilerplate goes first
+    for junk in ("Subscribe", "Photo:", "Read more"):
+        assert junk not in compressed
+    # The repeated lead is kept once
+    assert compressed.count("The city council approved") == 1
+    # Sentences are copied verbatim and keep their article order
+    sentences = [s for s in compressed.replace("\n\n", " ").split(". ") if s]
+    positions = [ARTICLE.index(sentence.rstrip(".")) for sentence in sentences]
+    assert positions == sorted(positions)
+    assert compressed.startswith("The city council approved")
+
+    # Text within budget is left alone
+    assert compress_text(ARTICLE, 10_000, TITLE) == ARTICLE
+
+
+def test_compress_article_sets_view():
+    state = {"article_title": TITLE, "article_content": ARTICLE}
+    state = compress_article(state, max_tokens=80)
+    assert state["article_content"] == ARTICLE
+    assert article_view(state) == state["compressed_content"]
+    assert state["compression"]["original_tokens"] == count_tokens(ARTICLE)
+    assert state["compression"]["compressed_tokens"] <= 80
+    assert 0 < state["compression"]["reduction"] < 1
+
+    short = compress_article({"article_content": "A short note."}, max_tokens=80)
+    assert "compression" not in short
+    assert article_view(short) == "A short note."
@@ -0,0 +1,99 @@
+import pytest
+import os
+import sys
+import time
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.schemas import SentimentResult
+from langgraph import utility
+from langgraph.fast_analysis import FAST_PROFILE, lexicon_sentiment, textrank_summary
+from langgraph.llm_gateway import set_llm_gateway
+
+ARTICLE = (
+    "The city council approved a new transit plan on Tuesday after months of debate. "
+    "The plan adds three bus lines and extends light rail service to the airport. "
+    "Council members said the transit plan would cut commute times for thousands of residents. "
+    "Funding for the plan comes from a regional sales tax approved by voters last year. "
+    "Critics argued the light rail extension is too expensive and will take a decade to build. "
+    "The mayor praised the vote as a turning point for the city. "
+    "Construction of the new bus lines is expected to begin next spring. "
+    "Transit officials will hold public meetings to gather feedback on routes. "
+    "The airport extension still needs federal approval. "
+    "Residents at the meeting were divided, with some cheering and others booing the decision."
+)
+
+def test_lexicon_sentiment():
+    positive = lexicon_sentiment("The launch was a remarkable success and investors welcomed the strong growth.")
+    negative = lexicon_sentiment("The collapse was a devastating disaster and protests spread amid fears of recession.")
+    neutral = lexicon_sentiment("The council met on Tuesday to discuss next year's budget.")
+    assert positive["sentimentScore"] > 70 and "positive" in positive["sentimentLabel"]
+    assert negative["sentimentScore"] < 30 and "negative" in negative["sentimentLabel"]
+    assert neutral["sentimentLabel"] == "neutral" and neutral["subjectivityScore"] == 0
+    assert "devastating disaster" in negative["keyPhrases"]
+
+    # Negation flips a sentiment word within its clause only
+    assert lexicon_sentiment("Investors were not concerned.")["sentimentScore"] > 50
+    assert lexicon_sentiment("Investors did not. Growth followed.")["sentimentScore"] > 50
+
+    opinion = lexicon_sentiment("This absurd and outrageous plan is clearly an unacceptable disgrace, critics insist.")
+    assert opinion["subjectivityScore"] > 60
+
+def test_textrank_summary():
+    summary = textrank_summary(ARTICLE, max_words=50)
+    sentences = [s for s in summary.split(". ") if s]
+    assert 1 < len(sentences) < 10
+    assert len(summary.split()) <= 50
+    # Extracted sentences keep their article order
+    positions = [ARTICLE.index(sentence.rstrip(".")) for sentence in sentences]
+    assert positions == sorted(positions)
+    assert "transit plan" in summary
+
+    short = "A short note."
+    assert textrank_summary(short) == short
+
+@pytest.mark.asyncio
+async def test_fast_profile_makes_no_llm_calls(monkeypatch):
+    """The fast profile answers with the usual result shapes without touching the gateway"""
+    monkeypatch.setenv("USE_MOCK_APIS", "false")
+
+    async def fetch(url):
+        return {"title": "Transit plan approved", "content": ARTICLE * 5, "source": "example.com"}
+
+    class NoLLM:
+        def __getattr__(self, name):
+            raise AssertionError("the fast profile must not use the LLM gateway")
+
+    monkeypatch.setattr(utility, "fetch_article_content", fetch)
+    set_llm_gateway(NoLLM())
+    try:
+        started = time.perf_counter()
+        state = await utility.run_fast_analysis("https://example.com/transit")
+        elapsed = time.perf_counter() - started
+    finally:
+        set_llm_gateway(None)
+
+    assert elapsed < 0.3
+    assert state["analysis_profile"] == FAST_PROFILE
+    assert state["agents_called"] == ["sentiment", "summary"]
+    SentimentResult(**state["sentiment_result"])
+    assert 0 < len(state["summary_result"].split()) <= 100
+
+@pytest.mark.asyncio
+async def test_full_analysis_reuses_fast_fetch(monkeypatch):
+    """The full analysis queued by /process/fast works on the article the fast analysis fetched"""
+    fetches = []
+
+    async def fetch(url):
+        fetches.append(url)
+        return {"title": "Transit plan approved", "content": ARTICLE * 5, "source": "example.com"}
+
+    monkeypatch.setattr(utility, "fetch_article_content", fetch)
+    fast = await utility.run_fast_analysis("https://example.com/transit")
+    full = await utility.process_article("https://example.com/transit", article_data={
+        "content": fast["article_content"], "title": fast["article_title"], "source": fast["article_source"]
+    })
+    assert fetches == ["https://example.com/transit"]
+    assert full["article_title"] == "Transit plan approved"
+    assert "summary_result" in full
@@ -0,0 +1,121 @@
+import pytest
+import asyncio
+import os
+import sys
+import time
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langgraph.llm_cache import LLMResponseCache
+from langgraph.llm_gateway import LLMGateway
+from utils import metrics
+from utils.hedging import HedgeBudget, LatencyTracker, first_results
+from utils.mock_openai import MockChatCompletionResponse
+
+class StallingClient:
+    """Answers in 10ms, except that the first attempt at prompts marked "stall" hangs"""
+    def __init__(self):
+        self.calls = 0
+        self.cancelled = 0
+        self.chat = self
+        self.completions = self
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        content = kwargs["messages"][-1]["content"]
+        stall = content.startswith("stall") and not getattr(self, content, False)
+        setattr(self, content, True)
+        try:
+            await asyncio.sleep(30 if stall else 0.01)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return MockChatCompletionResponse(f"answer to {content}")
+
+def _request(content):
+    return {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": content}]}
+
+@pytest.mark.asyncio
+async def test_stalled_call_is_hedged():
+    """A call past the latency percentile is duplicated, the duplicate wins and the straggler is cancelled"""
+    metrics.reset()
+    client = StallingClient()
+    gateway = LLMGateway(client=client, use_mock=False, cache=LLMResponseCache(path=None))
+    gateway.hedge = True
+    gateway.hedge_budget = HedgeBudget(max_rate=0.5)
+
+    # Not hedged before the percentile has enough samples
+    for i in range(25):
+        await gateway.chat_completion("summary", **_request(f"warmup {i}"))
+    assert metrics.get_counter("llm_hedges_total", agent="summary") == 0
+
+    started = time.monotonic()
+    response = await gateway.chat_completion("summary", **_request("stall 1"))
+    assert time.monotonic() - started < 1
+    assert response.choices[0].message.content == "answer to stall 1"
+    assert metrics.get_counter("llm_hedges_total", agent="summary") == 1
+    assert metrics.get_counter("llm_hedge_wins_total", agent="summary", winner="hedge") == 1
+    await asyncio.sleep(0)
+    assert client.cancelled == 1
+    assert gateway.limiter.in_flight == 0
+
+@pytest.mark.asyncio
+async def test_hedge_rate_is_capped():
+    metrics.reset()
+    client = StallingClient()
+    gateway = LLMGateway(client=client, use_mock=False, cache=LLMResponseCache(path=None))
+    gateway.hedge = True
+    gateway.hedge_budget = HedgeBudget(max_rate=0.04)
+    for i in range(25):
+        await gateway.chat_completion("summary", **_request(f"warmup {i}"))
+
+    # Only the first slow call fits the 4% budget of the last 28 requests
+    slow = [asyncio.ensure_future(gateway.chat_completion("summary", **_request(f"stall {i}"))) for i in range(3)]
+    await asyncio.sleep(0.3)
+    assert metrics.get_counter("llm_hedges_total", agent="summary") == 1
+    assert metrics.get_counter("llm_hedges_skipped_total", agent="summary", reason="budget") == 2
+    assert sum(task.done() for task in slow) == 1
+    for task in slow:
+        task.cancel()
+    await asyncio.gather(*slow, return_exceptions=True)
+
+def test_latency_percentile_and_budget():
+    tracker = LatencyTracker(window=100)
+    for i in range(1, 201):
+        tracker.observe("gpt-4o-mini", i / 100)
+    # Only the latest 100 samples (1.01s-2.00s) are kept
+    assert tracker.count("gpt-4o-mini") == 100
+    assert tracker.percentile("gpt-4o-mini", 50) == 1.5
+    assert tracker.percentile("gpt-4o-mini", 99) == 1.99
+    assert tracker.percentile("other", 99) is None
+
+    budget = HedgeBudget(max_rate=0.1, window=110)
+    hedged = 0
+    for _ in range(300):
+        budget.record_request()
+        hedged += budget.try_spend()
+    assert 29 <= hedged <= 30
+    assert budget.rate == pytest.approx(0.1)
+
+
+@pytest.mark.asyncio
+async def test_first_results():
+    async def attempt(delay, result):
+        await asyncio.sleep(delay)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    slow = asyncio.ensure_future(attempt(5, "slow"))
+    results = await first_results(
+        [attempt(0.02, "b"), slow, attempt(0.01, ValueError("boom")), attempt(0.001, None), attempt(0.01, "a")],
+        count=2
+    )
+    # Failed and empty attempts do not count, and the loser is cancelled
+    assert results == [(4, "a"), (0, "b")]
+    assert slow.cancelled()
+
+    started = time.perf_counter()
+    assert await first_results([attempt(5, "late")], timeout=0.05) == []
+    assert time.perf_counter() - started < 1
@@ -0,0 +1,350 @@
+import pytest
+import json
+import os
+import sys
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langgraph.llm_gateway import LLMGateway, get_llm_gateway, set_llm_gateway
+from langgraph.llm_cache import LLMResponseCache
+from langgraph import utility
+from langgraph.workflow import SummaryAgent, ValidatorAgent
+from utils.mock_openai import MockOpenAI
+
+@pytest.fixture
+def real_mode_gateway(monkeypatch):
+    """Run agents on their real-API path, served by MockOpenAI through the gateway"""
+    monkeypatch.setenv("USE_MOCK_APIS", "false")
+    gateway = LLMGateway(client=MockOpenAI(), use_mock=False, cache=LLMResponseCache(path=None))
+    set_llm_gateway(gateway)
+    yield gateway
+    set_llm_gateway(None)
+
+def test_gateway_is_shared():
+    """All callers get the same gateway and the same client"""
+    set_llm_gateway(None)
+    gateway = get_llm_gateway()
+    gateway.cache = None
+    assert get_llm_gateway() is gateway
+    assert gateway.client is gateway.client
+    set_llm_gateway(None)
+
+@pytest.mark.asyncio
+async def test_agents_call_through_gateway(real_mode_gateway):
+    """Agents use the gateway's client instead of building their own"""
+    state = await SummaryAgent()({"article_content": "Test article content for testing purposes."})
+    assert state["summary_result"].startswith("Test article content for testing purposes.")
+
+class CountingClient(MockOpenAI):
+    """MockOpenAI that counts how often the provider is actually called"""
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+        create = self.chat.completions.create
+
+        async def counted_create(**kwargs):
+            self.calls += 1
+            return await create(**kwargs)
+        self.chat.completions.create = counted_create
+
+REQUEST = {
+    "model": "gpt-4o-mini",
+    "messages": [{"role": "system", "content": "Summarize"}, {"role": "user", "content": "Some article"}],
+    "temperature": 0.3,
+}
+
+@pytest.mark.asyncio
+async def test_response_cache_tiers(tmp_path):
+    """Identical prompts are served from memory, then from disk after a restart"""
+    path = str(tmp_path / "llm_cache.sqlite3")
+    client = CountingClient()
+    gateway = LLMGateway(client=client, use_mock=False, cache=LLMResponseCache(path=path))
+
+    first = await gateway.chat_completion("summary", **REQUEST)
+    second = await gateway.chat_completion("summary", **REQUEST)
+    assert client.calls == 1
+    assert second.choices[0].message.content == first.choices[0].message.content
+
+    # A different temperature or prompt version is a different request
+    await gateway.chat_completion("summary", **{**REQUEST, "temperature": 0})
+    await gateway.chat_completion("summary", prompt_version="2", **REQUEST)
+    assert client.calls == 3
+
+    # A new process only has the disk tier
+    restarted = LLMGateway(client=client, use_mock=False, cache=LLMResponseCache(path=path))
+    await restarted.chat_completion("sentiment", **REQUEST)
+    assert client.calls == 3
+
+    stats = gateway.cache_stats()
+    assert stats["agents"]["summary"] == {"memory_hits": 1, "disk_hits": 0, "misses": 3, "hit_rate": 0.25}
+    assert restarted.cache_stats()["agents"]["sentiment"]["disk_hits"] == 1
+
+def test_response_cache_eviction(tmp_path):
+    """The disk tier drops expired entries and stays under its size limit"""
+    cache = LLMResponseCache(path=str(tmp_path / "llm_cache.sqlite3"), memory_entries=1, max_bytes=1000, ttl=3600)
+
+    class Response:
+        def __init__(self, content):
+            self.choices = [type("Choice", (), {"message": type("Message", (), {"content": content})()})()]
+
+    for i in range(10):
+        cache.put("summary", f"key-{i}", Response("x" * 200))
+    stats = cache.stats()
+    assert stats["disk_bytes"] <= 1000
+    assert cache.get("summary", "key-0") is None
+    assert cache.get("summary", "key-9") is not None
+
+    cache.ttl = -1
+    assert cache.get("summary", "key-9") is None
+
+class FusedClient:
+    """Provider stub answering the fused prompt with all three sections"""
+    def __init__(self):
+        self.calls = 0
+        self.chat = self
+        self.completions = self
+
+    async def create(self, **kwargs):
+        from utils.mock_openai import MockChatCompletionResponse
+        self.calls += 1
+        return MockChatCompletionResponse(json.dumps({
+            "credibility": {
+                "sourceReputationScore": 80, "titleContentScore": 70, "misleadingTitlesScore": 90,
+                "averageScore": 80, "overallConclusion": "Credible."
+            },
+            "sentiment": {
+                "sentimentLabel": "slightly negative", "sentimentScore": 40, "subjectivityScore": 30,
+                "justification": ["Critical framing"], "keyPhrases": ["critics argue"], "biasAssessment": "Low"
+            },
+            "summary": " ".join(["word"] * 100)
+        }))
+
+@pytest.mark.asyncio
+async def test_fused_analysis_splits_results(monkeypatch):
+    """One fused call fills the credibility, sentiment and summary results"""
+    monkeypatch.setenv("USE_MOCK_APIS", "false")
+    monkeypatch.setattr(utility, "FUSED_ANALYSIS", True)
+    client = FusedClient()
+    set_llm_gateway(LLMGateway(client=client, use_mock=False, cache=LLMResponseCache(path=None)))
+    try:
+        state = {"article_title": "Title", "article_content": "Some article text.", "agents_called": [],
+                 "agents_reused": [], "agent_invocation_counts": {}, "call_fake_news": False}
+        state = await utility.run_fused_analysis(utility.FUSED_AGENTS, ValidatorAgent(), state)
+    finally:
+        set_llm_gateway(None)
+
+    assert client.calls == 1
+    assert state["fused_sections"] == ["credibility", "sentiment", "summary"]
+    assert state["credibility_result"]["overall_credibility"] == 0.8
+    assert state["sentiment_result"]["polarity"] == -0.2
+    assert len(state["summary_result"].split()) == 100
+    assert all(state["validation_report"][name]["status"] == "valid" for name in utility.FUSED_AGENTS)
+
+class PrefixRecordingClient(MockOpenAI):
+    """MockOpenAI that records the leading message and reports cached prompt tokens"""
+    def __init__(self):
+        super().__init__()
+        self.leading = []
+        create = self.chat.completions.create
+
+        async def recorded_create(**kwargs):
+            self.leading.append(kwargs["messages"][0])
+            response = await create(**kwargs)
+            response.usage = {"prompt_tokens": 1500, "completion_tokens": 100,
+                              "prompt_tokens_details": {"cached_tokens": 1024 if len(self.leading) > 1 else 0}}
+            return response
+        self.chat.completions.create = recorded_create
+
+@pytest.mark.asyncio
+async def test_agents_share_article_prefix(monkeypatch):
+    """Every article-reading agent starts with the same message, so the provider can cache it"""
+    from langgraph.workflow import CredibilityAgent, SentimentAgent
+    from utils import metrics
+    monkeypatch.setenv("USE_MOCK_APIS", "false")
+    metrics.reset()
+    client = PrefixRecordingClient()
+    gateway = LLMGateway(client=client, use_mock=False, cache=LLMResponseCache(path=None))
+    set_llm_gateway(gateway)
+    try:
+        state = {"article_title": "Title", "article_content": "Some article text about a policy."}
+        for agent in (CredibilityAgent(), SentimentAgent(), SummaryAgent()):
+            state = await agent(state)
+    finally:
+        set_llm_gateway(None)
+
+    assert len(client.leading) == 3
+    assert all(message == client.leading[0] for message in client.leading)
+    assert "Some article text about a policy." in client.leading[0]["content"]
+
+    stats = gateway.token_stats()
+    assert stats["credibility"]["cached_prompt_tokens"] == 0
+    assert stats["sentiment"] == {"prompt_tokens": 1500, "cached_prompt_tokens": 1024,
+                                  "completion_tokens": 100, "cached_ratio": 0.6827}
+
+@pytest.mark.asyncio
+async def test_compressed_long_article_shares_prefix(monkeypatch):
+    """With compression and unequal budgets the agents open with the same article chunk, claim extraction with the full text"""
+    from langgraph import tokens
+    from langgraph.compression import compress_article
+    from langgraph.prompts import ARTICLE_PREAMBLE, article_message, shared_article_message
+    from langgraph.workflow import CredibilityAgent, FakeNewsAgent, SentimentAgent
+    monkeypatch.setenv("USE_MOCK_APIS", "false")
+    monkeypatch.setattr(tokens, "AGENT_TOKEN_BUDGETS",
+                        {"fake_news": 600, "credibility": 150, "sentiment": 400, "summary": 250, "fused": 6000})
+    topics = ["tariffs", "jam exports", "steel quotas", "farm subsidies", "retaliation", "shipping costs"]
+    paragraphs = [
+        f"Officials in Brussels said on day {i} that {topic} would rise by {i + 3} percent next year. "
+        f"Economists warned that consumers would pay more for {topic} while negotiators met again."
+        for i, topic in enumerate(topics * 8)
+    ]
+    state = {"article_title": "Trade dispute", "article_content": "\n\n".join(paragraphs),
+             "agents_called": [], "agent_invocation_counts": {}, "num_claims": 1}
+    state = compress_article(state, max_tokens=600)
+    assert "compressed_content" in state
+
+    client = PrefixRecordingClient()
+    set_llm_gateway(LLMGateway(client=client, use_mock=False, cache=LLMResponseCache(path=None)))
+    try:
+        for agent in (FakeNewsAgent(), CredibilityAgent(), SentimentAgent(), SummaryAgent()):
+            state = await agent(state)
+    finally:
+        set_llm_gateway(None)
+
+    shared = shared_article_message(state)
+    article_messages = [m for m in client.leading if m["content"].startswith(ARTICLE_PREAMBLE)]
+    assert len(state["article_prefix_chunks"]) > 1
+    # credibility, the first sentiment chunk and the first summary part
+    assert sum(m == shared for m in article_messages) == 3
+    # Claim extraction quotes the article, so it reads the full text up to its own budget
+    full = article_message("Trade dispute", tokens.truncate_to_budget(state["article_content"], 600))
+    assert article_messages[0] == full
+    assert full != shared
+    assert shared["content"].endswith(state["article_prefix_chunks"][0])
+    assert state["compressed_content"].startswith(state["article_prefix_chunks"][0])
+
+class ScriptedClient:
+    """Provider stub returning the given answers in turn and recording each request's messages"""
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.requests = []
+        self.chat = self
+        self.completions = self
+
+    async def create(self, **kwargs):
+        from utils.mock_openai import MockChatCompletionResponse
+        self.requests.append(kwargs["messages"])
+        return MockChatCompletionResponse(self.answers[min(len(self.requests), len(self.answers)) - 1])
+
+@pytest.mark.asyncio
+async def test_rerun_prompt_carries_validator_feedback(monkeypatch):
+    """A re-run after a rejected output tells the model what was wrong, after the shared prefix"""
+    monkeypatch.setenv("USE_MOCK_APIS", "false")
+    client = ScriptedClient([" ", " ".join(["word"] * 100)])
+    set_llm_gateway(LLMGateway(client=client, use_mock=False, cache=LLMResponseCache(path=None)))
+    try:
+        state = {"article_title": "Title", "article_content": "Some article text.", "agents_called": [],
+                 "agent_invocation_counts": {}}
+        state = await utility.run_agent_with_validation("summary", SummaryAgent(), ValidatorAgent(), state)
+    finally:
+        set_llm_gateway(None)
+
+    assert len(client.requests) == 2
+    first, rerun = client.requests
+    assert rerun[0] == first[0]
+    assert "summary_result is empty" not in json.dumps(first)
+    assert "summary_result is empty" in rerun[-1]["content"]
+    assert state["validation_report"]["summary"]["status"] == "valid"
+
+CREDIBILITY_JSON = {"sourceReputationScore": 80, "titleContentScore": 70, "misleadingTitlesScore": 90,
+                    "overallConclusion": "Credible."}
+
+@pytest.mark.asyncio
+async def test_rejected_responses_are_not_cached(monkeypatch):
+    """Unparseable answers and answers the validator rejects never reach the response cache"""
+    from langgraph.workflow import CredibilityAgent
+    from langgraph.llm_cache import reset_skip_reads, skip_reads
+    monkeypatch.setenv("USE_MOCK_APIS", "false")
+    client = ScriptedClient([
+        json.dumps({**CREDIBILITY_JSON, "averageScore": 150}),
+        json.dumps({**CREDIBILITY_JSON, "averageScore": 80}),
+        "not json at all",
+    ])
+    cache = LLMResponseCache(path=None)
+    set_llm_gateway(LLMGateway(client=client, use_mock=False, cache=cache))
+    try:
+        article = {"article_title": "Title", "article_content": "Some article text.", "agents_called": [],
+                   "agent_invocation_counts": {}}
+        state = await utility.run_agent_with_validation("credibility", CredibilityAgent(), ValidatorAgent(), dict(article))
+        assert state["credibility_result"]["overall_credibility"] == 0.8
+        assert len(client.requests) == 2
+        # Only the accepted re-run answer was stored; the rejected first prompt goes to the provider again
+        assert cache.stats()["memory_entries"] == 1
+        await CredibilityAgent()(dict(article))
+        assert len(client.requests) == 3
+
+        # An answer that is not JSON in JSON mode is not cached either
+        await CredibilityAgent()(dict(article))
+        assert len(client.requests) == 4
+        assert cache.stats()["memory_entries"] == 1
+
+        # Validator re-runs bypass cache reads
+        rerun = dict(article, refined_prompts=state["refined_prompts"])
+        await CredibilityAgent()(rerun)
+        assert len(client.requests) == 4
+        token = skip_reads()
+        try:
+            await CredibilityAgent()(rerun)
+        finally:
+            reset_skip_reads(token)
+        assert len(client.requests) == 5
+    finally:
+        set_llm_gateway(None)
+
+@pytest.mark.asyncio
+async def test_rejected_fused_section_keeps_agent_rerun_budget(monkeypatch):
+    """A fused section the validator rejects does not use up its agent's re-run"""
+    from langgraph.workflow import CredibilityAgent
+    monkeypatch.setenv("USE_MOCK_APIS", "false")
+    invalid = json.dumps({**CREDIBILITY_JSON, "averageScore": 150})
+    fused = json.dumps({"credibility": {**CREDIBILITY_JSON, "averageScore": 150}, "summary": " ".join(["word"] * 100)})
+    client = ScriptedClient([fused, invalid, json.dumps({**CREDIBILITY_JSON, "averageScore": 80})])
+    set_llm_gateway(LLMGateway(client=client, use_mock=False, cache=LLMResponseCache(path=None)))
+    try:
+        validator = ValidatorAgent()
+        state = {"article_title": "Title", "article_content": "Some article text.", "agents_called": [],
+                 "agents_reused": [], "agent_invocation_counts": {}}
+        state = await utility.run_fused_analysis(["credibility", "summary"], validator, state)
+        assert "credibility_result" not in state
+        assert "summary_result" in state
+        state = await utility.run_agent_with_validation("credibility", CredibilityAgent(), validator, state)
+    finally:
+        set_llm_gateway(None)
+
+    assert len(client.requests) == 3
+    assert state["agent_invocation_counts"] == {"fused": 1, "credibility": 2}
+    assert state["credibility_result"]["overall_credibility"] == 0.8
+    assert state["validation_report"]["credibility"] == {**state["validation_report"]["credibility"],
+                                                         "status": "valid", "reruns": 1}
+
+@pytest.mark.asyncio
+async def test_unparseable_output_degrades_to_an_error_result(monkeypatch):
+    """An unusable answer yields an error result with no scores, counted as degraded"""
+    from langgraph.llm_json import parse_stats
+    from langgraph.workflow import CredibilityAgent
+    from utils import metrics
+    monkeypatch.setenv("USE_MOCK_APIS", "false")
+    metrics.reset()
+    set_llm_gateway(LLMGateway(client=ScriptedClient(["I cannot help with that."]), use_mock=False,
+                               cache=LLMResponseCache(path=None)))
+    try:
+        state = {"article_title": "Title", "article_content": "Some article text.", "source_name": "Example"}
+        state = await CredibilityAgent()(state)
+    finally:
+        set_llm_gateway(None)
+
+    result = state["credibility_result"]
+    assert result["error"].startswith("Unparseable credibility response")
+    assert result["overall_credibility"] is None
+    assert ValidatorAgent().check("credibility", state)[0] == "invalid"
+    assert parse_stats()["credibility"]["degraded"] == 1
@@ -0,0 +1,44 @@
+import pytest
+import os
+import sys
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langgraph.llm_json import IncrementalJSONParser, parse_llm_json, parse_stats, repair_json
+from utils import metrics
+
+@pytest.mark.parametrize("raw, expected", [
+    ('```json\n{"score": 80}\n```', {"score": 80}),
+    ('Here is the result: {"score": 80} Hope this helps!', {"score": 80}),
+    ('{"claims": ["a", "b",],}', {"claims": ["a", "b"]}),
+    ('{"summary": "The minister sai', {"summary": "The minister sai"}),
+    ('{"score": 80, "reason": "ok", "keyPh', {"score": 80, "reason": "ok"}),
+    ('{"a": {"b": [1, 2', {"a": {"b": [1, 2]}}),
+    ('{"text": "braces } and \\" quotes", "n": 1', {"text": 'braces } and " quotes', "n": 1}),
+])
+def test_repair_json(raw, expected):
+    """Fenced, chatty, trailing-comma and truncated output is recovered"""
+    assert repair_json(raw) == expected
+
+def test_incremental_parser():
+    """Streamed chunks yield growing partial values and the final value"""
+    parser = IncrementalJSONParser()
+    partials = []
+    for chunk in ['{"sentimentLabel": "neg', 'ative", "keyPhrases": ["critics', ' argue"]', ', "sentimentScore": 30}']:
+        parser.feed(chunk)
+        partials.append(parser.partial())
+    assert partials[0] == {"sentimentLabel": "neg"}
+    assert partials[1] == {"sentimentLabel": "negative", "keyPhrases": ["critics"]}
+    assert parser.complete
+    assert parser.value() == {"sentimentLabel": "negative", "keyPhrases": ["critics argue"], "sentimentScore": 30}
+
+def test_parse_failure_rate():
+    """Outcomes are counted per agent"""
+    metrics.reset()
+    parse_llm_json('{"ok": true}', "sentiment")
+    parse_llm_json('```json\n{"ok": true}', "sentiment")
+    with pytest.raises(ValueError):
+        parse_llm_json("I cannot help with that.", "sentiment")
+    stats = parse_stats()["sentiment"]
+    assert stats == {"ok": 1, "repaired": 1, "failed": 1, "failure_rate": 0.3333, "degraded": 0}
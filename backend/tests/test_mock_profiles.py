@@ -0,0 +1,111 @@
+import pytest
+import os
+import statistics
+import sys
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langgraph import llm_gateway
+from langgraph.llm_cache import LLMResponseCache
+from langgraph.llm_gateway import LLMGateway, retry_reason
+from utils import metrics
+from utils.mock_openai import MockOpenAI
+from utils.mock_profiles import MockAPIError, MockServiceProfile, parse_error_rates, reset_mock_profiles
+from utils.rate_limit import retry_after_seconds
+
+
+@pytest.fixture
+def instant_mocks(monkeypatch):
+    """Mocks without latency, rebuilt from the environment and restored afterwards"""
+    for service in ("LLM", "SEARCH", "FETCH"):
+        monkeypatch.setenv(f"MOCK_{service}_LATENCY_P50", "0")
+    reset_mock_profiles(seed=7)
+    yield monkeypatch
+    monkeypatch.undo()
+    reset_mock_profiles()
+
+
+def test_latency_distribution_and_seed():
+    profile = MockServiceProfile("llm", p50=1.0, p99=10.0, seed="1")
+    latencies = sorted(profile.latency() for _ in range(20000))
+    assert statistics.median(latencies) == pytest.approx(1.0, rel=0.05)
+    assert latencies[int(0.99 * len(latencies))] == pytest.approx(10.0, rel=0.15)
+
+    # The same seed replays the same latencies and failures
+    rates = parse_error_rates("rate_limit:0.1, timeout:0.05")
+    first, second = (MockServiceProfile("llm", 1.0, 10.0, rates, seed="42") for _ in range(2))
+    assert [(first.latency(), first.draw_error()) for _ in range(100)] == \
+           [(second.latency(), second.draw_error()) for _ in range(100)]
+
+    errors = [first.draw_error() for _ in range(20000)]
+    assert errors.count("rate_limit") / len(errors) == pytest.approx(0.1, abs=0.01)
+    assert errors.count("timeout") / len(errors) == pytest.approx(0.05, abs=0.01)
+    assert "connection" not in errors
+
+    with pytest.raises(ValueError):
+        parse_error_rates("meteor_strike:0.1")
+
+
+@pytest.mark.asyncio
+async def test_mock_mode_agents_see_injected_llm_errors(instant_mocks):
+    """In mock mode the agents' calls go through the gateway, which retries the mock LLM's failures"""
+    from langgraph.llm_gateway import set_llm_gateway
+    from langgraph.workflow import SentimentAgent
+    instant_mocks.setenv("MOCK_LLM_ERRORS", "server_error:0.3")
+    instant_mocks.setattr(llm_gateway, "LLM_BACKOFF_BASE", 0.001)
+    reset_mock_profiles(seed=5)
+    metrics.reset()
+    set_llm_gateway(LLMGateway(use_mock=True, cache=LLMResponseCache(path=None)))
+    try:
+        for i in range(5):
+            state = {"article_title": f"Title {i}", "article_content": f"Article {i} text.", "source_name": "Example"}
+            state = await SentimentAgent()(state)
+            assert "error" not in state["sentiment_result"]
+    finally:
+        set_llm_gateway(None)
+    retries = metrics.counter_series("llm_retries_total")
+    assert sum(retries.values()) > 0
+    assert {dict(key)["agent"] for key in retries} == {"sentiment"}
+
+
+@pytest.mark.asyncio
+async def test_quota_answers_429_with_retry_after():
+    profile = MockServiceProfile("search", p50=0.0, p99=0.0, rpm=2)
+    await profile.call()
+    await profile.call()
+    with pytest.raises(MockAPIError) as raised:
+        await profile.call()
+    # The gateway treats it like the provider's own 429
+    assert retry_reason(raised.value) == "rate_limited"
+    assert 59 < retry_after_seconds(raised.value.response.headers) <= 60
+
+
+@pytest.mark.asyncio
+async def test_mock_openai_reports_usage(instant_mocks):
+    client = MockOpenAI()
+    article = {"role": "system", "content": "word " * 1500}
+    first = await client.chat.completions.create(messages=[article, {"role": "user", "content": "Summarize"}])
+    second = await client.chat.completions.create(messages=[article, {"role": "user", "content": "Sentiment"}])
+    assert first.usage["prompt_tokens"] > 1500
+    assert first.usage["completion_tokens"] > 0
+    # The shared leading message is served from the simulated prefix cache the second time
+    assert first.usage["prompt_tokens_details"]["cached_tokens"] == 0
+    assert second.usage["prompt_tokens_details"]["cached_tokens"] % 128 == 0
+    assert second.usage["prompt_tokens_details"]["cached_tokens"] >= 1024
+
+
+@pytest.mark.asyncio
+async def test_gateway_rides_out_injected_errors(instant_mocks):
+    instant_mocks.setenv("MOCK_LLM_ERRORS", "server_error:0.3,connection:0.1")
+    instant_mocks.setattr(llm_gateway, "LLM_BACKOFF_BASE", 0.001)
+    reset_mock_profiles(seed=3)
+    metrics.reset()
+    gateway = LLMGateway(client=MockOpenAI(), use_mock=False, cache=LLMResponseCache(path=None))
+    for i in range(20):
+        response = await gateway.chat_completion("summary", model="gpt-4o-mini",
+                                                 messages=[{"role": "user", "content": f"Summarize {i}"}])
+        assert response.choices[0].message.content
+    retries = metrics.counter_series("llm_retries_total")
+    assert sum(retries.values()) > 0
+    assert {dict(key)["reason"] for key in retries} <= {"server_error", "connection"}
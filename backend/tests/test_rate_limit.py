@@ -0,0 +1,180 @@
+import pytest
+import asyncio
+import os
+import sys
+import time
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langgraph import utility
+from langgraph.llm_cache import LLMResponseCache
+from langgraph.llm_gateway import LLMGateway, LLMUnavailableError, set_llm_gateway
+from langgraph.workflow import SummaryAgent, ValidatorAgent
+from utils import metrics
+from utils.mock_openai import MockChatCompletionResponse
+from utils import search_api
+from utils.rate_limit import AdaptiveLimiter, ConcurrencyLimiter, RatePacer, backoff_delay, retry_after_seconds
+
+class RateLimitError(Exception):
+    """Shaped like openai.RateLimitError"""
+    status_code = 429
+
+    def __init__(self, retry_after_ms):
+        super().__init__("Rate limit reached")
+        self.response = type("Response", (), {"headers": {"retry-after-ms": retry_after_ms}})()
+
+class FlakyClient:
+    """Fails with 429 a number of times, then answers"""
+    def __init__(self, failures, delay=0.0):
+        self.failures = failures
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.chat = self
+        self.completions = self
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.failures > 0:
+                self.failures -= 1
+                raise RateLimitError("50")
+            return MockChatCompletionResponse("A summary of the article.")
+        finally:
+            self.in_flight -= 1
+
+def _gateway(client):
+    return LLMGateway(client=client, use_mock=False, cache=LLMResponseCache(path=None))
+
+REQUEST = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "Hi"}]}
+
+@pytest.mark.asyncio
+async def test_retry_honours_retry_after():
+    """429s are retried after the server's Retry-After and counted"""
+    metrics.reset()
+    client = FlakyClient(failures=2)
+    started = time.monotonic()
+    response = await _gateway(client).chat_completion("summary", **REQUEST)
+    assert response.choices[0].message.content == "A summary of the article."
+    assert client.calls == 3
+    assert time.monotonic() - started >= 0.1
+    assert metrics.get_counter("llm_retries_total", agent="summary", reason="rate_limited") == 2
+
+@pytest.mark.asyncio
+async def test_exhausted_retries_surface_as_agent_error(monkeypatch):
+    """When retries run out the agent reports an error instead of mock results"""
+    monkeypatch.setenv("USE_MOCK_APIS", "false")
+    gateway = _gateway(FlakyClient(failures=100))
+    gateway.max_retries = 1
+    with pytest.raises(LLMUnavailableError):
+        await gateway.chat_completion("summary", **REQUEST)
+
+    set_llm_gateway(gateway)
+    try:
+        state = await utility.run_agent_with_validation(
+            "summary", SummaryAgent(), ValidatorAgent(), {"article_content": "Some text."}
+        )
+    finally:
+        set_llm_gateway(None)
+    assert "summary_result" not in state
+    assert "rate_limited" in state["summary_error"]
+
+@pytest.mark.asyncio
+async def test_concurrency_limit():
+    """No more than the configured number of calls are in flight"""
+    client = FlakyClient(failures=0, delay=0.02)
+    gateway = _gateway(client)
+    gateway.limiter = ConcurrencyLimiter(3)
+    await asyncio.gather(*(
+        gateway.chat_completion("summary", **{**REQUEST, "messages": [{"role": "user", "content": str(i)}]})
+        for i in range(12)
+    ))
+    assert client.calls == 12
+    assert client.max_in_flight == 3
+
+@pytest.mark.asyncio
+async def test_limiter_and_pacer():
+    """The limit can change under load and the pacer waits once its bucket is empty"""
+    limiter = ConcurrencyLimiter(1)
+    await limiter.acquire()
+    waiter = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.waiting == 1
+    limiter.limit = 2
+    await waiter
+    assert limiter.in_flight == 2
+
+    pacer = RatePacer(requests_per_minute=600)
+    for _ in range(600):
+        await pacer.acquire()
+    assert 0 < await pacer.acquire() <= 0.1
+
+    pacer = RatePacer()
+    pacer.pause(0.05)
+    assert await pacer.acquire() > 0.04
+
+@pytest.mark.asyncio
+async def test_adaptive_limit_grows_and_backs_off():
+    """AIMD: +1 per round trip while saturated, halved on throttling, exported as a gauge"""
+    limiter = AdaptiveLimiter("test", initial=4, min_limit=1, max_limit=6)
+    client = FlakyClient(failures=0, delay=0.01)
+    gateway = _gateway(client)
+    gateway.limiter = limiter
+    await asyncio.gather(*(
+        gateway.chat_completion("summary", **{**REQUEST, "messages": [{"role": "user", "content": str(i)}]})
+        for i in range(60)
+    ))
+    assert limiter.limit == 6
+    assert client.max_in_flight == 6
+    assert metrics.get_gauge("adaptive_concurrency_limit", limiter="test") == 6
+
+    # A quiet period with a single caller does not raise the limit further
+    limiter.max_limit = 10
+    for i in range(20):
+        await gateway.chat_completion("summary", **{**REQUEST, "messages": [{"role": "user", "content": f"q{i}"}]})
+    assert limiter.limit == 6
+
+    # Throttled calls from the same window cut the limit once
+    started = time.monotonic()
+    limiter.record_overload(started, "rate_limited")
+    limiter.record_overload(started, "rate_limited")
+    assert limiter.limit == 3
+    assert metrics.get_gauge("adaptive_concurrency_limit", limiter="test") == 3
+    limiter.record_overload(time.monotonic(), "timeout")
+    assert limiter.limit == 1
+
+def test_adaptive_limit_backs_off_on_rising_latency():
+    limiter = AdaptiveLimiter("latency", initial=8, max_limit=8)
+    for _ in range(20):
+        limiter.record_success(0.1)
+    assert limiter.limit == 8
+    for _ in range(3):
+        limiter.record_success(1.0)
+    assert limiter.limit == 4
+    assert metrics.get_counter("adaptive_concurrency_decreases_total", limiter="latency", reason="latency") == 1
+
+@pytest.mark.asyncio
+async def test_search_api_backs_off_on_429(monkeypatch):
+    limiter = AdaptiveLimiter("search", initial=8)
+    monkeypatch.setattr(search_api, "search_limiter", limiter)
+
+    async def throttled(self, params, query):
+        return 429, [{"title": "Error", "snippet": "API error: 429"}]
+
+    monkeypatch.setattr(search_api.SearchAPI, "_request", throttled)
+    results = await search_api.SearchAPI(api_key="key", cx="cx").search("claim")
+    assert results[0]["title"] == "Error"
+    assert limiter.limit == 4
+
+def test_backoff():
+    """Full-jitter exponential backoff, with Retry-After as a floor"""
+    assert all(0 <= backoff_delay(3, 0.5, 30) <= 4 for _ in range(100))
+    assert all(10 <= backoff_delay(0, 0.5, 30, retry_after=10) <= 10.5 for _ in range(100))
+    assert retry_after_seconds({"retry-after": "2"}) == 2
+    assert retry_after_seconds({"retry-after-ms": "250"}) == 0.25
+    assert retry_after_seconds({}) is None
@@ -0,0 +1,123 @@
+import pytest
+import json
+import os
+import sys
+from datetime import datetime
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import crud
+from database.models import ArticleCreate
+from langgraph.utility import find_reusable_analysis
+
+ARTICLE_TEXT = (
+    "The European Union charges a tariff of more than 24% on American jam, while the United States "
+    "charges about 4.5% on jam from Europe. Smucker said it welcomed attention to the imbalance but "
+    "warned that broad tariffs could invite retaliation against US farmers and manufacturers. Trade "
+    "officials in Brussels said talks were continuing and that any new duties would be proportionate. "
+    "Economists expect prices for consumers to rise if the dispute escalates over the coming months, "
+    "and several retailers have already begun to stockpile imported goods ahead of the deadline. "
+    "Industry groups on both sides of the Atlantic urged negotiators to reach a settlement quickly."
+)
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Point the JSON storage files at a temporary directory"""
+    monkeypatch.setattr(crud, "DB_FILE", str(tmp_path / "articles_db.json"))
+    monkeypatch.setattr(crud, "CONTENT_INDEX_FILE", str(tmp_path / "content_index.json"))
+    monkeypatch.setattr(crud, "NEAR_DUP_INDEX_FILE", str(tmp_path / "near_dup_index.json"))
+    return tmp_path
+
+def _save(article_id: str, url: str, text: str):
+    crud.save_article(ArticleCreate(
+        id=article_id,
+        url=url,
+        title="Tariffs",
+        processed_at=datetime.now(),
+        analysis_results={
+            "article_url": url,
+            "summary_result": "Summary",
+            "content_hash": crud.compute_content_hash(text),
+            "content_fingerprint": crud.compute_content_fingerprint(text)
+        }
+    ))
+
+def test_content_hash_normalization():
+    """Whitespace, case and punctuation differences hash the same"""
+    assert crud.compute_content_hash("Hello,  World!") == crud.compute_content_hash("hello world")
+    assert crud.compute_content_hash("Hello world") != crud.compute_content_hash("Goodbye world")
+
+def test_content_dedup_reuses_results(temp_db):
+    """A republished copy under another URL reuses the stored results"""
+    _save("1", "https://example.com/original", ARTICLE_TEXT)
+
+    reused = find_reusable_analysis(ARTICLE_TEXT.upper(), "https://amp.example.org/copy?utm_source=x")
+    assert reused is not None
+    assert reused["article_url"] == "https://amp.example.org/copy?utm_source=x"
+    assert reused["reused_from"]["article_id"] == "1"
+    assert reused["summary_result"] == "Summary"
+    assert crud.get_dedup_stats() == {"indexed_contents": 1, "indexed_fingerprints": 1, "runs_saved": 1}
+
+    # Short bodies are too generic to dedupe on
+    assert find_reusable_analysis("Subscribe to continue reading.", "https://example.com/paywalled") is None
+
+def test_near_duplicate_reuses_results(temp_db):
+    """A copy with an extra byline and timestamp reuses results and is flagged"""
+    _save("1", "https://example.com/original", ARTICLE_TEXT)
+
+    variant = f"By Jane Doe, Reuters. {ARTICLE_TEXT} Updated at 10:32 GMT."
+    reused = find_reusable_analysis(variant, "https://other.example.net/story")
+    assert reused is not None
+    assert reused["reused_from"]["article_id"] == "1"
+    assert reused["reused_from"]["match"] == "near_duplicate"
+    assert reused["reused_from"]["similarity"] >= crud.NEAR_DUP_THRESHOLD
+
+    # A different story on the same topic is not a near-duplicate
+    other = "Separately, the Commission published new steel quotas on Friday. " * 8
+    assert find_reusable_analysis(other, "https://example.com/steel") is None
+
+def test_refresh_replaces_content_hash(temp_db):
+    """A refreshed article with new text drops its old body from the content index"""
+    _save("1", "https://example.com/original", ARTICLE_TEXT)
+    updated = ARTICLE_TEXT.replace("24%", "30%") + " Talks resumed on Monday."
+    _save("1", "https://example.com/original", updated)
+
+    index = crud._load_content_index()["hashes"]
+    assert index == {crud.compute_content_hash(updated): "1"}
+    assert crud.get_article_by_content_hash(crud.compute_content_hash(ARTICLE_TEXT)) is None
+
+def test_near_duplicate_index_appends_and_replaces(temp_db, monkeypatch):
+    """Saves append one line, a refresh replaces the article's signature, stale lines get compacted"""
+    monkeypatch.setattr(crud, "NEAR_DUP_COMPACT_MIN_LINES", 3)
+    other = "Separately, the Commission published new steel quotas on Friday. " * 8
+    _save("1", "https://example.com/original", ARTICLE_TEXT)
+    _save("2", "https://example.com/steel", other)
+    with open(crud.NEAR_DUP_INDEX_FILE, encoding="utf-8") as f:
+        assert len(f.readlines()) == 2
+
+    # Article 1 is refreshed with the steel story's text; its old body no longer matches it
+    _save("1", "https://example.com/original", other + " Officials confirmed the figures.")
+    crud._near_dup_cache["index"] = None
+    index = crud._load_near_dup_index()
+    assert len(index) == 2
+    assert index.get("1") == crud.signature_from_str(crud.compute_content_fingerprint(other + " Officials confirmed the figures."))
+    assert crud.find_near_duplicate(crud.compute_content_fingerprint(ARTICLE_TEXT)) is None
+
+    for i in range(3):
+        _save("2", "https://example.com/steel", f"{other} Revision {i} of the quota table.")
+    with open(crud.NEAR_DUP_INDEX_FILE, encoding="utf-8") as f:
+        assert len(f.readlines()) <= 4
+    crud._near_dup_cache["index"] = None
+    assert len(crud._load_near_dup_index()) == 2
+
+def test_near_duplicate_index_reads_old_format(temp_db):
+    """An index file written as one JSON object still loads and is converted on the next save"""
+    with open(crud.NEAR_DUP_INDEX_FILE, "w", encoding="utf-8") as f:
+        json.dump({"1": crud.compute_content_fingerprint(ARTICLE_TEXT)}, f)
+    crud._near_dup_cache["index"] = None
+    assert len(crud._load_near_dup_index()) == 1
+
+    _save("2", "https://example.com/steel", "Separately, the Commission published new steel quotas on Friday. " * 8)
+    crud._near_dup_cache["index"] = None
+    assert set(crud._load_near_dup_index().items()) == {"1", "2"}
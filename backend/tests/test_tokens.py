@@ -0,0 +1,88 @@
+import pytest
+import json
+import os
+import sys
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langgraph import tokens
+from langgraph.tokens import chunk_text, count_tokens
+from langgraph.llm_cache import LLMResponseCache
+from langgraph.llm_gateway import LLMGateway, set_llm_gateway
+from langgraph.workflow import SentimentAgent, SummaryAgent
+from utils.mock_openai import MockChatCompletionResponse
+
+PARAGRAPHS = [f"Paragraph {i} says something. It has a second sentence about item {i}." for i in range(40)]
+LONG_ARTICLE = "\n\n".join(PARAGRAPHS)
+
+class RecordingClient:
+    """Provider stub recording prompts and answering by prompt type"""
+    def __init__(self):
+        self.prompts = []
+        self.chat = self
+        self.completions = self
+
+    async def create(self, **kwargs):
+        system = "\n".join(m["content"] for m in kwargs["messages"] if m["role"] == "system")
+        self.prompts.append(system)
+        if "SentimentAgent" in system:
+            negative = "Paragraph 1 " in system
+            return MockChatCompletionResponse(json.dumps({
+                "sentimentLabel": "negative" if negative else "neutral",
+                "sentimentScore": 20 if negative else 50,
+                "subjectivityScore": 40,
+                "justification": ["chunk reason"],
+                "keyPhrases": ["phrase"],
+                "biasAssessment": "none"
+            }))
+        if "Merge them" in system:
+            return MockChatCompletionResponse("merged summary")
+        return MockChatCompletionResponse(f"partial {len(self.prompts)}")
+
+@pytest.fixture
+def recording_gateway(monkeypatch):
+    monkeypatch.setenv("USE_MOCK_APIS", "false")
+    monkeypatch.setitem(tokens.AGENT_TOKEN_BUDGETS, "summary", 200)
+    monkeypatch.setitem(tokens.AGENT_TOKEN_BUDGETS, "sentiment", 200)
+    client = RecordingClient()
+    set_llm_gateway(LLMGateway(client=client, use_mock=False, cache=LLMResponseCache(path=None)))
+    yield client
+    set_llm_gateway(None)
+
+def test_chunk_text():
+    """Chunks keep the budget, the order and paragraph boundaries"""
+    assert chunk_text("short text", 100) == ["short text"]
+    chunks = chunk_text(LONG_ARTICLE, 200)
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 200 for chunk in chunks)
+    assert "\n\n".join(chunks) == LONG_ARTICLE
+
+    run_on = " ".join(["word"] * 1000)
+    assert all(count_tokens(chunk) <= 200 for chunk in chunk_text(run_on, 200))
+
+@pytest.mark.asyncio
+async def test_summary_map_reduce(recording_gateway):
+    """Long articles are summarized per chunk and merged"""
+    state = await SummaryAgent()({"article_content": LONG_ARTICLE})
+    chunks = state["article_chunks"]["summary"]
+    assert chunks > 1
+    assert len(recording_gateway.prompts) == chunks + 1
+    assert state["summary_result"] == "merged summary"
+
+    # Articles under the budget are sent as they are, in one call
+    recording_gateway.prompts.clear()
+    state = await SummaryAgent()({"article_content": PARAGRAPHS[0]})
+    assert len(recording_gateway.prompts) == 1
+    assert "article_chunks" not in state
+
+@pytest.mark.asyncio
+async def test_sentiment_chunk_aggregation(recording_gateway):
+    """Per-chunk sentiment scores are aggregated weighted by chunk length"""
+    state = await SentimentAgent()({"article_content": LONG_ARTICLE})
+    chunks = state["article_chunks"]["sentiment"]
+    assert len(recording_gateway.prompts) == chunks
+    result = state["sentiment_result"]
+    assert 20 < result["sentiment_score"] < 50
+    assert result["key_phrases"] == ["phrase"]
+    assert json.loads(state["sentiment_raw_output"])["chunkScores"][0] == 20
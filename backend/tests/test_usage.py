@@ -0,0 +1,94 @@
+import pytest
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import usage_log
+from langgraph.llm_cache import LLMResponseCache
+from langgraph.llm_gateway import LLMGateway
+from langgraph.usage import call_cost, new_usage, reset_usage, track_usage
+from utils.mock_openai import MockChatCompletionResponse
+
+
+class UsageClient:
+    """Client reporting 1000 prompt tokens (400 cached) and 200 completion tokens per call"""
+    def __init__(self):
+        self.chat = self
+        self.completions = self
+
+    async def create(self, **kwargs):
+        response = MockChatCompletionResponse("ok")
+        response.usage = {"prompt_tokens": 1000, "completion_tokens": 200,
+                          "prompt_tokens_details": {"cached_tokens": 400}}
+        return response
+
+
+def test_call_cost():
+    # gpt-4o-mini: 600 uncached at 0.15, 400 cached at 0.075, 200 out at 0.60 per million
+    assert call_cost("gpt-4o-mini", 1000, 400, 200) == pytest.approx((600 * 0.15 + 400 * 0.075 + 200 * 0.6) / 1e6)
+    # Dated snapshots are priced as their base model, not as a shorter prefix
+    assert call_cost("gpt-4o-mini-2024-07-18", 1000, 400, 200) == call_cost("gpt-4o-mini", 1000, 400, 200)
+    assert call_cost("some-local-model", 1000, 0, 200) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_usage_is_charged_to_the_job():
+    gateway = LLMGateway(client=UsageClient(), use_mock=False, cache=LLMResponseCache(path=None))
+    request = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "hi"}], "temperature": 0}
+
+    async def job():
+        ledger = new_usage()
+        token = track_usage(ledger)
+        try:
+            # Calls made from tasks the job starts are charged to it too
+            await asyncio.gather(
+                gateway.chat_completion("sentiment", **request),
+                gateway.chat_completion("summary", **{**request, "max_tokens": 50}),
+            )
+            await gateway.chat_completion("sentiment", **request)
+        finally:
+            reset_usage(token)
+        return ledger
+
+    first, second = await asyncio.gather(job(), job())
+    # Calls outside a job are not charged to any ledger
+    await gateway.chat_completion("summary", **{**request, "max_tokens": 10})
+
+    sentiment = first["agents"]["sentiment"]
+    assert sentiment["calls"] + sentiment["cache_hits"] == 2
+    assert first["total"]["calls"] + first["total"]["cache_hits"] == 3
+    assert first["agents"]["summary"]["prompt_tokens"] == 1000
+    assert first["agents"]["summary"]["cost_usd"] == pytest.approx(call_cost("gpt-4o-mini", 1000, 400, 200))
+    assert first["total"]["completion_tokens"] == 200 * first["total"]["calls"]
+    assert second["total"]["calls"] + second["total"]["cache_hits"] == 3
+
+
+def test_usage_log_aggregates(tmp_path, monkeypatch):
+    monkeypatch.setattr(usage_log, "LLM_USAGE_LOG_FILE", str(tmp_path / "usage.jsonl"))
+    entry = lambda calls, cost: {"calls": calls, "prompt_tokens": 1000 * calls, "completion_tokens": 100 * calls,
+                                 "latency_ms": 500.0 * calls, "cost_usd": cost}
+    now = datetime.now()
+    usage_log.record_llm_usage("1", "https://a.example/x", None, now,
+                               {"agents": {"sentiment": entry(1, 0.01), "summary": entry(2, 0.02)}})
+    usage_log.record_llm_usage("2", "https://b.example/y", "B News", now - timedelta(days=3),
+                               {"agents": {"sentiment": entry(1, 0.04)}})
+    # Jobs that made no calls are not logged
+    assert not usage_log.record_llm_usage("3", "https://a.example/z", None, now, new_usage())
+
+    stats = usage_log.get_llm_usage_stats()
+    assert stats["total"]["jobs"] == 2 and stats["total"]["calls"] == 4
+    assert stats["total"]["cost_usd"] == pytest.approx(0.07)
+    assert stats["total"]["mean_latency_ms"] == 500.0
+    assert list(stats["by_source"]) == ["B News", "a.example"]
+    assert stats["by_agent"]["sentiment"] == {
+        "jobs": 2, "calls": 2, "cache_hits": 0, "prompt_tokens": 2000, "cached_prompt_tokens": 0,
+        "completion_tokens": 200, "cost_usd": 0.05, "mean_latency_ms": 500.0
+    }
+    assert stats["by_day"][now.date().isoformat()]["cost_usd"] == pytest.approx(0.03)
+
+    recent = usage_log.get_llm_usage_stats(days=1)
+    assert recent["total"]["jobs"] == 1 and list(recent["by_source"]) == ["a.example"]
@@ -14,9 +14,11 @@ from langgraph.workflow import (
     CredibilityAgent,
     SentimentAgent,
     SummaryAgent,
+    ValidatorAgent,
     router,
     validation_router
 )
+from langgraph import utility
 
 # Basic test URLs
 TEST_URLS = [
@@ -42,6 +44,110 @@ async def test_process_article():
     
     # Summary should always be generated
     assert "summary_result" in result
+    # The mock article is short but still fact-checked
+    assert "fake_news" in result["agents_called"]
+
+@pytest.mark.asyncio
+async def test_incremental_reanalysis(monkeypatch):
+    """Test that re-analysis only re-runs agents whose inputs changed"""
+    import langgraph.utility as utility
+
+    async def fake_fetch(url):
+        return {
+            "title": "Tariff dispute",
+            "content": "Officials said the EU charges a tariff of 24 percent on US jam. " * 10,
+            "source": "Example",
+            "url": url
+        }
+    monkeypatch.setattr(utility, "fetch_article_content", fake_fetch)
+
+    first = await process_article(TEST_URLS[1])
+    assert set(first["agent_fingerprints"]) == {"fake_news", "credibility", "sentiment", "summary"}
+    assert first["agents_reused"] == []
+
+    # Only the title changed: credibility must re-run, text-only agents are reused
+    second = await process_article(TEST_URLS[1], title="Updated headline", previous_results=first)
+    assert "credibility" in second["agents_called"]
+    assert set(second["agents_reused"]) == {"fake_news", "sentiment", "summary"}
+    assert second["sentiment_result"] == first["sentiment_result"]
+    assert second["summary_result"] == first["summary_result"]
+
+@pytest.mark.asyncio
+async def test_reuse_before_fused_analysis_is_checkpointed(monkeypatch):
+    """Results reused while gathering the fused agents are checkpointed before the next call"""
+    import langgraph.utility as utility
+
+    async def fake_fetch(url):
+        return {
+            "title": "Tariff dispute",
+            "content": "Officials said the EU charges a tariff of 24 percent on US jam. " * 10,
+            "source": "Example",
+            "url": url
+        }
+    monkeypatch.setattr(utility, "fetch_article_content", fake_fetch)
+    monkeypatch.setattr(utility, "FUSED_ANALYSIS", True)
+    first = await process_article(TEST_URLS[1])
+
+    checkpoints = []
+    monkeypatch.setattr(utility, "save_checkpoint", lambda job_id, state, request=None: checkpoints.append(dict(state)))
+    second = await process_article(TEST_URLS[1], title="Updated headline", previous_results=first, job_id="job-fused")
+    assert set(second["agents_reused"]) == {"fake_news", "sentiment", "summary"}
+    # Sentiment and summary are saved as reused before credibility runs on its own
+    assert any("sentiment_result" in state and "credibility_result" not in state for state in checkpoints)
+    assert "fused_sections" not in second
+
+@pytest.mark.asyncio
+async def test_resume_from_checkpoint(tmp_path, monkeypatch):
+    """Test that a resumed job skips agents whose results are in the checkpoint"""
+    from database import checkpoints
+    monkeypatch.setattr(checkpoints, "CHECKPOINT_DIR", str(tmp_path))
+
+    from database.crud import compute_content_hash
+    completed = {"claims_analyzed": 1, "claims_verified": 1, "verification_score": 1.0,
+                 "verified_claims": ["Restored claim"], "unverified_claims": []}
+    content = "Officials said the EU charges a tariff of 24 percent on US jam. " * 10
+    checkpoints.save_checkpoint("job-1", {
+        "article_content": content,
+        "content_hash": compute_content_hash(content),
+        "article_title": "Tariff dispute",
+        "article_url": TEST_URLS[0],
+        "agents_called": ["fake_news"],
+        "agent_invocation_counts": {"fake_news": 1},
+        "call_fake_news": True,
+        "call_credibility": True,
+        "call_sentiment": True,
+        "call_summary": True,
+        "fake_news_result": completed
+    }, request={"url": TEST_URLS[0], "title": None, "source": None, "num_claims": 2})
+
+    result = await process_article(TEST_URLS[0], job_id="job-1")
+    assert result["fake_news_result"] == completed
+    assert result["agents_called"] == ["fake_news", "credibility", "sentiment", "summary"]
+
+    # Every completed agent was checkpointed; cleanup is left to the caller that saves the result
+    saved = checkpoints.load_checkpoint("job-1")
+    assert "summary_result" in saved["state"]
+    assert saved["request"]["url"] == TEST_URLS[0]
+    assert checkpoints.delete_checkpoint("job-1")
+    assert checkpoints.list_checkpoints() == []
+
+@pytest.mark.asyncio
+async def test_checkpoint_of_other_request_is_ignored(tmp_path, monkeypatch):
+    """A checkpoint for another URL, or whose text no longer matches its hash, is not resumed"""
+    from database import checkpoints
+    monkeypatch.setattr(checkpoints, "CHECKPOINT_DIR", str(tmp_path))
+    stale = {"article_content": "Another article entirely.", "article_url": TEST_URLS[1],
+             "agents_called": ["fake_news"], "fake_news_result": {"verification_score": 0.0}}
+    checkpoints.save_checkpoint("job-2", stale, request={"url": TEST_URLS[1]})
+    assert utility.checkpoint_state(checkpoints.load_checkpoint("job-2"), TEST_URLS[0]) is None
+
+    tampered = {**stale, "article_url": TEST_URLS[0], "content_hash": "0" * 64}
+    checkpoints.save_checkpoint("job-2", tampered, request={"url": TEST_URLS[0]})
+    assert utility.checkpoint_state(checkpoints.load_checkpoint("job-2"), TEST_URLS[0]) is None
+
+    result = await process_article(TEST_URLS[0], job_id="job-2")
+    assert result["article_url"] == TEST_URLS[0]
+    assert result["fake_news_result"] != stale["fake_news_result"]
 
 @pytest.mark.asyncio
 async def test_head_node():
@@ -62,6 +168,63 @@ async def test_head_node():
     assert "call_credibility" in result
     assert "call_sentiment" in result
     assert "call_summary" in result
+    assert "head_node_decision" in result
+
+@pytest.mark.asyncio
+async def test_head_node_content_routing():
+    """Test that the head node skips agents for low-value content but not hard news"""
+    head_node = HeadNode()
+
+    hard_news = " ".join([
+        "Officials said on Tuesday that the EU tariff on US jam exceeds 24 percent.",
+        "According to trade data, US tariffs on European jam are about 4.5 percent.",
+        "The company announced it would support the new trade policy."
+    ] * 5)
+    result = await head_node({"article_content": hard_news, "article_title": "Tariff dispute", "article_url": TEST_URLS[0]})
+    assert result["head_node_decision"]["content_type"] == "hard_news"
+    assert result["call_fake_news"] and result["call_credibility"] and result["call_sentiment"]
+
+    weather = " ".join([
+        "Showers will clear by the afternoon and the weather turns sunny.",
+        "The forecast shows temperatures rising towards the weekend with light rain at night."
+    ] * 10)
+    result = await head_node({"article_content": weather, "article_title": "Weekend weather", "article_url": "https://example.com/weather/today"})
+    assert result["head_node_decision"]["content_type"] == "weather"
+    assert not result["call_fake_news"]
+    assert not result["call_sentiment"]
+    assert result["call_summary"]
+    assert "Weather" in result["head_node_decision"]["reasons"]["fake_news"]
+
+@pytest.mark.asyncio
+async def test_head_node_ignores_numbers_that_are_not_claims():
+    """Test that forecasts and live blogs full of numbers keep their routing"""
+    head_node = HeadNode()
+
+    weather = " ".join([
+        "Temperatures will reach 25°C on Saturday, with 5mm of rain expected by 3pm.",
+        "The Met Office said winds of 20 mph will ease from 14:00 on 3 March.",
+        "There is a 40% chance of showers overnight and highs of 77 degrees F on Sunday."
+    ] * 6)
+    result = await head_node({"article_content": weather, "article_title": "Weekend weather", "article_url": "https://example.com/weather/today"})
+    decision = result["head_node_decision"]
+    assert decision["content_type"] == "weather"
+    assert not result["call_fake_news"]
+
+    live = " ".join(
+        f"{hour}:{minute:02d} The minister said {hour} people were evacuated from the area."
+        for hour in range(9, 17) for minute in (5, 35)
+    )
+    result = await head_node({"article_content": live, "article_title": "Storm latest", "article_url": TEST_URLS[0]})
+    decision = result["head_node_decision"]
+    assert decision["content_type"] == "live_blog"
+    # Claim-heavy, but a live blog is still not fact-checked mid-story
+    assert decision["claim_density"] > 0.9
+    assert not result["call_fake_news"]
+
+    # A short viral post is fact-checked
+    post = "BREAKING: The government confirmed that 3 million voters were removed from the rolls last week."
+    result = await head_node({"article_content": post, "article_title": "", "article_url": TEST_URLS[0]})
+    assert result["call_fake_news"]
 
 @pytest.mark.asyncio
 async def test_router():
@@ -128,6 +291,34 @@ async def test_agents_individually():
     assert "summary_result" in summary_result
     assert summary_result["last_agent_run"] == "summary"
 
+@pytest.mark.asyncio
+async def test_validator_agent():
+    """Test schema validation and the re-run cap of the validator"""
+    validator = ValidatorAgent()
+
+    # Valid output passes on the local schema check alone
+    state = await CredibilityAgent()({
+        "article_content": "Test article content for testing purposes.",
+        "article_title": "Test Article"
+    })
+    state = await validator(state)
+    assert state["validation_passed"]
+    assert state["validation_report"]["credibility"]["status"] == "valid"
+    assert state["validation_report"]["credibility"]["method"] == "schema"
+
+    # Out-of-range scores fail the schema and ask for a re-run
+    state["credibility_result"]["overall_credibility"] = 1.5
+    state = await validator(state)
+    assert not state["validation_passed"]
+    assert state["validation_report"]["credibility"]["status"] == "invalid"
+    assert "credibility" in state["refined_prompts"]
+
+    # Once the re-run budget is spent the output is kept
+    state["agent_invocation_counts"]["credibility"] = 2
+    state = await validator(state)
+    assert state["validation_passed"]
+    assert state["validation_report"]["credibility"]["status"] == "invalid"
+
 @pytest.mark.asyncio
 async def test_validation_router():
     """Test that the validation router works correctly"""
@@ -0,0 +1,148 @@
+"""
+Circuit breakers for the pipeline's external dependencies
+
+When a dependency (the LLM provider, the search API, a news site) is down,
+every call would otherwise wait out its full timeout and retries before
+falling back, and a short outage turns into a backlog. A breaker counts
+consecutive failures of its dependency:
+
+  closed     calls go through; CIRCUIT_FAILURE_THRESHOLD failures in a row
+             open the breaker
+  open       calls fail fast without touching the dependency for
+             CIRCUIT_RESET_SECONDS
+  half-open  one trial call is let through; its success closes the breaker,
+             its failure opens it again
+
+Callers decide what counts as a failure: outages (timeouts, connection
+errors, 5xx) do, while throttling (429) and bad requests are left to the
+rate limiters and do not. Breaker states are exported as the
+circuit_breaker_state gauge (0 closed, 1 half-open, 2 open).
+
+With CIRCUIT_BREAKERS=false a breaker never leaves the closed state: it
+allows every call, ignores recorded outcomes and reports no wait.
+"""
+
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+from utils import metrics
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+CIRCUIT_BREAKERS = os.environ.get("CIRCUIT_BREAKERS", "true").lower() == "true"
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.environ.get("CIRCUIT_RESET_SECONDS", "30"))
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """A call was refused because its dependency's breaker is open"""
+    def __init__(self, dependency: str, retry_in: float):
+        super().__init__(f"Circuit breaker for {dependency} is open, retry in {retry_in:.1f}s")
+        self.dependency = dependency
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker for one dependency"""
+    def __init__(self, dependency: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_seconds: float = CIRCUIT_RESET_SECONDS, enabled: bool = CIRCUIT_BREAKERS):
+        self.dependency = dependency
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.enabled = enabled
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        metrics.set_gauge("circuit_breaker_state", _STATE_VALUES[CLOSED], dependency=dependency)
+
+    def _transition(self, state: str) -> None:
+        if state == self.state or not self.enabled:
+            return
+        logger.warning(f"Circuit breaker for {self.dependency}: {self.state} -> {state}")
+        self.state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        metrics.set_gauge("circuit_breaker_state", _STATE_VALUES[state], dependency=self.dependency)
+        metrics.inc("circuit_breaker_transitions_total", dependency=self.dependency, state=state)
+
+    def retry_in(self) -> float:
+        """Seconds until an open breaker lets a trial call through"""
+        if self.state != OPEN or not self.enabled:
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_seconds - time.monotonic())
+
+    def allow(self) -> bool:
+        """
+        Whether a call may go to the dependency now.
+
+        Every allowed call must be followed by record_success(),
+        record_failure() or record_ignored().
+        """
+        if not self.enabled:
+            return True
+        if self.state == OPEN and self.retry_in() == 0:
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        if self.state == CLOSED:
+            return True
+        metrics.inc("circuit_breaker_rejected_total", dependency=self.dependency)
+        return False
+
+    def check(self) -> None:
+        """allow(), raising CircuitOpenError instead of returning False"""
+        if not self.allow():
+            raise CircuitOpenError(self.dependency, self.retry_in())
+
+    def record_success(self) -> None:
+        if not self.enabled:
+            return
+        self.failures = 0
+        self._trial_in_flight = False
+        self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        if not self.enabled:
+            return
+        self.failures += 1
+        trial = self._trial_in_flight
+        self._trial_in_flight = False
+        # A failed trial opens the breaker again for a full period
+        if trial or self.failures >= self.failure_threshold:
+            self._transition(OPEN)
+
+    def record_ignored(self) -> None:
+        """The call ended in a way that says nothing about the dependency's health"""
+        if self._trial_in_flight:
+            self._trial_in_flight = False
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def circuit_breaker(dependency: str) -> CircuitBreaker:
+    """The process-wide breaker of a dependency"""
+    if dependency not in _breakers:
+        _breakers[dependency] = CircuitBreaker(dependency)
+    return _breakers[dependency]
+
+
+def reset_circuit_breakers() -> None:
+    """Forget all breakers (e.g. between tests)"""
+    _breakers.clear()
+
+
+def breaker_states() -> Dict[str, Dict[str, Optional[float]]]:
+    """State, consecutive failures and seconds until a trial call, per dependency"""
+    return {
+        name: {"state": breaker.state, "failures": breaker.failures, "retry_in": round(breaker.retry_in(), 1)}
+        for name, breaker in sorted(_breakers.items())
+    }
@@ -0,0 +1,123 @@
+"""
+Online latency percentiles and a hedge budget for hedged requests
+
+A hedged request sends a duplicate when the original has not answered by a
+high percentile of recent latencies and takes whichever finishes first. The
+budget caps the share of requests that are duplicated so hedging cannot
+multiply load during a slowdown. first_results() races several different
+requests for the same need (e.g. evidence pages) the same way.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Any, Awaitable, Deque, Dict, List, Optional, Tuple
+
+
+class LatencyTracker:
+    """Recent latencies per key (e.g. model) with percentiles over a sliding window"""
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def observe(self, key: str, seconds: float) -> None:
+        self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def count(self, key: str) -> int:
+        return len(self._samples.get(key, ()))
+
+    def percentile(self, key: str, q: float) -> Optional[float]:
+        """The q-th percentile (0-100) of recent latencies, None without samples"""
+        samples = self._samples.get(key)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+
+class HedgeBudget:
+    """Allows a hedge only while hedges stay under max_rate of the requests in a sliding window"""
+    def __init__(self, max_rate: float, window: int = 1000):
+        self.max_rate = max_rate
+        # One entry per request (False) or hedge (True)
+        self._events: Deque[bool] = deque(maxlen=window)
+        self._hedges = 0
+
+    def _append(self, hedge: bool) -> None:
+        if len(self._events) == self._events.maxlen and self._events[0]:
+            self._hedges -= 1
+        self._events.append(hedge)
+        self._hedges += hedge
+
+    def record_request(self) -> None:
+        self._append(False)
+
+    def try_spend(self) -> bool:
+        """Record a hedge if the budget allows one more"""
+        requests = len(self._events) - self._hedges
+        if self._hedges + 1 > self.max_rate * requests:
+            return False
+        self._append(True)
+        return True
+
+    @property
+    def rate(self) -> float:
+        requests = len(self._events) - self._hedges
+        return self._hedges / requests if requests else 0.0
+
+
+async def first_success(primary: "asyncio.Future", hedge: "asyncio.Future") -> Tuple[Any, str]:
+    """
+    Wait for the first of two attempts to succeed and cancel the other.
+
+    Returns the result and "primary" or "hedge". If both fail the primary's
+    error is raised.
+    """
+    attempts = {primary: "primary", hedge: "hedge"}
+    pending = set(attempts)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for attempt in done:
+                if not attempt.cancelled() and attempt.exception() is None:
+                    return attempt.result(), attempts[attempt]
+        return primary.result(), "primary"
+    finally:
+        for attempt in attempts:
+            if not attempt.done():
+                attempt.cancel()
+
+
+async def first_results(attempts: List[Awaitable[Any]], count: int = 1,
+                        timeout: Optional[float] = None) -> List[Tuple[int, Any]]:
+    """
+    Run attempts concurrently and return the first `count` usable results.
+
+    A result is usable if the attempt returned something other than None.
+    Returns (index, result) pairs in the order they finished, and cancels the
+    attempts still running once `count` results are in or `timeout` seconds
+    have passed.
+    """
+    tasks = [asyncio.ensure_future(attempt) for attempt in attempts]
+    indexes = {task: index for index, task in enumerate(tasks)}
+    deadline = None if timeout is None else time.monotonic() + timeout
+    results: List[Tuple[int, Any]] = []
+    pending = set(tasks)
+    try:
+        while pending and len(results) < count:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=indexes.get):
+                if not task.cancelled() and task.exception() is None and task.result() is not None:
+                    results.append((indexes[task], task.result()))
+        return results[:count]
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        # Let cancelled attempts run their cleanup (closing connections) before returning
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,68 @@
+"""
+In-process metrics registry
+
+Counters and gauges keyed by name and a set of labels, served as JSON at
+GET /metrics. Values live for the lifetime of the process.
+"""
+
+import threading
+from typing import Any, Dict, Tuple
+
+_lock = threading.Lock()
+_counters: Dict[str, Dict[Tuple[Tuple[str, str], ...], float]] = {}
+_gauges: Dict[str, Dict[Tuple[Tuple[str, str], ...], float]] = {}
+
+
+def _key(labels: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def inc(name: str, amount: float = 1, **labels) -> None:
+    """Increase a counter"""
+    key = _key(labels)
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[key] = series.get(key, 0) + amount
+
+
+def set_gauge(name: str, value: float, **labels) -> None:
+    """Set a gauge to its current value"""
+    with _lock:
+        _gauges.setdefault(name, {})[_key(labels)] = value
+
+
+def get_counter(name: str, **labels) -> float:
+    """Current value of one counter series (0 if never incremented)"""
+    with _lock:
+        return _counters.get(name, {}).get(_key(labels), 0)
+
+
+def get_gauge(name: str, **labels) -> float:
+    """Current value of one gauge series (0 if never set)"""
+    with _lock:
+        return _gauges.get(name, {}).get(_key(labels), 0)
+
+
+def counter_series(name: str) -> Dict[Tuple[Tuple[str, str], ...], float]:
+    """All series of a counter, keyed by their sorted label pairs"""
+    with _lock:
+        return dict(_counters.get(name, {}))
+
+
+def snapshot() -> Dict[str, Any]:
+    """All metrics as {"counters": {name: [{"labels": ..., "value": ...}]}, "gauges": ...}"""
+    with _lock:
+        return {
+            kind: {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in registry.items()
+            }
+            for kind, registry in (("counters", _counters), ("gauges", _gauges))
+        }
+
+
+def reset() -> None:
+    """Drop all recorded values"""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
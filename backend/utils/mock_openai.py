@@ -3,9 +3,11 @@ Mock OpenAI client for development and testing.
 This allows testing without using real API keys.
 """
 import json
-import asyncio
 import logging
-from typing import Dict, Any, List
+import re
+from typing import Dict, Any, List, Optional
+
+from utils.mock_profiles import mock_profile
 
 logger = logging.getLogger(__name__)
 
@@ -21,17 +23,84 @@ class MockChoice:
 
 class MockChatCompletionResponse:
     """Mock for OpenAI's chat completion response"""
-    def __init__(self, message_content: str):
+    def __init__(self, message_content: str, usage: Optional[Dict[str, Any]] = None):
         self.choices = [MockChoice(message_content)]
+        self.usage = usage
+
+def _count_tokens(text: str) -> int:
+    # Imported here because the LLM gateway imports this module
+    from langgraph.tokens import count_tokens
+    return count_tokens(text)
+
+# Agent answers in the formats their prompts ask for
+MOCK_CREDIBILITY = {
+    "sourceReputationScore": 75,
+    "sourceReputationReasoning": "The source has a generally good reputation for factual reporting.",
+    "titleContentScore": 90,
+    "titleContentReasoning": "The title accurately reflects the main content of the article.",
+    "misleadingTitlesScore": 85,
+    "misleadingTitlesReasoning": "The title is not misleading and represents the article's content well.",
+    "averageScore": 83,
+    "overallConclusion": "This article appears to be from a credible source with good title-content alignment."
+}
+
+MOCK_SENTIMENT = {
+    "sentimentLabel": "mixed",
+    "sentimentScore": 45,
+    "subjectivityScore": 55,
+    "justification": [
+        "Reports the main facts in a mostly neutral register",
+        "Quotes both supporters and critics",
+        "Emphasizes some negative consequences"
+    ],
+    "keyPhrases": ["officials said", "critics argue", "remains to be seen"],
+    "biasAssessment": "Little bias detected beyond the choice of quotes."
+}
+
+# Pads summaries of very short articles to the requested length
+_SUMMARY_FILLER = (
+    "The article describes the events it reports, the people and organizations involved, "
+    "and the reactions to them, and sets out what may happen next."
+)
+
+def _article_text(messages: List[Dict[str, Any]]) -> str:
+    """The article text of the shared article message, if the request has one"""
+    for message in messages:
+        content = str(message.get("content", ""))
+        if "Article Text:\n" in content:
+            return content.split("Article Text:\n", 1)[1]
+    return ""
+
+def _mock_summary(text: str, words: int) -> str:
+    """The first words of the text, padded to the requested length"""
+    summary = text.split()[:words]
+    while len(summary) < words:
+        summary += _SUMMARY_FILLER.split()[:words - len(summary)]
+    return " ".join(summary)
+
+# The provider caches prompt prefixes of at least this many tokens, in steps of _PREFIX_CACHE_STEP
+_PREFIX_CACHE_MIN = 1024
+_PREFIX_CACHE_STEP = 128
 
 class MockCompletions:
     """Mock for OpenAI's completions sub-client"""
+    def __init__(self):
+        self._cached_prefixes = set()
+    
     async def create(self, **kwargs):
-        """Mock completions create method"""
+        """
+        Mock completions create method
+        
+        Latency, errors and rate limits follow the "llm" mock profile
+        (utils/mock_profiles.py), and responses report token usage including
+        prompt tokens served from a simulated prefix cache.
+        """
         logger.info("MOCK OpenAI completion called")
         
         # Extract messages from kwargs
         messages = kwargs.get("messages", [])
+        prompt_tokens = sum(_count_tokens(str(m.get("content", ""))) + 4 for m in messages)
+        await mock_profile("llm").call(prompt_tokens + kwargs.get("max_tokens", 300))
         
         # Get the last user message
         user_messages = [m for m in messages if m.get("role") == "user"]
@@ -40,47 +109,44 @@ class MockCompletions:
         
         user_message = user_messages[-1]["content"]
         
-        # Get the system message if any
+        # Get the system message if any; agents put the article first and their instructions last
         system_messages = [m for m in messages if m.get("role") == "system"]
-        system_instruction = system_messages[0]["content"] if system_messages else ""
+        system_instruction = system_messages[-1]["content"] if system_messages else ""
         
         # Decide what to return based on the prompt content
-        response = self._generate_mock_response(user_message, system_instruction)
-        
-        # Simulate API latency
-        await asyncio.sleep(0.5)
+        response = self._generate_mock_response(user_message, system_instruction, _article_text(messages))
         
-        return MockChatCompletionResponse(response)
+        return MockChatCompletionResponse(response, usage={
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": _count_tokens(response),
+            "total_tokens": prompt_tokens + _count_tokens(response),
+            "prompt_tokens_details": {"cached_tokens": self._cached_tokens(messages)}
+        })
     
-    def _generate_mock_response(self, prompt: str, system: str) -> str:
-        """Generate appropriate mock responses based on the content of the prompt"""
-        if "summarize" in prompt.lower() or "summary" in system.lower():
-            return "This is a mock summary of the article. It discusses various points about the topic in a concise manner, highlighting the key facts and perspectives mentioned in the original text."
-        
-        if "sentiment" in prompt.lower() or "sentiment" in system.lower():
-            return json.dumps({
-                "sentiment": "negative",
-                "polarity": -0.3,
-                "subjectivity": 0.6,
-                "justification": "The text contains critical language and challenging perspectives on the topic."
-            })
-            
-        if "credibility" in prompt.lower() or "credibility" in system.lower():
-            return json.dumps({
-                "source_reputation": 0.75,
-                "title_content_alignment": 0.9,
-                "misleading_headline": False,
-                "justification": "The source is generally reputable and the content matches the headline."
-            })
-            
-        if "fake news" in prompt.lower() or "fake" in system.lower():
-            return json.dumps({
-                "claims_verified": 4,
-                "claims_unverified": 1,
-                "verification_score": 0.8,
-                "justification": "Most claims appear to be supported by external sources."
-            })
-            
+    def _cached_tokens(self, messages: List[Dict[str, Any]]) -> int:
+        """Tokens of the leading message if an earlier request started with it"""
+        if not messages:
+            return 0
+        leading = str(messages[0].get("content", ""))
+        tokens = _count_tokens(leading)
+        if tokens < _PREFIX_CACHE_MIN:
+            return 0
+        if hash(leading) not in self._cached_prefixes:
+            self._cached_prefixes.add(hash(leading))
+            return 0
+        return tokens - tokens % _PREFIX_CACHE_STEP
+    
+    def _generate_mock_response(self, prompt: str, system: str, article: str) -> str:
+        """Generate the answer each agent's prompt asks for, in its format, from the article text"""
+        if "news analysis agent" in system:
+            # Fused prompt: every requested section under its own key
+            sections = {
+                "credibility": MOCK_CREDIBILITY,
+                "sentiment": MOCK_SENTIMENT,
+                "summary": _mock_summary(article, 100),
+            }
+            return json.dumps({name: value for name, value in sections.items() if f'"{name}":' in system})
+
         if "HEAD agent" in system:
             return json.dumps({
                 "fake_news": {"call": True, "reason": "Political content needs fact checking"},
@@ -88,11 +154,37 @@ class MockCompletions:
                 "sentiment": {"call": True, "reason": "Opinion-heavy content"}
             })
             
-        if "validate" in prompt.lower() or "validator" in system.lower():
+        if "ValidatorAgent" in system:
             return json.dumps({
                 "validation": "pass",
                 "reasoning": "The output meets the required criteria and appears complete."
             })
+
+        if "CredibilityAgent" in system:
+            return json.dumps({**MOCK_CREDIBILITY, "confidence": 85})
+
+        if "SentimentAgent" in system:
+            return json.dumps({**MOCK_SENTIMENT, "confidence": 80})
+
+        claims_wanted = re.search(r"extracts exactly (\d+) factual claims", system)
+        if claims_wanted:
+            sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+", article) if len(s.split()) >= 5]
+            return json.dumps({"claims": sentences[:int(claims_wanted.group(1))]})
+
+        if "SUPPORT the claim" in system:
+            return json.dumps({"supports": True, "reason": "The search results report the same facts.", "confidence": 80})
+
+        if "is_verified" in prompt:
+            return json.dumps({
+                "is_verified": True,
+                "analysis": "The claim is consistent with widely reported information.",
+                "confidence": 75
+            })
+
+        if "summary agent" in system:
+            # Parts of long articles get shorter summaries; merges summarize the partial summaries
+            limit = 80 if "Summarize this part" in prompt else 100
+            return _mock_summary(prompt if "Merge them" in system else article, limit)
             
         # Default fallback response
         return "This is a mock response from the OpenAI API."
@@ -0,0 +1,204 @@
+"""
+Simulated latency, errors and rate limits for the mock clients
+
+Mock mode used to answer every call after a fixed sleep, which hides how the
+pipeline behaves against real providers: latency has a long tail, and 429s,
+timeouts and dropped connections happen. Each mocked service (the LLM, web
+search and page fetches) now has a profile:
+
+  - latency drawn from a lognormal distribution with the configured p50 and
+    p99 (p99 equal to p50 gives a fixed delay)
+  - a probability per error type: rate_limit (HTTP 429 with Retry-After),
+    server_error (HTTP 503), timeout (hangs, then asyncio.TimeoutError) and
+    connection (ConnectionError)
+  - requests and tokens per minute; calls over the quota get a 429 whose
+    Retry-After says when the window frees up
+
+Draws come from a random generator per service seeded with MOCK_SEED, so an
+offline load test or benchmark replays the same latencies and failures.
+
+Configuration, for SERVICE in LLM, SEARCH, FETCH:
+
+    MOCK_PROFILE=fixed                  fixed (old fixed sleeps, no errors) or realistic
+    MOCK_SEED=42                        unset draws a fresh sequence each run
+    MOCK_SERVICE_LATENCY_P50=0.5        seconds
+    MOCK_SERVICE_LATENCY_P99=0.5        unset keeps the preset's p99/p50 ratio
+    MOCK_SERVICE_ERRORS=rate_limit:0.02,timeout:0.005
+    MOCK_SERVICE_TIMEOUT=10             seconds a timed-out call hangs
+    MOCK_SERVICE_RPM=0                  0 disables the quota
+    MOCK_LLM_TPM=0
+"""
+
+import asyncio
+import collections
+import logging
+import math
+import os
+import random
+import time
+from typing import Deque, Dict, Optional, Tuple
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+SERVICES = ("llm", "search", "fetch")
+ERROR_TYPES = ("rate_limit", "server_error", "timeout", "connection")
+
+# z-score of the 99th percentile of the standard normal distribution
+_Z99 = 2.3263
+
+# Per service: (p50, p99, error rates, rpm, tpm)
+PRESETS = {
+    "fixed": {
+        "llm": (0.5, 0.5, {}, 0, 0),
+        "search": (0.5, 0.5, {}, 0, 0),
+        "fetch": (0.7, 0.7, {}, 0, 0),
+    },
+    # Shaped after gpt-4o-mini, Google Custom Search and news sites under load
+    "realistic": {
+        "llm": (0.9, 8.0, {"rate_limit": 0.02, "server_error": 0.01, "timeout": 0.003, "connection": 0.005}, 500, 200000),
+        "search": (0.35, 2.5, {"rate_limit": 0.01, "server_error": 0.005, "timeout": 0.002}, 100, 0),
+        "fetch": (0.5, 6.0, {"server_error": 0.03, "timeout": 0.02, "connection": 0.02}, 0, 0),
+    },
+}
+
+
+class MockAPIError(Exception):
+    """A simulated HTTP error, shaped like the OpenAI SDK's status errors"""
+    def __init__(self, service: str, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(f"Mock {service} API returned HTTP {status_code}")
+        self.status_code = status_code
+        headers = {"retry-after": f"{retry_after:.3f}"} if retry_after is not None else {}
+        # Gateways read Retry-After from error.response.headers
+        self.response = type("MockResponse", (), {"status_code": status_code, "headers": headers})()
+
+
+def parse_error_rates(value: str) -> Dict[str, float]:
+    """Parse "rate_limit:0.02,timeout:0.005" into error type -> probability"""
+    rates = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        error_type, _, rate = item.partition(":")
+        error_type = error_type.strip()
+        if error_type not in ERROR_TYPES:
+            raise ValueError(f"Unknown mock error type {error_type!r}, expected one of {ERROR_TYPES}")
+        rates[error_type] = float(rate)
+    return rates
+
+
+class MockServiceProfile:
+    """Latency, error and quota behaviour of one mocked service"""
+    def __init__(self, service: str, p50: float, p99: float, error_rates: Optional[Dict[str, float]] = None,
+                 rpm: int = 0, tpm: int = 0, timeout: Optional[float] = None, seed: Optional[str] = None):
+        self.service = service
+        self.p50 = p50
+        self.p99 = max(p99, p50)
+        # ln(p99 / p50) spans 2.33 standard deviations of the underlying normal
+        self.sigma = math.log(self.p99 / p50) / _Z99 if p50 > 0 else 0.0
+        self.error_rates = error_rates or {}
+        self.rpm = rpm
+        self.tpm = tpm
+        self.timeout = timeout if timeout is not None else 2 * self.p99
+        self.rng = random.Random(f"{seed}:{service}") if seed is not None else random.Random()
+        # (time, tokens) of calls admitted in the last minute
+        self._window: Deque[Tuple[float, int]] = collections.deque()
+
+    def latency(self) -> float:
+        """Seconds one call takes"""
+        if self.p50 <= 0:
+            return 0.0
+        return self.p50 * math.exp(self.sigma * self.rng.gauss(0, 1)) if self.sigma else self.p50
+
+    def draw_error(self) -> Optional[str]:
+        """The error type this call fails with, or None"""
+        draw = self.rng.random()
+        for error_type in ERROR_TYPES:
+            draw -= self.error_rates.get(error_type, 0.0)
+            if draw < 0:
+                return error_type
+        return None
+
+    def _quota_wait(self, tokens: int) -> Optional[float]:
+        """Seconds until the call would fit in the per-minute quota, None if it fits now"""
+        if not self.rpm and not self.tpm:
+            return None
+        now = time.monotonic()
+        while self._window and now - self._window[0][0] >= 60:
+            self._window.popleft()
+        over_requests = self.rpm and len(self._window) >= self.rpm
+        over_tokens = self.tpm and self._window and sum(t for _, t in self._window) + tokens > self.tpm
+        if over_requests or over_tokens:
+            return max(0.0, 60 - (now - self._window[0][0]))
+        self._window.append((now, tokens))
+        return None
+
+    async def call(self, tokens: int = 0) -> None:
+        """
+        Behave like one call to the service: wait its latency or fail.
+
+        Raises MockAPIError, asyncio.TimeoutError or ConnectionError.
+        """
+        retry_after = self._quota_wait(tokens)
+        if retry_after is not None:
+            await asyncio.sleep(min(0.05, self.p50))
+            raise MockAPIError(self.service, 429, retry_after)
+
+        error = self.draw_error()
+        latency = self.latency()
+        if error == "rate_limit":
+            # Providers reject over-quota calls before doing any work
+            await asyncio.sleep(min(0.05, latency))
+            raise MockAPIError(self.service, 429, retry_after=self.rng.uniform(0.5, 2.0))
+        if error == "timeout":
+            await asyncio.sleep(self.timeout)
+            raise asyncio.TimeoutError(f"Mock {self.service} call timed out after {self.timeout:.1f}s")
+        if error == "connection":
+            await asyncio.sleep(latency * self.rng.random())
+            raise ConnectionError(f"Mock {self.service} connection reset")
+        await asyncio.sleep(latency)
+        if error == "server_error":
+            raise MockAPIError(self.service, 503)
+
+
+def _env(service: str, name: str) -> Optional[str]:
+    return os.environ.get(f"MOCK_{service.upper()}_{name}")
+
+
+def profile_from_env(service: str, seed: Optional[str] = None) -> MockServiceProfile:
+    """Build a service's profile from the MOCK_PROFILE preset and per-service overrides"""
+    preset = PRESETS.get(os.environ.get("MOCK_PROFILE", "fixed").lower(), PRESETS["fixed"])
+    preset_p50, preset_p99, errors, rpm, tpm = preset[service]
+    p50 = float(_env(service, "LATENCY_P50") or preset_p50)
+    # Without an explicit p99 the preset's tail is kept in proportion
+    p99 = float(_env(service, "LATENCY_P99") or p50 * preset_p99 / preset_p50)
+    errors = parse_error_rates(_env(service, "ERRORS")) if _env(service, "ERRORS") is not None else errors
+    timeout = float(_env(service, "TIMEOUT")) if _env(service, "TIMEOUT") else None
+    return MockServiceProfile(
+        service, p50, p99, errors,
+        rpm=int(_env(service, "RPM") or rpm),
+        tpm=int(_env(service, "TPM") or tpm),
+        timeout=timeout,
+        seed=seed
+    )
+
+
+_profiles: Dict[str, MockServiceProfile] = {}
+
+
+def mock_profile(service: str) -> MockServiceProfile:
+    """The process-wide profile of a mocked service"""
+    if service not in _profiles:
+        _profiles[service] = profile_from_env(service, os.environ.get("MOCK_SEED") or None)
+    return _profiles[service]
+
+
+def reset_mock_profiles(seed: Optional[int] = None) -> None:
+    """
+    Rebuild all profiles from the environment, e.g. between benchmark runs.
+
+    A seed given here takes precedence over MOCK_SEED.
+    """
+    _profiles.clear()
+    for service in SERVICES:
+        _profiles[service] = profile_from_env(service, str(seed) if seed is not None else os.environ.get("MOCK_SEED") or None)
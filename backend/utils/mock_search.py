@@ -2,11 +2,11 @@
 Mock Search API for development and testing.
 This allows testing without using real API keys.
 """
-import asyncio
 import logging
-import random
 from typing import Dict, Any, List
 
+from utils.mock_profiles import mock_profile
+
 logger = logging.getLogger(__name__)
 
 # Sample mock search results
@@ -47,7 +47,12 @@ class MockSearchResult:
         self.html_content = f"<html><head><title>{title}</title></head><body><h1>{title}</h1><p>{snippet}</p><p>Additional mock content for {url}</p></body></html>"
 
 class MockSearchAPI:
-    """Mock Search API client"""
+    """
+    Mock Search API client
+    
+    Latency, errors and rate limits of searches and page fetches follow the
+    "search" and "fetch" mock profiles (utils/mock_profiles.py).
+    """
     def __init__(self, api_key=None):
         logger.info("Initialized MockSearchAPI")
     
@@ -64,11 +69,12 @@ class MockSearchAPI:
         """
         logger.info(f"MOCK Search API called with query: {query}")
         
-        # Simulate API latency
-        await asyncio.sleep(0.5)
+        # Simulate API latency and failures
+        profile = mock_profile("search")
+        await profile.call()
         
-        # Select a random subset of results
-        selected_results = random.sample(
+        # Select a random subset of results, reproducible under MOCK_SEED
+        selected_results = profile.rng.sample(
             MOCK_SEARCH_RESULTS, 
             min(num_results, len(MOCK_SEARCH_RESULTS))
         )
@@ -94,8 +100,8 @@ class MockSearchAPI:
         """
         logger.info(f"MOCK fetch page content for URL: {url}")
         
-        # Simulate API latency
-        await asyncio.sleep(0.7)
+        # Simulate API latency and failures
+        await mock_profile("fetch").call()
         
         # Find matching result or create a generic one
         for result in MOCK_SEARCH_RESULTS:
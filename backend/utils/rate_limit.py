@@ -0,0 +1,240 @@
+"""
+Concurrency limiting, request/token pacing and retry backoff for outbound APIs
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Deque, Mapping, Optional
+
+from utils import metrics
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class ConcurrencyLimiter:
+    """
+    Caps the number of calls in flight.
+
+    Unlike asyncio.Semaphore the limit can be changed while calls are running,
+    and waiters are plain futures of the running loop, so one limiter can be
+    shared by a process-wide client across event loops.
+    """
+    def __init__(self, limit: int):
+        self._limit = max(1, limit)
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @limit.setter
+    def limit(self, value: int) -> None:
+        self._limit = max(1, int(value))
+        self._wake()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        if self._in_flight < self._limit and not self._waiters:
+            self._in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before the cancellation
+                self.release()
+            raise
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free right now"""
+        if self._in_flight < self._limit and not self._waiters:
+            self._in_flight += 1
+            return True
+        return False
+
+    def release(self) -> None:
+        self._in_flight = max(0, self._in_flight - 1)
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self._in_flight < self._limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._in_flight += 1
+                waiter.set_result(True)
+
+    def record_success(self, latency: float) -> None:
+        """Feedback from a completed call; a fixed limit ignores it"""
+
+    def record_overload(self, started: float, reason: str) -> None:
+        """Feedback from a call that was throttled or timed out; a fixed limit ignores it"""
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+
+class AdaptiveLimiter(ConcurrencyLimiter):
+    """
+    Concurrency limit tuned by additive increase / multiplicative decrease.
+
+    While calls succeed at normal latency the limit grows by about one per
+    round trip, but only while the limit is actually in use, so a quiet
+    period does not inflate it. A 429, a timeout or latency rising well above
+    its long-run baseline multiplies the limit by `backoff`. Only calls started
+    after the last cut can cut again, so a burst of failures from one
+    overloaded window counts once. The current limit is exported as the
+    adaptive_concurrency_limit{limiter} gauge.
+    """
+    def __init__(self, name: str, initial: int, min_limit: int = 1, max_limit: int = 64,
+                 backoff: float = 0.5, latency_tolerance: float = 2.0):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self._window = float(min(max(initial, self.min_limit), self.max_limit))
+        self._recent_latency: Optional[float] = None
+        self._baseline_latency: Optional[float] = None
+        self._samples = 0
+        self._last_cut = 0.0
+        super().__init__(int(self._window))
+        metrics.set_gauge("adaptive_concurrency_limit", self._limit, limiter=name)
+
+    def _set_window(self, window: float) -> None:
+        self._window = min(max(window, self.min_limit), self.max_limit)
+        if int(self._window) != self._limit:
+            self.limit = int(self._window)
+            metrics.set_gauge("adaptive_concurrency_limit", self._limit, limiter=self.name)
+
+    def record_success(self, latency: float) -> None:
+        self._samples += 1
+        if self._baseline_latency is None:
+            self._recent_latency = self._baseline_latency = latency
+        else:
+            self._recent_latency += 0.3 * (latency - self._recent_latency)
+            self._baseline_latency += 0.02 * (latency - self._baseline_latency)
+
+        if self._samples > 10 and self._recent_latency > self._baseline_latency * self.latency_tolerance:
+            self.record_overload(time.monotonic() - latency, "latency")
+        elif self._in_flight >= self._limit or self._waiters:
+            self._set_window(self._window + 1 / self._window)
+
+    def record_overload(self, started: float, reason: str) -> None:
+        if started < self._last_cut:
+            return
+        self._last_cut = time.monotonic()
+        previous = self._limit
+        self._set_window(self._window * self.backoff)
+        if reason == "latency":
+            # Start judging latency afresh at the new limit
+            self._recent_latency = self._baseline_latency
+        metrics.inc("adaptive_concurrency_decreases_total", limiter=self.name, reason=reason)
+        logger.warning(f"{self.name} concurrency limit cut from {previous} to {self._limit} ({reason})")
+
+
+class RatePacer:
+    """
+    Token-bucket pacing of requests per minute and tokens per minute.
+
+    Both buckets start full and refill continuously; a limit of 0 disables
+    that bucket. pause() holds back every caller, e.g. after a Retry-After.
+    """
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        if self.requests_per_minute:
+            self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    async def acquire(self, tokens: int = 0) -> float:
+        """Wait until a request of the given size may be sent; returns the seconds waited"""
+        if self.tokens_per_minute:
+            tokens = min(tokens, self.tokens_per_minute)
+        waited = 0.0
+        while True:
+            now = time.monotonic()
+            self._refill(now)
+            delay = self._paused_until - now
+            if self.requests_per_minute and self._requests < 1:
+                delay = max(delay, (1 - self._requests) * 60 / self.requests_per_minute)
+            if self.tokens_per_minute and self._tokens < tokens:
+                delay = max(delay, (tokens - self._tokens) * 60 / self.tokens_per_minute)
+            if delay <= 0:
+                if self.requests_per_minute:
+                    self._requests -= 1
+                if self.tokens_per_minute:
+                    self._tokens -= tokens
+                return waited
+            await asyncio.sleep(delay)
+            waited += delay
+
+    def settle(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Correct the token bucket once the real usage of a request is known"""
+        if self.tokens_per_minute:
+            self._tokens -= actual_tokens - min(estimated_tokens, self.tokens_per_minute)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back all requests for the given time"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def retry_after_seconds(headers: Optional[Mapping[str, Any]]) -> Optional[float]:
+    """Parse retry-after-ms / Retry-After (seconds or HTTP date) from response headers"""
+    if not headers:
+        return None
+    try:
+        value = headers.get("retry-after-ms")
+        if value is not None:
+            return max(0.0, float(value) / 1000)
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float, cap: float, retry_after: Optional[float] = None) -> float:
+    """
+    Delay before retry number `attempt` (0-based).
+
+    Exponential backoff with full jitter; a server-provided Retry-After is a
+    lower bound, with a little jitter on top so callers do not retry in step.
+    """
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = min(cap, retry_after) + random.uniform(0, base)
+    return delay
@@ -3,13 +3,33 @@ Google Search API for real search functionality
 """
 
 import aiohttp
+import asyncio
 import logging
 import json
-from typing import List, Dict, Any, Optional
+import os
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+from utils.circuit_breaker import CircuitBreaker
+from utils.rate_limit import AdaptiveLimiter
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+SEARCH_TIMEOUT = float(os.environ.get("SEARCH_TIMEOUT", "15"))
+
+# Searches in flight across all SearchAPI instances, adapted to Google's
+# latency and 429s between SEARCH_CONCURRENCY_MIN and SEARCH_CONCURRENCY_MAX
+search_limiter = AdaptiveLimiter(
+    "search",
+    int(os.environ.get("SEARCH_MAX_CONCURRENCY", "4")),
+    int(os.environ.get("SEARCH_CONCURRENCY_MIN", "1")),
+    int(os.environ.get("SEARCH_CONCURRENCY_MAX", "32"))
+)
+
+# Opens after repeated timeouts, connection errors or 5xx; searches then fail fast
+search_breaker = CircuitBreaker("search")
+
 class SearchAPI:
     """
     Client for Google Custom Search API.
@@ -55,37 +75,70 @@ class SearchAPI:
             'num': num_results
         }
         
+        logger.info(f"Searching for: {query}")
+        # The breaker is the only gate: an open one refuses before a limiter slot is taken
+        if not search_breaker.allow():
+            return self._unavailable()
         try:
-            logger.info(f"Searching for: {query}")
-            async with aiohttp.ClientSession() as session:
-                async with session.get(self.base_url, params=params) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        logger.error(f"Google Search API error: {response.status} - {error_text}")
-                        return [{"title": "Error", "snippet": f"API error: {response.status}"}]
-                    
-                    data = await response.json()
-                    
-                    if 'items' not in data:
-                        logger.warning(f"No search results for query: {query}")
-                        return []
-                    
-                    # Extract relevant information from each result
-                    results = []
-                    for item in data['items']:
-                        result = {
-                            'title': item.get('title', ''),
-                            'link': item.get('link', ''),
-                            'snippet': item.get('snippet', ''),
-                            'source': item.get('displayLink', '')
-                        }
-                        results.append(result)
-                    
-                    return results
-                    
-        except Exception as e:
-            logger.error(f"Error during Google search: {str(e)}")
-            return [{"title": "Error", "snippet": f"Search error: {str(e)}"}]
+            async with search_limiter:
+                started = time.monotonic()
+                try:
+                    status, results = await self._request(params, query)
+                except asyncio.TimeoutError:
+                    search_breaker.record_failure()
+                    search_limiter.record_overload(started, "timeout")
+                    logger.error(f"Google search timed out after {SEARCH_TIMEOUT}s")
+                    return [{"title": "Error", "snippet": "Search error: timed out"}]
+                except Exception as e:
+                    search_breaker.record_failure()
+                    logger.error(f"Error during Google search: {str(e)}")
+                    return [{"title": "Error", "snippet": f"Search error: {str(e)}"}]
+                if status >= 500:
+                    search_breaker.record_failure()
+                elif status == 429:
+                    search_breaker.record_ignored()
+                else:
+                    search_breaker.record_success()
+                if status in (429, 503):
+                    search_limiter.record_overload(started, "rate_limited")
+                elif status == 200:
+                    search_limiter.record_success(time.monotonic() - started)
+                return results
+        except asyncio.CancelledError:
+            search_breaker.record_ignored()
+            raise
+    
+    def _unavailable(self) -> List[Dict[str, Any]]:
+        logger.warning(f"Search circuit open, skipping search (retry in {search_breaker.retry_in():.0f}s)")
+        return [{"title": "Error", "snippet": "Search error: search provider unavailable"}]
+
+    async def _request(self, params: Dict[str, Any], query: str) -> Tuple[int, List[Dict[str, Any]]]:
+        """One request to the Custom Search endpoint; returns the HTTP status and results"""
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=SEARCH_TIMEOUT)) as session:
+            async with session.get(self.base_url, params=params) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    logger.error(f"Google Search API error: {response.status} - {error_text}")
+                    return response.status, [{"title": "Error", "snippet": f"API error: {response.status}"}]
+                
+                data = await response.json()
+                
+                if 'items' not in data:
+                    logger.warning(f"No search results for query: {query}")
+                    return response.status, []
+                
+                # Extract relevant information from each result
+                results = []
+                for item in data['items']:
+                    result = {
+                        'title': item.get('title', ''),
+                        'link': item.get('link', ''),
+                        'snippet': item.get('snippet', ''),
+                        'source': item.get('displayLink', '')
+                    }
+                    results.append(result)
+                
+                return response.status, results
             
     async def search_text_only(self, query: str, num_results: int = 5) -> List[str]:
         """